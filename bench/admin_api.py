@@ -0,0 +1,158 @@
+"""Admin API: keyset pages vs OFFSET, and streamed exports vs one list.
+
+Fills day partitions (and threats, every THREAT row) through
+store_batch, then:
+
+- threats: walking every page of ?limit= threats newest first, by
+  listing.threat_page cursors vs LIMIT/OFFSET, and the last page alone
+- logs: a page deep into one day, log_page with the cursor vs OFFSET
+- export: every log row through admin_views.export_lines as NDJSON and
+  CSV, rows/sec and peak Python memory, vs fetchall + one JSON list the
+  way the old /api/admin/threats answered
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import corpus
+import day_partitions
+
+sys.path.insert(0, corpus.SERVER_DIR)
+
+from admin.admin_views import export_lines  # noqa: E402
+from listing import LOG_COLUMNS, encode_cursor, iter_logs, log_page, threat_page  # noqa: E402
+from migrations import migrate  # noqa: E402
+from partitions import Partitions, schema  # noqa: E402
+from pipeline import store_batch  # noqa: E402
+from storage import connect  # noqa: E402
+
+OFFSET_THREATS = "SELECT * FROM threats ORDER BY id DESC LIMIT ? OFFSET ?"
+OFFSET_LOGS = "SELECT * FROM {db}.logs ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?"
+
+
+def fill(path, rows, batch_size):
+    conn = connect(path)
+    migrate(conn)
+    for i in range(0, len(rows), batch_size):
+        batch = rows[i : i + batch_size]
+        store_batch(conn, batch, [r[:6] + (None,) for r in batch if r[4] == "THREAT"])
+    return conn
+
+
+def walk_keyset(conn, limit):
+    pages, cursor = 0, None
+    while True:
+        _, cursor = threat_page(conn, {}, cursor, limit)
+        pages += 1
+        if not cursor:
+            return pages
+
+
+def walk_offset(conn, limit):
+    pages = 0
+    while True:
+        rows = conn.execute(OFFSET_THREATS, (limit, pages * limit)).fetchall()
+        pages += 1
+        if len(rows) < limit:
+            return pages
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - t0, result
+
+
+def peak_memory(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="admin api pagination and exports")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rows = day_partitions.make_rows(args.rows, args.days, args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = fill(os.path.join(tmp, "bench.sqlite3"), rows, args.batch_size)
+        threats = conn.execute("SELECT COUNT(*) FROM threats").fetchone()[0]
+
+        keyset, pages = timed(lambda: walk_keyset(conn, args.limit))
+        offset, offset_pages = timed(lambda: walk_offset(conn, args.limit))
+        assert pages == offset_pages or pages + 1 == offset_pages
+        last_offset, _ = timed(
+            lambda: conn.execute(OFFSET_THREATS, (args.limit, threats - args.limit)).fetchall()
+        )
+        oldest = conn.execute("SELECT MIN(id) FROM threats").fetchone()[0]
+        last_keyset, _ = timed(
+            lambda: threat_page(conn, {}, encode_cursor([oldest + args.limit]), args.limit)
+        )
+        print(
+            f"[ADMIN] threats={threats:,} all {pages} pages: keyset {keyset:.2f}s, "
+            f"offset {offset:.2f}s; last page keyset {last_keyset * 1000:.2f}ms, "
+            f"offset {last_offset * 1000:.2f}ms"
+        )
+
+        # the middle of one day, cursor taken from the row OFFSET lands on
+        day = Partitions.of(conn).days()[args.days // 2]
+        db = schema(day)
+        Partitions.of(conn).prepare(conn, [day])
+        depth = conn.execute(f"SELECT COUNT(*) FROM {db}.logs").fetchone()[0] // 2
+        sql = OFFSET_LOGS.format(db=db)
+        row = conn.execute(sql, (1, depth - 1)).fetchone()
+        by_offset, expected = timed(lambda: conn.execute(sql, (args.limit, depth)).fetchall())
+        cursor = encode_cursor([row[1], row[0]])
+        filters = {"since": day, "until": day + "~"}
+        by_cursor, (page, _) = timed(lambda: log_page(conn, filters, cursor, args.limit))
+        assert [r["id"] for r in page] == [r[0] for r in expected]
+        print(
+            f"[ADMIN] logs page at depth {depth:,} of {day}: keyset {by_cursor * 1000:.2f}ms, "
+            f"offset {by_offset * 1000:.2f}ms"
+        )
+        conn.close()
+
+        conn = connect(os.path.join(tmp, "bench.sqlite3"))
+        for fmt in ("ndjson", "csv"):
+            sent = []
+
+            def stream():
+                for piece in export_lines(iter_logs(conn, {}), LOG_COLUMNS, fmt):
+                    sent.append(len(piece))
+
+            elapsed, peak = peak_memory(stream)
+            print(
+                f"[ADMIN] export {fmt:<6} {args.rows / elapsed:>10,.0f} rows/sec, "
+                f"{sum(sent) / 1e6:.0f}MB sent, peak memory {peak / 1e6:.1f}MB"
+            )
+
+        def one_list():
+            out = []
+            for _, db in Partitions.of(conn).each(conn):
+                out += conn.execute(f"SELECT * FROM {db}.logs").fetchall()
+            return json.dumps([dict(zip(LOG_COLUMNS, r)) for r in out])
+
+        elapsed, peak = peak_memory(one_list)
+        print(
+            f"[ADMIN] one list        {args.rows / elapsed:>10,.0f} rows/sec, "
+            f"peak memory {peak / 1e6:.1f}MB"
+        )
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Per-request auth overhead: baseline verify_request checks vs ClientAuth.
+
+The authorized client is the last entry of an N-long allowlist, the worst
+case for the old list scans. "cidr" puts the same agents in /24 ranges.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import corpus
+
+sys.path.insert(0, corpus.SERVER_DIR)
+os.environ.setdefault("AUTHORIZED_MACS", "")
+os.environ.setdefault("AUTHORIZED_IPS", "")
+
+import jwt  # noqa: E402
+from auth_middleware import ClientAuth  # noqa: E402
+from legacy import legacy_check_client  # noqa: E402
+
+SECRET, ALGORITHM = "bench-secret", "HS256"
+
+
+def agents(n):
+    macs = [f"AA:BB:{i >> 16 & 255:02X}:{i >> 8 & 255:02X}:{i & 255:02X}" for i in range(n)]
+    ips = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(n)]
+    return macs, ips
+
+
+def per_call(fn, requests):
+    t0 = time.perf_counter()
+    for _ in range(requests):
+        fn()
+    return (time.perf_counter() - t0) / requests
+
+
+def run(n, requests):
+    macs, ips = agents(n)
+    token = jwt.encode(
+        {"ip": ips[-1], "exp": datetime.utcnow() + timedelta(hours=1)}, SECRET, ALGORITHM
+    )
+    mac, ip = macs[-1], ips[-1]
+
+    def old():
+        return legacy_check_client(token, mac, ip, SECRET, ALGORITHM, macs, ips)
+
+    new = ClientAuth(SECRET, ALGORITHM, macs, ips)
+    cidrs = sorted({ip.rsplit(".", 1)[0] + ".0/24" for ip in ips})
+    cidr = ClientAuth(SECRET, ALGORITHM, macs, cidrs)
+
+    assert old()[1] is None and new.check(token, mac, ip)[1] is None
+    assert cidr.check(token, mac, ip)[1] is None
+
+    results = {
+        "old": per_call(old, requests),
+        "new": per_call(lambda: new.check(token, mac, ip), requests),
+        "cidr": per_call(lambda: cidr.check(token, mac, ip), requests),
+    }
+    summary = " ".join(f"{k}={v * 1e6:7.2f}us" for k, v in results.items())
+    print(f"[AUTH] agents={n:<6} {summary} ({results['old'] / results['new']:.0f}x)")
+    return results
+
+
+def check_reload():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "allowlist")
+        with open(path, "w") as f:
+            f.write("AA:BB:CC:00:01\n")
+        auth = ClientAuth(SECRET, ALGORITHM, allowlist_file=path, reload_interval=0)
+        token = jwt.encode({"exp": datetime.utcnow() + timedelta(hours=1)}, SECRET, ALGORITHM)
+        assert auth.check(token, "AA:BB:CC:00:01", "192.168.1.7")[1][0] == "Unauthorized IP"
+
+        time.sleep(0.01)
+        with open(path, "a") as f:
+            f.write("192.168.0.0/16  # office\n")
+        assert auth.check(token, "aa:bb:cc:00:01", "192.168.1.7")[1] is None
+        print(f"[AUTH] allowlist file reload ok ({auth.reloads} loads)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="verify_request overhead per request")
+    parser.add_argument("--agents", default="3,1000,10000")
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+
+    check_reload()
+    for n in map(int, args.agents.split(",")):
+        run(n, args.requests)
+
+
+if __name__ == "__main__":
+    main()
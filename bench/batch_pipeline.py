@@ -0,0 +1,72 @@
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import corpus
+
+sys.path.insert(0, corpus.SERVER_DIR)
+
+from legacy import LogAnalyzer as LegacyAnalyzer  # noqa: E402
+from legacy import legacy_init_db, legacy_process_batch  # noqa: E402
+from log_analyzer import LogAnalyzer  # noqa: E402
+from migrations import migrate  # noqa: E402
+from partitions import Partitions  # noqa: E402
+from pipeline import classify_batch, store_batch  # noqa: E402
+
+
+def make_batch(n, seed):
+    batch = list(corpus.generate(n, seed=seed, attack_rate=0.02))
+    for e in batch:
+        e["timestamp"] = "2026-01-01 00:00:00"
+    return batch
+
+
+def new_process_batch(analyzer, conn, batch):
+    store_batch(conn, *classify_batch(analyzer, batch))
+
+
+def run(label, fn, analyzer, batch):
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.sqlite3"))
+        if label == "old":
+            legacy_init_db(conn)
+        else:
+            migrate(conn)
+
+        t0 = time.perf_counter()
+        fn(analyzer, conn, batch)
+        elapsed = time.perf_counter() - t0
+
+        if label == "old":
+            logs = conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0]
+        else:
+            logs = sum(
+                conn.execute(f"SELECT COUNT(*) FROM {db}.logs").fetchone()[0]
+                for _, db in Partitions.of(conn).each(conn)
+            )
+        threats = conn.execute("SELECT COUNT(*) FROM threats").fetchone()[0]
+        conn.close()
+
+    print(
+        f"[BATCH] {label:<4} n={len(batch):<7} {elapsed:8.3f}s "
+        f"{len(batch) / elapsed:>10,.0f} entries/sec  logs={logs} threats={threats}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="analysis_loop batch throughput")
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    for n in map(int, args.sizes.split(",")):
+        batch = make_batch(n, args.seed)
+        run("old", legacy_process_batch, LegacyAnalyzer(), batch)
+        run("new", new_process_batch, LogAnalyzer(), batch)
+
+
+if __name__ == "__main__":
+    main()
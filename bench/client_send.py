@@ -0,0 +1,172 @@
+"""Client send_loop settings: backlog throughput, end-to-end latency, retries.
+
+Drives client/sender.Sender against bench/standin_server. Latency is from
+the moment a line is written to the log file to its arrival at the server.
+The baseline send_loop posted 50 lines per SEND_INTERVAL (2 s), so it was
+capped at 25 lines/sec whatever the settings below.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import corpus
+
+sys.path.insert(0, os.path.join(corpus.ROOT, "client"))
+
+from standin_server import StandinServer  # noqa: E402
+
+import auth as auth_module  # noqa: E402
+from auth import AuthClient  # noqa: E402
+from log_watcher import LogWatcher  # noqa: E402
+from sender import Sender  # noqa: E402
+from spool import Spool  # noqa: E402
+
+PAD = "x" * 120
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def write_lines(path, start, n, rate=None):
+    interval = 1 / rate if rate else 0
+    with open(path, "a") as f:
+        for i in range(start, start + n):
+            f.write(f"{time.time():.6f} seq={i} {PAD}\n")
+            if interval:
+                f.flush()
+                time.sleep(interval)
+
+
+def make_sender(server, log_dir, spool_opts=None, **settings):
+    # auth.py binds SERVER_URL at import; point it at the stand-in
+    auth_module.SERVER_URL = server.url()
+    auth = AuthClient()
+    while not auth.authenticate():
+        time.sleep(0.1)
+
+    watcher = LogWatcher(log_dir, os.path.join(log_dir, ".offsets.json"))
+    spool = Spool(os.path.join(log_dir, "spool"), **(spool_opts or {}))
+    return Sender(
+        auth, watcher, spool, server.url() + "/api/log", "bench", "AA:BB:CC:00:01",
+        "127.0.0.1", encoding="gzip", **settings
+    ).start()
+
+
+def drive(sender, until, timeout):
+    """Run sender.poll() in a thread until until() or timeout; True if met."""
+    done = threading.Event()
+
+    def loop():
+        while not done.is_set():
+            sender.poll()
+
+    t = threading.Thread(target=loop, daemon=True)
+    t.start()
+
+    deadline = time.monotonic() + timeout
+    while not until() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    done.set()
+    t.join()
+    return until()
+
+
+def run_sender(server, log_dir, expected, timeout, **settings):
+    sender = make_sender(server, log_dir, **settings)
+    drive(sender, lambda: len(server.lines) >= expected, timeout)
+    return sender
+
+
+def backlog(args, batch_size, in_flight):
+    with tempfile.TemporaryDirectory() as d:
+        server = StandinServer(service_time=args.service_ms / 1000).up()
+        write_lines(os.path.join(d, "app.log"), 0, args.backlog)
+
+        t0 = time.perf_counter()
+        sender = run_sender(
+            server, d, args.backlog, 120, batch_size=batch_size, linger=0.2, in_flight=in_flight
+        )
+        elapsed = time.perf_counter() - t0
+        server.down()
+
+    got = len(server.lines)
+    print(
+        f"[SEND] backlog batch={batch_size:<5} in_flight={in_flight} "
+        f"{got / elapsed:>9,.0f} lines/sec  ({got}/{args.backlog}, {sender.retries} retries)"
+    )
+    return got / elapsed
+
+
+def latency(args, linger):
+    with tempfile.TemporaryDirectory() as d:
+        server = StandinServer(service_time=args.service_ms / 1000).up()
+        n = int(args.rate * args.seconds)
+        writer = threading.Thread(
+            target=write_lines, args=(os.path.join(d, "app.log"), 0, n, args.rate)
+        )
+        writer.start()
+        run_sender(server, d, n, args.seconds + 30, batch_size=500, linger=linger, in_flight=4)
+        writer.join()
+        server.down()
+
+    lat = server.latencies
+    print(
+        f"[SEND] {args.rate:.0f} lines/sec linger={linger:<5} "
+        f"p50={percentile(lat, 0.5) * 1000:7.1f}ms p99={percentile(lat, 0.99) * 1000:7.1f}ms "
+        f"({len(lat)}/{n})"
+    )
+
+
+def faults(args):
+    with tempfile.TemporaryDirectory() as d:
+        server = StandinServer(busy_rate=0.2, lost_rate=0.1).up()
+        n = 20_000
+        write_lines(os.path.join(d, "app.log"), 0, n)
+        sender = run_sender(
+            server,
+            d,
+            n,
+            120,
+            batch_size=200,
+            linger=0.1,
+            in_flight=4,
+            retry_base=0.01,
+            retry_max=0.2,
+        )
+        server.down()
+
+    assert len(server.lines) == n and server.duplicate_lines == 0, (
+        len(server.lines),
+        server.duplicate_lines,
+    )
+    print(
+        f"[SEND] 20% busy / 10% lost responses: {n} lines delivered exactly once, "
+        f"{sender.retries} retries, {server.duplicate_batches} duplicate batches dropped"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="client Sender settings")
+    parser.add_argument("--backlog", type=int, default=100_000)
+    parser.add_argument("--service-ms", type=float, default=5.0)
+    parser.add_argument("--rate", type=float, default=200)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    faults(args)
+    for batch_size, in_flight in ((50, 1), (500, 1), (500, 4), (2000, 4)):
+        backlog(args, batch_size, in_flight)
+    for linger in (0.05, 0.2, 1.0):
+        latency(args, linger)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Wire bytes and server decode CPU per event for /api/log batch formats.
+
+json is the old body ({"events": [...]}, client fields on every event);
+ndjson/gzip/zstd are client/transport.encode_batch bodies decoded with
+server/batch_codec.read_batch. Server CPU covers body decode and
+to_entry, not Flask's request handling, which is the same for every format.
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+import corpus
+
+sys.path.insert(0, corpus.SERVER_DIR)
+sys.path.insert(0, os.path.join(corpus.ROOT, "client"))
+
+from batch_codec import read_batch  # noqa: E402
+from pipeline import to_entry  # noqa: E402
+from transport import LOCAL_ENCODINGS, encode_batch  # noqa: E402
+
+CLIENT_ID, MAC, IP = "client1", "AA:BB:CC:00:01", "172.28.0.2"
+NOW = "2026-01-01 00:00:00"
+MAX_BYTES = 1 << 30
+
+
+def decode_json(body, headers):
+    return [to_entry(e, NOW) for e in json.loads(body)["events"]]
+
+
+def decode_ndjson(body, headers):
+    events, _ = read_batch(
+        io.BytesIO(body),
+        headers.get("Content-Encoding"),
+        {"client_id": CLIENT_ID, "mac": MAC, "ip": IP},
+        MAX_BYTES,
+    )
+    return [to_entry(e, NOW) for e in events]
+
+
+def cpu_per_batch(fn, min_time=0.5):
+    runs = 0
+    t0 = time.process_time()
+    while True:
+        fn()
+        runs += 1
+        elapsed = time.process_time() - t0
+        if elapsed >= min_time:
+            return elapsed / runs
+
+
+def encode_identity(chunk):
+    body = "\n".join(json.dumps({"message": m}) for m in chunk).encode()
+    return body, {"Content-Type": "application/x-ndjson"}
+
+
+def encoder(encoding):
+    if encoding == "identity":
+        return encode_identity
+    return lambda chunk: encode_batch(chunk, encoding, CLIENT_ID, MAC, IP)
+
+
+def run(batch_size, batches, seed):
+    messages = [
+        e["message"] for e in corpus.generate(batch_size * batches, seed=seed, clients=1)
+    ]
+    chunks = [messages[i : i + batch_size] for i in range(0, len(messages), batch_size)]
+
+    formats = [("json", None, decode_json), ("ndjson", "identity", decode_ndjson)]
+    formats += [(e, e, decode_ndjson) for e in reversed(LOCAL_ENCODINGS)]
+
+    results = {}
+    for label, encoding, decode in formats:
+        encode = encoder(encoding)
+        encoded = [encode(chunk) for chunk in chunks]
+        assert [e["message"] for e in decode(*encoded[0])] == chunks[0]
+
+        wire = sum(len(body) for body, _ in encoded)
+        encode_cpu = cpu_per_batch(lambda: [encode(c) for c in chunks])
+        decode_cpu = cpu_per_batch(lambda: [decode(*b) for b in encoded])
+
+        n = len(messages)
+        results[label] = {
+            "bytes_per_event": wire / n,
+            "client_us_per_event": encode_cpu / n * 1e6,
+            "server_us_per_event": decode_cpu / n * 1e6,
+        }
+
+    base = results["json"]["bytes_per_event"]
+    for label, r in results.items():
+        print(
+            f"[COMPRESS] batch={batch_size:<5} {label:<7} "
+            f"{r['bytes_per_event']:7.1f} B/event ({base / r['bytes_per_event']:5.1f}x less) "
+            f"client {r['client_us_per_event']:6.2f} us/event "
+            f"server {r['server_us_per_event']:6.2f} us/event"
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/api/log batch encodings")
+    parser.add_argument("--batch-sizes", default="50,500,5000")
+    parser.add_argument("--events", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if "zstd" not in LOCAL_ENCODINGS:
+        print("[COMPRESS] zstandard not installed, zstd skipped")
+
+    for size in map(int, args.batch_sizes.split(",")):
+        run(size, max(1, args.events // size), args.seed)
+
+
+if __name__ == "__main__":
+    main()
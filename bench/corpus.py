@@ -0,0 +1,160 @@
+import os
+import random
+import re
+import uuid
+from datetime import datetime, timedelta
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER_DIR = os.path.join(ROOT, "server")
+GENERATOR_CONFIG = os.path.join(ROOT, "client", "generator-config.yaml")
+
+USERNAMES = ["guest", "admin"]
+
+# the stock templates never put "IP:" next to a failed login or rate limit,
+# so without these the sliding-window rules are never exercised
+ATTACK_TEMPLATES = [
+    (
+        "auth-service",
+        "Failed login attempt for {USERNAME} - IP: {ATTACKIP} - Attempts: {attempt}/5",
+    ),
+    ("rate-limiter", "Rate limit exceeded for /login - IP: {ATTACKIP}"),
+    (
+        "behavior-analyzer",
+        "Suspicious device behavior: Device {DEVICEID} - Pattern: traffic spike",
+    ),
+    ("auth-service", "User {USERNAME} login successful from {ATTACKIP} - Method: password"),
+    ("api-gateway", "HTTP POST /admin - 503 12ms - IP: {ATTACKIP} - User: {USERNAME}"),
+]
+
+FIELD_RE = re.compile(r"\{\{(.+?)\}\}")
+PLACEHOLDER_RE = re.compile(r"\{(\w+)\}")
+
+
+def load_templates(path=GENERATOR_CONFIG):
+    with open(path) as f:
+        config = yaml.safe_load(f)
+
+    templates = []
+    for generator in config["generators"].values():
+        if not generator.get("enabled"):
+            continue
+        for t in generator.get("templates", []):
+            weight = generator.get("frequency", 1) * t.get("probability", 1)
+            service = t.get("metadata", {}).get("component", "system")
+            templates.append(
+                (weight, service, t["messageTemplate"], t.get("fields", {}), t.get("level"))
+            )
+    return templates
+
+
+def _render_field(expr, rng):
+    m = FIELD_RE.fullmatch(str(expr))
+    if not m:
+        return str(expr)
+
+    call = m.group(1)
+    if call.startswith("random.arrayElement"):
+        items = call[call.index("[") + 1 : call.rindex("]")].split(",")
+        return rng.choice(items).strip().strip("'\"")
+    if call.startswith("random.int"):
+        lo, hi = call[call.index("(") + 1 : call.index(")")].split(",")
+        return str(rng.randint(int(lo), int(hi)))
+    if call == "faker.string.uuid":
+        return str(uuid.UUID(int=rng.getrandbits(128)))
+    if call == "faker.internet.ip":
+        return ".".join(str(rng.randint(1, 254)) for _ in range(4))
+    if call.startswith("faker.string.hexadecimal"):
+        return "%032x" % rng.getrandbits(128)
+    return call.split(".")[-1]
+
+
+def _render(template, fields, values, rng):
+    def sub(m):
+        name = m.group(1)
+        if name in values:
+            return values[name]
+        if name in fields:
+            return _render_field(fields[name], rng)
+        return m.group(0)
+
+    return PLACEHOLDER_RE.sub(sub, template)
+
+
+def generate(
+    n, seed=1, attack_rate=0.0, clients=3, start=None, step=0.01, warn_rate=None
+):
+    """Deterministic stream of event dicts shaped like the client sends them.
+
+    attack_rate is the share of synthetic ATTACK_TEMPLATES lines. warn_rate,
+    if given, fixes the share of the config's WARN/ERROR templates instead
+    of the weights generator-config.yaml implies.
+    """
+    rng = random.Random(seed)
+    templates = load_templates()
+    weights = [t[0] for t in templates]
+    if warn_rate is not None:
+        bad = sum(w for w, *_, level in templates if level in ("WARN", "ERROR"))
+        good = sum(weights) - bad
+        weights = [
+            w * warn_rate / bad if level in ("WARN", "ERROR") else w * (1 - warn_rate) / good
+            for w, *_, level in templates
+        ]
+    start = start or datetime(2026, 1, 1)
+
+    hosts = [
+        (f"client{i + 1}", f"AA:BB:CC:00:{i + 1:02d}", f"172.28.0.{i + 2}")
+        for i in range(clients)
+    ]
+    attack_ips = [f"10.0.{i}.{j}" for i in range(4) for j in range(1, 9)]
+    devices = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(16)]
+
+    for i in range(n):
+        client_id, mac, ip = hosts[rng.randrange(clients)]
+        values = {
+            "USERNAME": rng.choice(USERNAMES),
+            "USERID": rng.choice(USERNAMES),
+            "CLIENTIP": ip,
+            "SESSIONID": ip,
+            "ATTACKIP": rng.choice(attack_ips),
+            "DEVICEID": rng.choice(devices),
+            "attempt": str(rng.randint(1, 3)),
+        }
+
+        if attack_rate and rng.random() < attack_rate:
+            service, template = rng.choice(ATTACK_TEMPLATES)
+            fields = {}
+        else:
+            _, service, template, fields, _ = rng.choices(templates, weights)[0]
+
+        message = _render(template, fields, values, rng)
+        ts = start + timedelta(seconds=i * step)
+        # same layout as client/log_formatter.format_syslog
+        line = (
+            f"{ts.strftime('%b %d %H:%M:%S')} {client_id}@{ip} "
+            f"{service}[{rng.randint(0, 9999)}]: {message}"
+        )
+
+        yield {"client_id": client_id, "mac": mac, "ip": ip, "message": line}
+
+
+def lines(n, **kwargs):
+    return [e["message"] for e in generate(n, **kwargs)]
+
+
+def jsonl_records(n, seed=1):
+    """Generator-shaped .jsonl records, placeholders left for format_syslog."""
+    rng = random.Random(seed)
+    templates = load_templates()
+    weights = [t[0] for t in templates]
+    for i in range(n):
+        _, service, template, fields, level = rng.choices(templates, weights)[0]
+        yield {
+            "timestamp": f"2026-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}Z",
+            "level": level,
+            "message": _render(template, fields, {}, rng),
+            "source": {"service": service},
+            "metadata": {"correlationId": f"{i:08x}"},
+            "seq": i,
+        }
@@ -0,0 +1,127 @@
+"""Correlation: LIKE-scan correlate_attacks vs event_type + Correlator.
+
+Fills migrated day partitions through the real pipeline (LogAnalyzer
+levels, build_rows event types), then:
+
+- stream: Correlator.feed over the rows in ingest-sized batches, rows/sec
+- batch: correlation.correlate_history over the table, twice; the second
+  run must add nothing, and it must raise the same incidents as stream
+- baseline: the old correlate_attacks over the same rows in one logs
+  table, twice
+- backfill: classifying a table stored without event_type
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import corpus
+
+sys.path.insert(0, corpus.SERVER_DIR)
+
+from correlation import Correlator, backfill_event_types, correlate_history  # noqa: E402
+from legacy import legacy_correlate_attacks  # noqa: E402
+from log_analyzer import LogAnalyzer  # noqa: E402
+from migrations import migrate  # noqa: E402
+from partitions import Partitions  # noqa: E402
+from pipeline import build_rows  # noqa: E402
+
+
+def make_rows(n, seed, clients, batch_size):
+    events = list(corpus.generate(n, seed=seed, attack_rate=0.02, clients=clients))
+    start = datetime(2026, 1, 1)
+    for i, e in enumerate(events):
+        e["timestamp"] = (start + timedelta(seconds=i * 0.1)).strftime("%Y-%m-%d %H:%M:%S")
+
+    analyzer = LogAnalyzer()
+    batches = []
+    for i in range(0, n, batch_size):
+        batch = events[i : i + batch_size]
+        rows, _ = build_rows(batch, analyzer.analyze_batch([e["message"] for e in batch]))
+        batches.append(rows)
+    return batches
+
+
+def incident_keys(conn):
+    return {
+        r[0] for r in conn.execute("SELECT dedup_key FROM threats WHERE dedup_key IS NOT NULL")
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="correlation engine")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    batches = make_rows(args.rows, args.seed, args.clients, args.batch_size)
+
+    correlator = Correlator()
+    t0 = time.perf_counter()
+    streamed = [i for rows in batches for i in correlator.feed(rows)]
+    elapsed = time.perf_counter() - t0
+    streamed_keys = {i[6] for i in streamed}
+    assert len(streamed_keys) == len(streamed)
+    print(
+        f"[CORRELATE] stream: {args.rows / elapsed:,.0f} rows/sec, "
+        f"{len(streamed)} incidents, {correlator.stats()['tracked']} pairs tracked"
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.sqlite3"))
+        migrate(conn)
+        partitions = Partitions.of(conn)
+        for rows in batches:
+            partitions.prepare(conn, partitions.days_of(rows))
+            with conn:
+                partitions.insert(conn, rows)
+
+        for run in (1, 2):
+            t0 = time.perf_counter()
+            added = correlate_history(conn)
+            print(
+                f"[CORRELATE] batch run {run}: {(time.perf_counter() - t0) * 1000:8.1f}ms, "
+                f"{added} new incidents"
+            )
+        assert incident_keys(conn) == streamed_keys
+
+        # the baseline reads the main database's logs table
+        for _, db in partitions.each(conn):
+            with conn:
+                conn.execute(
+                    "INSERT INTO main.logs (id, timestamp, client_id, mac, ip, level, message, "
+                    f"event_type) SELECT id, timestamp, client_id, mac, ip, level, message, "
+                    f"event_type FROM {db}.logs"
+                )
+        for run in (1, 2):
+            t0 = time.perf_counter()
+            added = legacy_correlate_attacks(conn, "")
+            print(
+                f"[CORRELATE] baseline run {run}: {(time.perf_counter() - t0) * 1000:8.1f}ms, "
+                f"{added} threats inserted"
+            )
+        with conn:
+            conn.execute("DELETE FROM main.logs")
+
+        for _, db in partitions.each(conn, write=True):
+            with conn:
+                conn.execute(f"UPDATE {db}.logs SET event_type = NULL")
+        t0 = time.perf_counter()
+        backfill_event_types(conn, chunk_size=100_000)
+        print(
+            f"[CORRELATE] backfill: {args.rows / (time.perf_counter() - t0):,.0f} rows/sec"
+        )
+        conn.execute("DELETE FROM threats")
+        assert correlate_history(conn) == len(streamed_keys)
+        conn.close()
+    print("[CORRELATE] stream, batch and backfilled batch raise the same incidents")
+
+
+if __name__ == "__main__":
+    main()
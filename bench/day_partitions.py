@@ -0,0 +1,265 @@
+"""Day partitions: one logs file per day vs one logs table in db.sqlite3.
+
+Fills both layouts with the same rows spread over --days days (logs,
+indexes, logs_fts and rollups in both), then:
+
+- ingest: rows/sec into each layout, batch by batch
+- queries: the CLI `logs` / `logs user` / `logs level` commands and a
+  last-day count, the single table vs fanning out over the partitions
+- retention: dropping the oldest day while a writer keeps ingesting, as
+  DELETE + VACUUM on the single table vs Partitions.drop deleting a
+  file; how long it takes and the longest the writer waited on a batch.
+  rollups.check must find nothing after the drop
+- freeze: Partitions.maintain compacting the cold days, time and size
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import corpus
+
+sys.path.insert(0, corpus.SERVER_DIR)
+
+import rollups  # noqa: E402
+from migrations import migrate  # noqa: E402
+from partitions import Partitions, shift_day  # noqa: E402
+from pipeline import parser, store_batch  # noqa: E402
+from storage import connect  # noqa: E402
+from syslog_parser import COLUMNS  # noqa: E402
+
+START = datetime(2026, 1, 1)
+
+PLAIN_INSERT = """
+    INSERT INTO logs (timestamp, client_id, mac, ip, level, message, event_type)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+# (where, params) of the CLI logs commands, newest 20 first
+LOGS_QUERIES = {
+    "logs": ("", []),
+    "logs user": ("WHERE client_id=?", ["client2"]),
+    "logs level": ("WHERE level=?", ["THREAT"]),
+}
+LOGS_SQL = (
+    "SELECT timestamp, client_id, level, message FROM {db}.logs "
+    "{where} ORDER BY timestamp DESC LIMIT ?"
+)
+
+
+def make_rows(n, days, seed):
+    """n rows in build_rows layout, parsed columns included, over days days."""
+    sample = list(corpus.generate(20_000, seed=seed, attack_rate=0.02, clients=50))
+    parsed = [tuple(parser.parse(e["message"])[: len(COLUMNS)]) for e in sample]
+    levels = ["INFO"] * 90 + ["WARNING"] * 8 + ["THREAT"] * 2
+    step = days * 86400 / n
+    rows = []
+    for i in range(n):
+        e = sample[i % len(sample)]
+        ts = (START + timedelta(seconds=i * step)).strftime("%Y-%m-%d %H:%M:%S")
+        row = (ts, e["client_id"], e["mac"], e["ip"], levels[i % 100], e["message"])
+        rows.append(row + parsed[i % len(sample)])
+    return rows
+
+
+def single_insert(conn, rows):
+    # the writer before partitions: logs, logs_fts by id range, rollups
+    with conn:
+        last = conn.execute("SELECT COALESCE(MAX(id), 0) FROM logs").fetchone()[0]
+        conn.executemany(PLAIN_INSERT, [r[:7] for r in rows])
+        conn.execute(
+            "INSERT INTO logs_fts (rowid, message) SELECT id, message FROM logs WHERE id > ?",
+            (last,),
+        )
+        rollups.add_logs(conn, rows)
+
+
+def fill(path, rows, batch_size, partitioned):
+    conn = connect(path)
+    migrate(conn)
+    t0 = time.perf_counter()
+    for i in range(0, len(rows), batch_size):
+        if partitioned:
+            store_batch(conn, rows[i : i + batch_size], [])
+        else:
+            single_insert(conn, rows[i : i + batch_size])
+    elapsed = time.perf_counter() - t0
+    conn.close()
+    return elapsed
+
+
+def recent_logs(conn, where, params, partitioned, n=20):
+    if not partitioned:
+        return conn.execute(LOGS_SQL.format(db="main", where=where), params + [n]).fetchall()
+    # AdminCLI.show_logs: newest day first, until there are n rows
+    rows = []
+    for _, db in Partitions.of(conn).each(conn, newest_first=True):
+        rows += conn.execute(
+            LOGS_SQL.format(db=db, where=where), params + [n - len(rows)]
+        ).fetchall()
+        if len(rows) >= n:
+            break
+    return rows
+
+
+def last_day_count(conn, since, partitioned):
+    sql = "SELECT COUNT(*) FROM {db}.logs WHERE timestamp >= ?"
+    if not partitioned:
+        return conn.execute(sql.format(db="main"), (since,)).fetchone()[0]
+    return sum(
+        conn.execute(sql.format(db=db), (since,)).fetchone()[0]
+        for _, db in Partitions.of(conn).each(conn, since=since)
+    )
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def ingest_while(path, rows, partitioned, stop, waits):
+    """Keep writing batches of rows until stop is set, record each batch's time."""
+    conn = connect(path)
+    i = 0
+    while not stop.is_set():
+        batch = rows[i % len(rows) : i % len(rows) + 500]
+        t0 = time.perf_counter()
+        if partitioned:
+            store_batch(conn, batch, [])
+        else:
+            single_insert(conn, batch)
+        waits.append(time.perf_counter() - t0)
+        i += 500
+    conn.close()
+
+
+def single_drop(conn, before):
+    # rows and their logs_fts entries, rollups, then VACUUM for the space
+    with conn:
+        conn.execute(
+            "INSERT INTO logs_fts (logs_fts, rowid, message) "
+            "SELECT 'delete', id, message FROM logs WHERE timestamp < ?",
+            (before,),
+        )
+        gone = conn.execute(
+            "DELETE FROM logs WHERE timestamp < ? "
+            "RETURNING timestamp, client_id, mac, ip, level, message, event_type",
+            (before,),
+        ).fetchall()
+        rollups.add_logs(conn, gone, -1)
+    conn.execute("VACUUM")
+
+
+def retention(path, rows, partitioned, days):
+    first_day = rows[0][0][:10]
+    last_day = shift_day(first_day, days - 1)
+    # the writer keeps adding rows for the last day meanwhile
+    live = [(last_day + r[0][10:],) + r[1:] for r in rows[-5000:]]
+    stop, waits = threading.Event(), []
+    writer = threading.Thread(target=ingest_while, args=(path, live, partitioned, stop, waits))
+    writer.start()
+    time.sleep(0.5)
+    before = len(waits)
+
+    conn = connect(path)
+    t0 = time.perf_counter()
+    if partitioned:
+        Partitions.of(conn).drop(conn, first_day)
+    else:
+        single_drop(conn, shift_day(first_day, 1))
+    elapsed = time.perf_counter() - t0
+    time.sleep(0.5)
+    stop.set()
+    writer.join()
+
+    if partitioned:
+        diffs = rollups.check(conn, Partitions.of(conn))
+        assert not any(diffs.values()), diffs
+    conn.close()
+    during = waits[before:] or [0.0]
+    return elapsed, max(during), len(waits)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="day partitions vs one logs table")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows, args.days, args.seed)
+    last_day = shift_day(rows[0][0][:10], args.days - 1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {False: os.path.join(tmp, "single.sqlite3"), True: os.path.join(tmp, "day.sqlite3")}
+        for partitioned, path in paths.items():
+            elapsed = fill(path, rows, args.batch_size, partitioned)
+            label = "partitions" if partitioned else "single"
+            print(f"[PARTITIONS] ingest {label:<10} {args.rows / elapsed:>10,.0f} rows/sec")
+
+        conns = {p: connect(path) for p, path in paths.items()}
+        for name, (where, params) in LOGS_QUERIES.items():
+            t = {
+                p: best_of(args.repeat, lambda: recent_logs(c, where, params, p))
+                for p, c in conns.items()
+            }
+            assert t[False][1] == t[True][1], name
+            print(
+                f"  {name:<12} single={t[False][0] * 1000:8.2f}ms "
+                f"partitions={t[True][0] * 1000:8.2f}ms"
+            )
+        t = {
+            p: best_of(args.repeat, lambda: last_day_count(c, last_day, p))
+            for p, c in conns.items()
+        }
+        assert t[False][1] == t[True][1]
+        print(
+            f"  {'last day':<12} single={t[False][0] * 1000:8.2f}ms "
+            f"partitions={t[True][0] * 1000:8.2f}ms ({t[True][1]:,} rows)"
+        )
+        for conn in conns.values():
+            conn.close()
+
+        for partitioned, path in paths.items():
+            elapsed, stall, batches = retention(path, rows, partitioned, args.days)
+            how = "drop file" if partitioned else "DELETE + VACUUM"
+            print(
+                f"[PARTITIONS] drop oldest day, {how:<15} {elapsed * 1000:9.1f}ms, "
+                f"writer's longest batch meanwhile {stall * 1000:8.1f}ms ({batches} batches)"
+            )
+
+        partitions = Partitions(paths[True])
+        sizes = dict((day, size) for day, size, _ in partitions.stats())
+        conn = connect(paths[True])
+        t0 = time.perf_counter()
+        done = partitions.maintain(conn, hot_days=2, now=last_day)
+        elapsed = time.perf_counter() - t0
+        conn.close()
+        frozen = done["frozen"]
+        after = dict((day, size) for day, size, _ in partitions.stats())
+        assert frozen and all(partitions.is_cold(day) for day in frozen)
+        print(
+            f"[PARTITIONS] froze {len(frozen)} days in {elapsed:.1f}s "
+            f"({elapsed / len(frozen) * 1000:.0f}ms/day), "
+            f"{sum(sizes[d] for d in frozen) / 1e6:.1f}MB -> "
+            f"{sum(after[d] for d in frozen) / 1e6:.1f}MB"
+        )
+        # frozen files still answer queries
+        conn = connect(paths[True])
+        assert last_day_count(conn, frozen[0], True)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
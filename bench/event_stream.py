@@ -0,0 +1,184 @@
+"""EventStream: generator events from a pipe or socket, no files in between.
+
+- check: a pipe fed in pieces, with a partial last line and invalid
+  records, and a socket connection both come out once and in order; a
+  full queue blocks the reader until the sender catches up.
+- throughput: events/sec per client core from generator output to lines
+  the sender reads, files mode (.jsonl → JsonlConverter → .log →
+  LogWatcher) vs stream mode (pipe → EventStream). The writer standing in
+  for the generator is not counted.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import corpus
+
+sys.path.insert(0, os.path.join(corpus.ROOT, "client"))
+
+from event_stream import EventStream  # noqa: E402
+from log_formatter import JsonlConverter  # noqa: E402
+from log_watcher import LogWatcher  # noqa: E402
+
+
+def drain(source, n, timeout=30.0):
+    out = []
+    deadline = time.monotonic() + timeout
+    while len(out) < n and time.monotonic() < deadline:
+        entries = source.read_new()
+        if not entries:
+            source.wait(0.5)
+        out.extend(e["line"] for e in entries)
+    return out
+
+
+def check():
+    recs = [json.dumps(r) for r in corpus.jsonl_records(300)]
+
+    r, w = os.pipe()
+    s = EventStream("gen")
+    with open(r, "rb") as rf:
+        reader = threading.Thread(target=s.feed, args=(rf,))
+        reader.start()
+        with open(w, "wb", buffering=0) as wf:
+            wf.write(("\n".join(recs[:100]) + "\n" + recs[100][:40]).encode())
+            assert len(drain(s, 100)) == 100
+            wf.write((recs[100][40:] + "\nnot json\n[1]\n").encode())
+            wf.write("\n".join(recs[101:]).encode())  # no trailing newline
+        reader.join()
+    lines = drain(s, 200)
+    assert len(lines) == 200 and s.invalid == 2, (len(lines), s.invalid)
+    assert s.received == 300
+    for i, line in enumerate(lines, 100):
+        assert line.startswith(f"Jan 01 00:{i // 60:02d}:{i % 60:02d} "), i
+
+    # socket: same events over a TCP connection
+    s = EventStream("gen")
+    host, port = s.serve(("127.0.0.1", 0))
+    with socket.create_connection((host, port)) as conn:
+        conn.sendall(("\n".join(recs) + "\n").encode())
+    lines = drain(s, 300)
+    s.close()
+    assert len(lines) == 300, len(lines)
+    assert [line.split(" ", 3)[2] for line in lines[:3]] == ["00:00:00", "00:00:01", "00:00:02"]
+
+    # backpressure: one queued chunk, the reader waits for read_new
+    r, w = os.pipe()
+    s = EventStream("gen", max_chunks=1)
+    with open(r, "rb") as rf, open(w, "wb", buffering=0) as wf:
+        reader = threading.Thread(target=s.feed, args=(rf,), daemon=True)
+        reader.start()
+        for rec in recs[:3]:
+            wf.write((rec + "\n").encode())
+            time.sleep(0.05)
+        assert s.received == 2, s.received  # second chunk blocked in put()
+        assert len(drain(s, 3)) == 3
+    reader.join(5)
+    assert not reader.is_alive()
+    print("[STREAM] partial lines/invalid/socket/backpressure ok")
+
+
+class Timed(threading.Thread):
+    """A thread that records the CPU seconds it used."""
+
+    def __init__(self, target):
+        super().__init__(daemon=True)
+        self._target_fn = target
+        self.cpu = 0.0
+
+    def run(self):
+        t0 = time.thread_time()
+        try:
+            self._target_fn()
+        finally:
+            self.cpu = time.thread_time() - t0
+
+
+def run_files(payload, n):
+    with tempfile.TemporaryDirectory() as d:
+        conv = JsonlConverter(d, os.path.join(d, ".jsonl-offsets.json"))
+        watcher = LogWatcher(d, os.path.join(d, ".offsets.json"))
+        done = threading.Event()
+
+        def convert():
+            while not done.is_set():
+                if not conv.convert_new():
+                    conv.watcher.wait(0.1)
+
+        got = []
+        converter = Timed(convert)
+        consumer = Timed(lambda: got.extend(drain(watcher, n, timeout=300)))
+
+        def write():
+            with open(os.path.join(d, "gen.jsonl"), "ab") as f:
+                for chunk in payload:
+                    f.write(chunk)
+                    f.flush()
+
+        t0 = time.perf_counter()
+        converter.start()
+        consumer.start()
+        write()
+        consumer.join()
+        elapsed = time.perf_counter() - t0
+        done.set()
+        converter.join()
+        conv.close()
+        watcher.close()
+    assert len(got) == n, len(got)
+    return elapsed, converter.cpu + consumer.cpu
+
+
+def run_stream(payload, n):
+    s = EventStream("gen")
+    r, w = os.pipe()
+    got = []
+    with open(r, "rb") as rf:
+        reader = Timed(lambda: s.feed(rf))
+        consumer = Timed(lambda: got.extend(drain(s, n, timeout=300)))
+        t0 = time.perf_counter()
+        reader.start()
+        consumer.start()
+        with open(w, "wb") as wf:
+            for chunk in payload:
+                wf.write(chunk)
+                wf.flush()
+        consumer.join()
+        elapsed = time.perf_counter() - t0
+        reader.join()
+    assert len(got) == n, len(got)
+    return elapsed, reader.cpu + consumer.cpu
+
+
+def throughput(args):
+    recs = [json.dumps(r) + "\n" for r in corpus.jsonl_records(args.events)]
+    # the generator flushes in batches of output.batching.maxBatchSize
+    payload = [
+        "".join(recs[i : i + args.batch]).encode() for i in range(0, len(recs), args.batch)
+    ]
+    for label, run in (("files", run_files), ("stream", run_stream)):
+        elapsed, cpu = run(payload, len(recs))
+        print(
+            f"[STREAM] {label:<6} {len(recs)} events: {len(recs) / elapsed:>9,.0f} events/sec wall, "
+            f"{len(recs) / cpu:>9,.0f} events/sec per client core ({cpu:.2f}s CPU)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="in-process generator → sender pipeline")
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--batch", type=int, default=200)
+    args = parser.parse_args()
+
+    check()
+    throughput(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import argparse
+import random
+import sys
+import time
+
+import corpus
+
+sys.path.insert(0, corpus.SERVER_DIR)
+
+from log_analyzer import LogAnalyzer  # noqa: E402
+
+
+def live(lines, batch_seconds, step, seed):
+    # arrival order as analysis_loop sees it: fixed-cadence batches with
+    # the events inside each batch shuffled
+    rng = random.Random(seed)
+    per_batch = max(1, int(batch_seconds / step))
+    analyzer = LogAnalyzer()
+    levels = []
+    for i in range(0, len(lines), per_batch):
+        idx = list(range(i, min(i + per_batch, len(lines))))
+        rng.shuffle(idx)
+        got = analyzer.analyze_batch([lines[j] for j in idx])
+        levels.extend(sorted(zip(idx, got)))
+    return [lvl for _, lvl in levels]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="event-time live vs replay verdicts")
+    parser.add_argument("-n", type=int, default=200_000)
+    parser.add_argument("--step", type=float, default=0.05)
+    parser.add_argument("--batch-seconds", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    lines = corpus.lines(args.n, seed=args.seed, attack_rate=0.05, step=args.step)
+
+    live_levels = live(lines, args.batch_seconds, args.step, args.seed)
+
+    t0 = time.perf_counter()
+    replay_levels = LogAnalyzer().analyze_batch(lines)
+    elapsed = time.perf_counter() - t0
+
+    mismatches = sum(a != b for a, b in zip(live_levels, replay_levels))
+    print(
+        f"[EVENT-TIME] {len(lines)} lines spanning {len(lines) * args.step:,.0f}s, "
+        f"replay {len(lines) / elapsed:,.0f} lines/sec, "
+        f"{mismatches} live/replay mismatches"
+    )
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import corpus
+
+sys.path.insert(0, corpus.SERVER_DIR)
+
+from migrations import migrate  # noqa: E402
+
+# the queries AdminCLI.run / correlate_attacks issue
+CLI_QUERIES = {
+    "logs": (
+        "SELECT timestamp, client_id, level, message FROM logs ORDER BY timestamp DESC LIMIT 20",
+        (),
+    ),
+    "logs user": (
+        "SELECT timestamp, client_id, level, message FROM logs WHERE client_id=? "
+        "ORDER BY timestamp DESC LIMIT 20",
+        ("client2",),
+    ),
+    "logs level": (
+        "SELECT timestamp, client_id, level, message FROM logs WHERE level=? "
+        "ORDER BY timestamp DESC LIMIT 20",
+        ("THREAT",),
+    ),
+    "threats N": (
+        "SELECT timestamp, client_id, ip, message FROM threats ORDER BY timestamp DESC LIMIT ?",
+        (10,),
+    ),
+    "watch": (
+        "SELECT timestamp, client_id, ip, message FROM threats WHERE timestamp > ? "
+        "ORDER BY timestamp ASC",
+        ("LAST_MINUTE",),
+    ),
+    "correlate": (
+        "SELECT client_id, ip, COUNT(*) FROM logs WHERE message LIKE '%Failed login attempt%' "
+        "AND timestamp > ? GROUP BY client_id, ip HAVING COUNT(*) >= 5",
+        ("LAST_2_MINUTES",),
+    ),
+    "top-threats": (
+        "SELECT client_id, COUNT(*) FROM threats GROUP BY client_id ORDER BY COUNT(*) DESC LIMIT 10",
+        (),
+    ),
+}
+
+
+def fill(conn, rows, seed):
+    sample = list(corpus.generate(20_000, seed=seed, attack_rate=0.02, clients=50))
+    levels = ["INFO"] * 90 + ["WARNING"] * 8 + ["THREAT"] * 2
+    start = datetime(2026, 1, 1)
+
+    def gen():
+        for i in range(rows):
+            e = sample[i % len(sample)]
+            ts = (start + timedelta(milliseconds=100 * i)).strftime("%Y-%m-%d %H:%M:%S")
+            yield (ts, e["client_id"], e["mac"], e["ip"], levels[i % 100], e["message"])
+
+    conn.executemany(
+        "INSERT INTO logs (timestamp, client_id, mac, ip, level, message) VALUES (?, ?, ?, ?, ?, ?)",
+        gen(),
+    )
+    conn.execute(
+        "INSERT INTO threats (timestamp, client_id, mac, ip, level, message) "
+        "SELECT timestamp, client_id, mac, ip, level, message FROM logs WHERE level = 'THREAT'"
+    )
+    conn.commit()
+    return (start + timedelta(milliseconds=100 * rows)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def time_queries(conn, last_ts, repeat):
+    end = datetime.strptime(last_ts, "%Y-%m-%d %H:%M:%S")
+    marks = {
+        "LAST_MINUTE": (end - timedelta(minutes=1)).strftime("%Y-%m-%d %H:%M:%S"),
+        "LAST_2_MINUTES": (end - timedelta(minutes=2)).strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    results = {}
+    for name, (sql, params) in CLI_QUERIES.items():
+        params = tuple(marks.get(p, p) for p in params)
+        best = None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            elapsed = time.perf_counter() - t0
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = best
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI query latency before/after indexes")
+    parser.add_argument("--rows", default="1000000,10000000")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    for rows in map(int, args.rows.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = sqlite3.connect(os.path.join(tmp, "bench.sqlite3"))
+            migrate(conn, target=1)
+            last_ts = fill(conn, rows, args.seed)
+
+            before = time_queries(conn, last_ts, args.repeat)
+            t0 = time.perf_counter()
+            migrate(conn)
+            migration_time = time.perf_counter() - t0
+            after = time_queries(conn, last_ts, args.repeat)
+            conn.close()
+
+        print(f"[INDEXES] rows={rows:,} migration took {migration_time:.1f}s")
+        for name in CLI_QUERIES:
+            print(
+                f"  {name:<12} before={before[name] * 1000:10.2f}ms "
+                f"after={after[name] * 1000:8.2f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+# Baseline LogAnalyzer kept verbatim as the reference for parity checks and
+# old-vs-new benchmarks. Do not optimise this file.
+import os
+import re
+import time
+from collections import defaultdict, deque
+
+
+class LogAnalyzer:
+    def __init__(self):
+        self.failed_logins = defaultdict(deque)
+        self.rate_limits = defaultdict(deque)
+        self.device_events = defaultdict(deque)
+
+        self.WINDOW = 60  # seconds
+
+        self.patterns = {
+            "FAILED_LOGIN": re.compile(r"Failed login attempt", re.I),
+            "SUCCESS_LOGIN": re.compile(r"login successful", re.I),
+            "ACCOUNT_LOCK": re.compile(r"Account .* locked", re.I),
+            "SUSPICIOUS_LOGIN": re.compile(r"Suspicious login", re.I),
+            "RATE_LIMIT": re.compile(r"Rate limit exceeded", re.I),
+            "ATTEMPTS_HIGH": re.compile(r"Attempts:\s*[4-9]/", re.I),
+            "PASSWORD_CHANGE": re.compile(r"Password changed", re.I),
+            "ADMIN_PATH": re.compile(r"/admin", re.I),
+            "ERROR_5XX": re.compile(r"\s5\d\d\s"),
+            "BACKUP_CORRUPT": re.compile(r"Integrity:\s*CORRUPTED", re.I),
+            "BACKUP_GROWTH": re.compile(r"Backup size increased", re.I),
+            "DEVICE_SUSPICIOUS": re.compile(r"Suspicious device behavior", re.I),
+            "DEVICE_OFFLINE": re.compile(r"Device .* offline", re.I),
+            "FIRMWARE_OUTDATED": re.compile(r"firmware outdated", re.I),
+        }
+
+    def _cleanup(self, dq):
+        now = time.time()
+        while dq and now - dq[0] > self.WINDOW:
+            dq.popleft()
+
+    def _extract_ip(self, line):
+        m = re.search(r"IP:\s*([\d\.]+)", line)
+        return m.group(1) if m else None
+
+    def _extract_device(self, line):
+        m = re.search(r"Device\s+([a-f0-9\-]{8,})", line, re.I)
+        return m.group(1) if m else None
+
+    def analyze_line(self, line: str) -> str:
+        now = time.time()
+        risk = 0
+
+        #  Brute force
+        if self.patterns["FAILED_LOGIN"].search(line):
+            ip = self._extract_ip(line)
+            if ip:
+                self.failed_logins[ip].append(now)
+                self._cleanup(self.failed_logins[ip])
+                risk += 1
+
+                if len(self.failed_logins[ip]) >= 3:
+                    return "THREAT"
+
+        if self.patterns["ATTEMPTS_HIGH"].search(line):
+            return "THREAT"
+
+        if self.patterns["ACCOUNT_LOCK"].search(line):
+            return "THREAT"
+
+        # Suspicious login
+        if self.patterns["SUSPICIOUS_LOGIN"].search(line):
+            risk += 3
+
+        # API abuse / DoS-lite
+        if self.patterns["RATE_LIMIT"].search(line):
+            ip = self._extract_ip(line)
+            if ip:
+                self.rate_limits[ip].append(now)
+                self._cleanup(self.rate_limits[ip])
+                if len(self.rate_limits[ip]) >= 2:
+                    return "THREAT"
+            risk += 2
+
+        if self.patterns["ERROR_5XX"].search(line):
+            risk += 1
+
+        #  Account takeover scenario
+        if self.patterns["SUCCESS_LOGIN"].search(line) and risk >= 3:
+            return "THREAT"
+
+        if self.patterns["PASSWORD_CHANGE"].search(line) and risk >= 3:
+            return "THREAT"
+
+        #  Backup / ransomware indicators
+        if self.patterns["BACKUP_CORRUPT"].search(line):
+            return "THREAT"
+
+        if self.patterns["BACKUP_GROWTH"].search(line):
+            risk += 2
+
+        #  IoT compromise
+        if self.patterns["DEVICE_SUSPICIOUS"].search(line):
+            device = self._extract_device(line)
+            if device:
+                self.device_events[device].append(now)
+                self._cleanup(self.device_events[device])
+                if len(self.device_events[device]) >= 2:
+                    return "THREAT"
+            risk += 3
+
+        if self.patterns["DEVICE_OFFLINE"].search(line):
+            risk += 2
+
+        if self.patterns["FIRMWARE_OUTDATED"].search(line):
+            risk += 1
+
+        if risk >= 5:
+            return "THREAT"
+        elif risk >= 2:
+            return "WARNING"
+
+        return "INFO"
+
+    def analyze_logs(self, lines):
+        results = {
+            "THREAT": [],
+            "WARNING": [],
+            "INFO": [],
+        }
+
+        for line in lines:
+            level = self.analyze_line(line)
+            results[level].append(line)
+
+        return results
+
+
+def legacy_process_batch(analyzer, conn, batch):
+    # analysis_loop body from the baseline server/main.py, minus the sleep
+    results = analyzer.analyze_logs([entry["message"] for entry in batch])
+
+    cur = conn.cursor()
+
+    for entry in batch:
+        level = analyzer.analyze_line(entry["message"])
+        cur.execute(
+            """
+            INSERT INTO logs (timestamp, client_id, mac, ip, level, message)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (
+                entry["timestamp"],
+                entry["client_id"],
+                entry["mac"],
+                entry["ip"],
+                level,
+                entry["message"],
+            ),
+        )
+
+    for threat_msg in results["THREAT"]:
+        for entry in batch:
+            if entry["message"] == threat_msg:
+                cur.execute(
+                    """
+                    INSERT INTO threats (timestamp, client_id, mac, ip, level, message)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        entry["timestamp"],
+                        entry["client_id"],
+                        entry["mac"],
+                        entry["ip"],
+                        "THREAT",
+                        entry["message"],
+                    ),
+                )
+
+    conn.commit()
+
+
+LEGACY_INSERT_LOG = """
+    INSERT INTO logs (timestamp, client_id, mac, ip, level, message)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+
+def legacy_init_db(conn):
+    # schema created by the baseline init_db
+    for table in ("logs", "threats"):
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT,
+                client_id TEXT,
+                mac TEXT,
+                ip TEXT,
+                level TEXT,
+                message TEXT
+            )
+            """
+        )
+    conn.commit()
+
+
+def legacy_check_client(token, mac, client_ip, secret, algorithm, macs, ips):
+    # checks from the baseline verify_request, config lists passed in
+    import jwt
+
+    if not token:
+        return None, ("JWT required", 401)
+    try:
+        payload = jwt.decode(token, secret, algorithms=[algorithm])
+    except:  # noqa: E722
+        return None, ("Invalid token", 401)
+
+    if not mac or mac not in macs:
+        return None, ("Unauthorized MAC", 403)
+
+    if client_ip not in ips:
+        return None, ("Unauthorized IP", 403)
+
+    return payload, None
+
+
+class LegacyLogWatcher:
+    # baseline client/log_watcher.py
+    def __init__(self, log_dir):
+        self.log_dir = log_dir
+        self.positions = {}
+
+    def read_new(self):
+        entries = []
+
+        for filename in os.listdir(self.log_dir):
+            if not filename.endswith(".log"):
+                continue
+
+            path = os.path.join(self.log_dir, filename)
+
+            if not os.path.isfile(path):
+                continue
+
+            if path not in self.positions:
+                self.positions[path] = 0
+
+            with open(path, "r", errors="ignore") as f:
+                f.seek(self.positions[path])
+                lines = f.readlines()
+                self.positions[path] = f.tell()
+
+            for line in lines:
+                line = line.strip()
+                if not line:
+                    continue
+
+                entries.append({"file": filename, "line": line})
+
+        return entries
+
+
+def legacy_jsonl_to_linux_logs_loop(log_dir, format_syslog, stop):
+    # baseline client/log_formatter.py loop, with log_dir passed in and a
+    # stop event so a benchmark can end it
+    import json
+    from pathlib import Path
+
+    used = {}
+
+    def process_file(jsonl_path):
+        out_path = str(jsonl_path).replace(".jsonl", ".log")
+
+        with open(jsonl_path, "r") as src, open(out_path, "w") as dst:
+            for line in src:
+                line = line.strip()
+
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                    dst.write(format_syslog(entry) + "\n")
+                except json.JSONDecodeError:
+                    continue
+
+            used[jsonl_path] = True
+
+    while not stop.is_set():
+        for jsonl_file in Path(log_dir).glob("*.jsonl"):
+            if used.get(jsonl_file) is None:
+                time.sleep(1)
+                process_file(jsonl_file)
+
+                try:
+                    os.remove(jsonl_file)
+                except:  # noqa: E722
+                    pass
+
+
+def legacy_watch_threats(db_path, stop, on_threat, stats):
+    # baseline AdminCLI.watch_threats: a fresh connection and a timestamp
+    # cursor every 2 seconds, with a stop event and a callback for the
+    # benchmark. stats["queries"] counts the polls
+    import sqlite3
+
+    last_check = "1970-01-01 00:00:00"
+    while not stop.is_set():
+        try:
+            conn = sqlite3.connect(db_path)
+            c = conn.cursor()
+            c.execute(
+                """
+                SELECT timestamp, client_id, ip, message
+                FROM threats
+                WHERE timestamp > ?
+                ORDER BY timestamp ASC
+                """,
+                (last_check,),
+            )
+            rows = c.fetchall()
+            conn.close()
+            stats["queries"] = stats.get("queries", 0) + 1
+
+            if rows:
+                for r in rows:
+                    on_threat(r)
+                last_check = rows[-1][0]
+        except Exception as e:
+            print("[ERROR] watch:", e)
+
+        stop.wait(2)
+
+
+def legacy_correlate_attacks(conn, window_start):
+    # baseline AdminCLI.correlate_attacks with the window start passed in:
+    # LIKE over logs, one more LIKE query per suspect, no dedup
+    from datetime import datetime
+
+    inserted = 0
+    c = conn.cursor()
+    c.execute(
+        """
+        SELECT client_id, ip, COUNT(*)
+        FROM logs
+        WHERE message LIKE '%Failed login attempt%'
+          AND timestamp > ?
+        GROUP BY client_id, ip
+        HAVING COUNT(*) >= 5
+        """,
+        (window_start,),
+    )
+    suspects = c.fetchall()
+
+    for client_id, ip, attempts in suspects:
+        c.execute(
+            """
+            SELECT timestamp
+            FROM logs
+            WHERE client_id = ?
+              AND message LIKE '%login successful%'
+              AND timestamp > ?
+            ORDER BY timestamp DESC
+            LIMIT 1
+            """,
+            (client_id, window_start),
+        )
+        success = c.fetchone()
+
+        if success:
+            msg = (
+                f"Bruteforce suspected: {attempts} failed logins "
+                f"followed by successful login"
+            )
+            ts = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+            c.execute(
+                """
+                INSERT INTO threats (timestamp, client_id, mac, ip, level, message)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (ts, client_id, "-", ip, "THREAT", msg),
+            )
+            inserted += 1
+
+    conn.commit()
+    return inserted
+
+
+# baseline AdminCLI.run stats commands, each a scan of logs or threats
+LEGACY_STATS_QUERIES = {
+    "stats": [
+        "SELECT COUNT(*) FROM logs",
+        "SELECT COUNT(*) FROM threats",
+        "SELECT COUNT(DISTINCT client_id) FROM logs",
+    ],
+    "stats levels": ["SELECT level, COUNT(*) FROM logs GROUP BY level"],
+    "clients": ["SELECT DISTINCT client_id, mac FROM logs"],
+    "top-threats": [
+        """
+        SELECT client_id, COUNT(*)
+        FROM threats
+        GROUP BY client_id
+        ORDER BY COUNT(*) DESC
+        LIMIT 10
+        """
+    ],
+}
@@ -0,0 +1,205 @@
+"""log_formatter: jsonl-to-syslog conversion while the generator writes.
+
+- check: lines appended to a .jsonl file in pieces, across a converter
+  restart, all come out once and in order; idle files are removed.
+- idle: CPU used by the converter thread over a quiet directory, baseline
+  loop vs JsonlConverter.
+- throughput: lines/sec converted while a writer appends a large file,
+  and time from a line written to its .log line for a slow writer.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import corpus
+
+sys.path.insert(0, os.path.join(corpus.ROOT, "client"))
+
+from legacy import legacy_jsonl_to_linux_logs_loop  # noqa: E402
+from log_formatter import JsonlConverter, format_syslog  # noqa: E402
+
+
+def converted(path):
+    try:
+        with open(path) as f:
+            return f.read().splitlines()
+    except FileNotFoundError:
+        return []
+
+
+def check(use_inotify):
+    mode = "inotify" if use_inotify else "polling"
+    recs = [json.dumps(r) for r in corpus.jsonl_records(300)]
+    with tempfile.TemporaryDirectory() as d:
+        src = os.path.join(d, "gen.jsonl")
+        out = os.path.join(d, "gen.log")
+        state = os.path.join(d, ".jsonl-offsets.json")
+
+        c = JsonlConverter(d, state, remove_after=0.0, use_inotify=use_inotify)
+        with open(src, "a") as f:
+            f.write("\n".join(recs[:100]) + "\n" + recs[100][:40])
+            f.flush()
+            assert c.convert_new() == 100, mode
+            f.write(recs[100][40:] + "\nnot json\n")
+            f.flush()
+            c.convert_new()
+        assert len(converted(out)) == 101 and c.invalid == 1, mode
+
+        # restart from the checkpoint
+        c.close()
+        with open(src, "a") as f:
+            f.write("\n".join(recs[101:]) + "\n")
+        c = JsonlConverter(d, state, remove_after=0.0, use_inotify=use_inotify)
+        c.convert_new()
+        lines = converted(out)
+        assert len(lines) == 300, (mode, len(lines))
+        # the timestamps encode the input order
+        for i, line in enumerate(lines):
+            assert line.startswith(f"Jan 01 00:{i // 60:02d}:{i % 60:02d} "), (mode, i)
+
+        # fully converted and idle: removed, handles released
+        c._next_idle_check = 0
+        c.convert_new()
+        assert not os.path.exists(src), mode
+        c.convert_new()
+        assert not c.watcher._files and not c._outputs and not c._last_line, mode
+        c.close()
+    print(f"[FORMAT] {mode}: partial lines/invalid/restart/removal ok")
+
+
+def thread_cpu(target, seconds):
+    """CPU seconds a thread running target(stop) uses over seconds."""
+    stop = threading.Event()
+    cpu = []
+
+    def run():
+        t0 = time.thread_time()
+        try:
+            target(stop)
+        finally:
+            cpu.append(time.thread_time() - t0)
+
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    time.sleep(seconds)
+    stop.set()
+    t.join()
+    return cpu[0]
+
+
+def idle(args):
+    with tempfile.TemporaryDirectory() as d:
+        with open(os.path.join(d, "done.log"), "w") as f:
+            f.write("x\n" * 1000)
+
+        legacy = thread_cpu(
+            lambda stop: legacy_jsonl_to_linux_logs_loop(d, format_syslog, stop), args.idle
+        )
+
+        def converter(stop):
+            c = JsonlConverter(d, os.path.join(d, ".jsonl-offsets.json"))
+            while not stop.is_set():
+                if not c.convert_new():
+                    c.watcher.wait(0.5)
+            c.close()
+
+        new = thread_cpu(converter, args.idle)
+    print(
+        f"[FORMAT] idle converter CPU over {args.idle:.0f}s: baseline {legacy / args.idle:6.1%} "
+        f"of a core, JsonlConverter {new / args.idle:6.2%}"
+    )
+
+
+def throughput(args):
+    recs = [json.dumps(r) + "\n" for r in corpus.jsonl_records(args.lines)]
+
+    t0 = time.perf_counter()
+    for r in recs:
+        format_syslog(json.loads(r))
+    parse_rate = len(recs) / (time.perf_counter() - t0)
+
+    with tempfile.TemporaryDirectory() as d:
+        src = os.path.join(d, "gen.jsonl")
+        c = JsonlConverter(d, os.path.join(d, ".jsonl-offsets.json"))
+
+        def write():
+            with open(src, "a") as f:
+                for i in range(0, len(recs), 200):
+                    f.write("".join(recs[i : i + 200]))
+                    f.flush()
+
+        writer = threading.Thread(target=write)
+        t0 = time.perf_counter()
+        writer.start()
+        while c.converted < len(recs):
+            if not c.convert_new():
+                c.watcher.wait(0.5)
+        elapsed = time.perf_counter() - t0
+        writer.join()
+        c.close()
+        out = len(converted(os.path.join(d, "gen.log")))
+    assert out == len(recs), out
+    print(
+        f"[FORMAT] {len(recs)} lines while appended: {len(recs) / elapsed:,.0f} lines/sec "
+        f"(json.loads + format_syslog alone: {parse_rate:,.0f} lines/sec)"
+    )
+
+
+def latency(args):
+    # the baseline converted a file only after it was complete, 1 s later
+    recs = [json.dumps(r) + "\n" for r in corpus.jsonl_records(args.rate * 3)]
+    with tempfile.TemporaryDirectory() as d:
+        src = os.path.join(d, "gen.jsonl")
+        out = os.path.join(d, "gen.log")
+        c = JsonlConverter(d, os.path.join(d, ".jsonl-offsets.json"))
+        stop = threading.Event()
+
+        def convert():
+            while not stop.is_set():
+                if not c.convert_new():
+                    c.watcher.wait(0.5)
+
+        t = threading.Thread(target=convert)
+        t.start()
+        delays = []
+        with open(src, "a") as f:
+            for i, r in enumerate(recs):
+                f.write(r)
+                f.flush()
+                t0 = time.perf_counter()
+                while len(converted(out)) <= i:
+                    time.sleep(0.0002)
+                delays.append(time.perf_counter() - t0)
+                time.sleep(1 / args.rate)
+        stop.set()
+        t.join()
+        c.close()
+    delays.sort()
+    p50 = delays[len(delays) // 2]
+    print(
+        f"[FORMAT] {args.rate} lines/sec writer: line → .log p50 {p50 * 1000:.1f}ms "
+        f"p99 {delays[int(len(delays) * 0.99)] * 1000:.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="jsonl-to-syslog converter")
+    parser.add_argument("--idle", type=float, default=3.0)
+    parser.add_argument("--lines", type=int, default=200_000)
+    parser.add_argument("--rate", type=int, default=50)
+    args = parser.parse_args()
+
+    check(True)
+    check(False)
+    idle(args)
+    throughput(args)
+    latency(args)
+
+
+if __name__ == "__main__":
+    main()
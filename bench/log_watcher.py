@@ -0,0 +1,147 @@
+"""LogWatcher: long-line/rotation/truncation/restart correctness and idle poll cost.
+
+Checks run against both the inotify and the polling mode. The cost part
+compares the baseline watcher with the new one on a directory of idle
+files, and reports peak memory for one large backlog.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import corpus
+
+sys.path.insert(0, os.path.join(corpus.ROOT, "client"))
+
+from legacy import LegacyLogWatcher  # noqa: E402
+from log_watcher import MAX_LINE_BYTES, READ_CHUNK, TRUNCATED, LogWatcher  # noqa: E402
+
+
+def append(path, *lines, end="\n"):
+    with open(path, "a") as f:
+        f.write("\n".join(lines) + end)
+
+
+def lines_of(entries):
+    return [e["line"] for e in entries]
+
+
+def check(use_inotify):
+    mode = "inotify" if use_inotify else "polling"
+    with tempfile.TemporaryDirectory() as d:
+        state = os.path.join(d, ".offsets.json")
+        log = os.path.join(d, "app.log")
+
+        w = LogWatcher(d, state, use_inotify=use_inotify)
+        append(log, "a1", "a2")
+        append(log, "a3-part", end="")
+        assert lines_of(w.read_new()) == ["a1", "a2"], mode
+        append(log, "-rest")
+        assert lines_of(w.read_new()) == ["a3-part-rest"], mode
+
+        # a line over several chunks comes out whole, one over the cap cut
+        long = "L" * (3 * READ_CHUNK)
+        append(log, long[:-10], end="")
+        assert w.read_new() == [], mode
+        append(log, long[-10:], "a3b")
+        assert lines_of(w.read_new()) == [long, "a3b"], mode
+        append(log, "H" * (MAX_LINE_BYTES + 10), "a3c")
+        # the cut line fills MAX_READ_BYTES, the rest follows on the next call
+        got = lines_of(w.read_new()) + lines_of(w.read_new())
+        assert got == ["H" * MAX_LINE_BYTES + TRUNCATED, "a3c"], mode
+
+        # rotation: rename, writer keeps appending to the old inode, new file
+        os.rename(log, log + ".1")
+        append(log + ".1", "a4")
+        append(log, "b1")
+        assert sorted(lines_of(w.read_new())) == ["a4", "b1"], mode
+
+        # copytruncate
+        with open(log, "w") as f:
+            f.write("c1\n")
+        assert lines_of(w.read_new()) == ["c1"], mode
+
+        # restart: resume from the checkpoint, not from 0 and not from EOF
+        w.checkpoint()
+        w.close()
+        append(log, "c2")
+        append(log + ".1", "a5")
+        w = LogWatcher(d, state, use_inotify=use_inotify)
+        assert sorted(lines_of(w.read_new())) == ["a5", "c2"], mode
+
+        # rotated file deleted: released, nothing read twice
+        os.remove(log + ".1")
+        assert w.read_new() == [], mode
+        assert len(w._files) == 1, mode
+        w.close()
+    print(f"[WATCHER] {mode}: append/partial/long/rotate/truncate/restart ok")
+
+
+def per_poll(watcher, polls):
+    t0 = time.perf_counter()
+    for _ in range(polls):
+        watcher.read_new()
+    return (time.perf_counter() - t0) / polls
+
+
+def idle_cost(files, polls):
+    with tempfile.TemporaryDirectory() as d:
+        for i in range(files):
+            append(os.path.join(d, f"log_{i}.log"), *(f"line {j}" for j in range(100)))
+
+        results = {}
+        for label, watcher in (
+            ("old", LegacyLogWatcher(d)),
+            ("polling", LogWatcher(d, use_inotify=False)),
+            ("inotify", LogWatcher(d)),
+        ):
+            watcher.read_new()
+            results[label] = per_poll(watcher, polls)
+        summary = " ".join(f"{k}={v * 1e6:9.1f}us" for k, v in results.items())
+        print(f"[WATCHER] idle poll, {files} files: {summary}")
+
+
+def backlog_memory(mib):
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "big.log")
+        line = "x" * 199
+        with open(path, "w") as f:
+            for _ in range(mib * 1024 * 1024 // 200):
+                f.write(line + "\n")
+
+        for label, watcher in (("old", LegacyLogWatcher(d)), ("new", LogWatcher(d))):
+            tracemalloc.start()
+            read = 0
+            t0 = time.perf_counter()
+            while True:
+                entries = watcher.read_new()
+                if not entries:
+                    break
+                read += len(entries)
+            elapsed = time.perf_counter() - t0
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(
+                f"[WATCHER] {mib} MiB backlog {label}: {read / elapsed:>10,.0f} lines/sec "
+                f"peak {peak / 2**20:6.1f} MiB"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="client LogWatcher checks")
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--polls", type=int, default=200)
+    parser.add_argument("--backlog-mib", type=int, default=64)
+    args = parser.parse_args()
+
+    check(use_inotify=True)
+    check(use_inotify=False)
+    idle_cost(args.files, args.polls)
+    backlog_memory(args.backlog_mib)
+
+
+if __name__ == "__main__":
+    main()
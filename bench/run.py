@@ -0,0 +1,233 @@
+"""Benchmark suite: analyzer, /api/log ingest, DB writer and CLI queries.
+
+    python bench/run.py                       # all suites, default sizes
+    python bench/run.py --suite analyzer,queries --sizes 100000,1000000
+    python bench/run.py --compare bench/results/<older>.json
+
+Every run writes a JSON file to bench/results/ (or --out) so results can be
+compared across commits. Corpora are generated deterministically from
+client/generator-config.yaml with --seed.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import corpus
+
+sys.path.insert(0, corpus.SERVER_DIR)
+# after server/: client/ has its own main.py and config.py
+sys.path.append(os.path.join(corpus.ROOT, "client"))
+
+from log_analyzer import LogAnalyzer  # noqa: E402
+from migrations import migrate  # noqa: E402
+from transport import encode_batch  # noqa: E402
+
+import indexes  # noqa: E402
+import writer  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+# /api/log body -> transport.encode_batch encoding
+INGEST_FORMATS = {"json": None, "gzip": "gzip"}
+
+
+def percentile(values, p):
+    return writer.percentile(values, p)
+
+
+def bench_analyzer(args):
+    results = {}
+    # warn_rate: share of the config's WARN/ERROR (attack) templates,
+    # on top of 2% synthetic window attacks
+    for rate in (0.01, 0.1, 0.3):
+        lines = corpus.lines(args.lines, seed=args.seed, attack_rate=0.02, warn_rate=rate)
+        analyzer = LogAnalyzer()
+        t0 = time.perf_counter()
+        levels = analyzer.analyze_batch(lines)
+        elapsed = time.perf_counter() - t0
+        results[f"warn_rate={rate}"] = {
+            "lines_per_sec": len(lines) / elapsed,
+            "threats": levels.count("THREAT"),
+        }
+        print(f"[ANALYZER] warn_rate={rate:<5} {len(lines) / elapsed:>10,.0f} lines/sec")
+    return results
+
+
+def bench_ingest(args):
+    tmp = tempfile.mkdtemp()
+    os.environ.update(
+        {
+            "DB_PATH": os.path.join(tmp, "db.sqlite3"),
+            "AUTHORIZED_MACS": "AA:BB:CC:00:01",
+            "AUTHORIZED_IPS": "127.0.0.1",
+            "INGEST_QUEUE_CAPACITY": str(len(INGEST_FORMATS) * args.requests * args.batch_size + 1),
+        }
+    )
+    try:
+        import main as server
+    except ImportError as e:
+        print(f"[INGEST] skipped: {e}")
+        return {"skipped": str(e)}
+
+    client = server.app.test_client()
+    client.post("/api/auth")
+
+    events = list(corpus.generate(args.batch_size * 16, seed=args.seed, attack_rate=0.02))
+    results = {}
+    # json is the old {"events": [...]} body, gzip the client's default NDJSON batch
+    for fmt, encoding in INGEST_FORMATS.items():
+        batches = []
+        for i in range(0, len(events), args.batch_size):
+            body, headers = encode_batch(
+                [e["message"] for e in events[i : i + args.batch_size]],
+                encoding,
+                "client1",
+                "AA:BB:CC:00:01",
+                "172.28.0.2",
+            )
+            batches.append((body, {**headers, "X-MAC-ADDRESS": "AA:BB:CC:00:01"}))
+
+        latencies = []
+        statuses = {}
+        t0 = time.perf_counter()
+        for i in range(args.requests):
+            body, headers = batches[i % len(batches)]
+            r0 = time.perf_counter()
+            resp = client.post("/api/log", data=body, headers=headers)
+            latencies.append(time.perf_counter() - r0)
+            statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+        elapsed = time.perf_counter() - t0
+
+        results[fmt] = {
+            "requests_per_sec": args.requests / elapsed,
+            "events_per_sec": args.requests * args.batch_size / elapsed,
+            "p50_ms": percentile(latencies, 0.5) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "statuses": statuses,
+        }
+        result = results[fmt]
+        print(
+            f"[INGEST] {fmt:<5} {result['requests_per_sec']:,.0f} req/sec "
+            f"({result['events_per_sec']:,.0f} events/sec) "
+            f"p50={result['p50_ms']:.2f}ms p99={result['p99_ms']:.2f}ms {statuses}"
+        )
+        assert statuses == {200: args.requests}, f"{fmt} batches were not accepted: {statuses}"
+    return results
+
+
+def bench_storage(args):
+    batches = writer.make_batches(args.write_batches, args.batch_size * 10)
+    writer.check_group_commit(batches)
+    results = {}
+    for label, commit_rows in writer.VARIANTS:
+        with tempfile.TemporaryDirectory() as tmp:
+            results[label] = writer.run(
+                label, os.path.join(tmp, "bench.sqlite3"), batches, 2, "NORMAL", commit_rows
+            )
+    return results
+
+
+def bench_queries(args):
+    results = {}
+    for rows in map(int, args.sizes.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = sqlite3.connect(os.path.join(tmp, "bench.sqlite3"))
+            migrate(conn, target=1)
+            last_ts = indexes.fill(conn, rows, args.seed)
+            migrate(conn)
+            timings = indexes.time_queries(conn, last_ts, 3)
+            conn.close()
+
+        results[str(rows)] = {name: t * 1000 for name, t in timings.items()}
+        summary = " ".join(f"{k}={v * 1000:.2f}ms" for k, v in timings.items())
+        print(f"[QUERIES] rows={rows:,} {summary}")
+    return results
+
+
+SUITES = {
+    "analyzer": bench_analyzer,
+    "ingest": bench_ingest,
+    "storage": bench_storage,
+    "queries": bench_queries,
+}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=corpus.ROOT, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def flatten(d, prefix=""):
+    for k, v in d.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            yield from flatten(v, key + ".")
+        elif isinstance(v, (int, float)):
+            yield key, v
+
+
+def compare(old_path, new):
+    with open(old_path) as f:
+        old = dict(flatten(json.load(f)["results"]))
+    print(f"\n[COMPARE] against {old_path}")
+    for key, value in flatten(new):
+        if key in old and old[key]:
+            print(f"  {key:<55} {old[key]:>14,.2f} -> {value:>14,.2f} ({value / old[key]:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="vshosh-infobez benchmark suite")
+    parser.add_argument("--suite", default=",".join(SUITES))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--lines", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--write-batches", type=int, default=100)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--out")
+    parser.add_argument("--compare")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.suite.split(","):
+        results[name] = SUITES[name](args)
+
+    report = {
+        "meta": {
+            "date": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+
+    out = args.out
+    if not out:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+        out = os.path.join(RESULTS_DIR, f"{stamp}-{report['meta']['git']}.json")
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[BENCH] results written to {out}")
+
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Full-text search: logs_fts vs LIKE, and what keeping the index costs.
+
+For each size fills two migrated databases batch by batch, the way
+DBWriter does: one with the rows in the main logs table and no
+full-text index, one in day partitions through Partitions.insert, which
+keeps each day's logs_fts. Reports insert rows/sec and bytes per row for
+both (the write amplification), then the latency of the `search` queries:
+
+- like: every word as message LIKE '%word%', newest 20 first, the only
+  option before the index, over the plain table
+- rank / recent: search.search_logs over the partitions, 20 best by
+  bm25 / newest 20
+
+Queries with few matches are also paged through to the end by cursor in
+both orders: every match exactly once, in order.
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import corpus
+
+sys.path.insert(0, corpus.SERVER_DIR)
+
+from migrations import migrate  # noqa: E402
+from partitions import Partitions  # noqa: E402
+from pipeline import parser  # noqa: E402
+from search import search_logs  # noqa: E402
+from syslog_parser import COLUMNS  # noqa: E402
+
+PLAIN_INSERT = """
+    INSERT INTO logs (timestamp, client_id, mac, ip, level, message, event_type)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+LIKE_SQL = """
+    SELECT id, timestamp, client_id, ip, level, message FROM logs
+    WHERE {where}
+    ORDER BY timestamp DESC LIMIT 20
+"""
+
+
+def make_sample(seed):
+    sample = list(corpus.generate(20_000, seed=seed, attack_rate=0.02, clients=50))
+    levels = ["INFO"] * 90 + ["WARNING"] * 8 + ["THREAT"] * 2
+    for i, e in enumerate(sample):
+        e["level"] = levels[i % 100]
+        e["columns"] = tuple(parser.parse(e["message"])[: len(COLUMNS)])
+    return sample
+
+
+def fill(conn, rows, sample, batch_size, fts):
+    partitions = Partitions.of(conn)
+    start = datetime(2026, 1, 1)
+    t0 = time.perf_counter()
+    for first in range(0, rows, batch_size):
+        batch = []
+        for i in range(first, min(first + batch_size, rows)):
+            e = sample[i % len(sample)]
+            ts = (start + timedelta(milliseconds=100 * i)).strftime("%Y-%m-%d %H:%M:%S")
+            row = (ts, e["client_id"], e["mac"], e["ip"], e["level"], e["message"])
+            batch.append(row + e["columns"])
+        if fts:
+            partitions.prepare(conn, partitions.days_of(batch))
+        with conn:
+            if fts:
+                partitions.insert(conn, batch)
+            else:
+                conn.executemany(PLAIN_INSERT, [r[:7] for r in batch])
+    return time.perf_counter() - t0
+
+
+def db_bytes(path):
+    total = 0
+    for p in [path] + [Partitions(path).path(day) for day in Partitions(path).days()]:
+        conn = sqlite3.connect(p)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.close()
+        total += os.path.getsize(p)
+    return total
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def queries(sample):
+    # one uuid occurs once per pass over the sample
+    needle = next(
+        e["message"].rsplit(" ", 1)[1] for e in sample if " resource " in e["message"]
+    )
+    return [
+        ("rare", "CORRUPTED"),
+        ("needle", needle),
+        ("two words", "locked 172.28.0.5"),
+        ("common", "login"),
+    ]
+
+
+# the key each order's pages must be sorted by
+PAGE_KEYS = {
+    "rank": lambda r: (-r["score"], r["id"]),
+    "recent": lambda r: (r["timestamp"], r["id"]),
+}
+
+
+def check_pages(conn, text, matches):
+    for order, key in PAGE_KEYS.items():
+        rows, cursor = [], None
+        while True:
+            page, cursor = search_logs(conn, text, limit=100, cursor=cursor, order=order)
+            rows += page
+            if not cursor:
+                break
+        keys = [key(r) for r in rows]
+        assert len({r["id"] for r in rows}) == len(rows) == matches, (order, len(rows), matches)
+        assert keys == sorted(keys, reverse=order == "recent"), order
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FTS5 search vs LIKE")
+    parser.add_argument("--rows", default="1000000,10000000")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    sample = make_sample(args.seed)
+    for rows in map(int, args.rows.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            written, paths = {}, {}
+            for fts in (False, True):
+                path = paths[fts] = os.path.join(tmp, f"fts-{fts}.sqlite3")
+                conn = sqlite3.connect(path)
+                migrate(conn)
+                if not fts:
+                    conn.execute("DROP TABLE logs_fts")
+                elapsed = fill(conn, rows, sample, args.batch_size, fts)
+                conn.close()
+                written[fts] = (rows / elapsed, db_bytes(path) / rows)
+
+            (plain_rate, plain_size), (fts_rate, fts_size) = written[False], written[True]
+            print(
+                f"[SEARCH] rows={rows:,} insert without index {plain_rate:,.0f} rows/sec "
+                f"{plain_size:.0f} B/row, with index {fts_rate:,.0f} rows/sec "
+                f"{fts_size:.0f} B/row (x{plain_rate / fts_rate:.2f} time, "
+                f"x{fts_size / plain_size:.2f} size)"
+            )
+
+            plain = sqlite3.connect(paths[False])
+            conn = sqlite3.connect(paths[True])
+            for label, text in queries(sample):
+                where = " AND ".join("message LIKE ?" for _ in text.split())
+                like_sql = LIKE_SQL.format(where=where)
+                like_params = [f"%{w}%" for w in text.split()]
+                matches = sum(
+                    conn.execute(
+                        f"SELECT COUNT(*) FROM {db}.logs_fts WHERE logs_fts MATCH ?",
+                        (" ".join(f'"{w}"' for w in text.split()),),
+                    ).fetchone()[0]
+                    for _, db in Partitions.of(conn).each(conn)
+                )
+
+                like, _ = best_of(
+                    args.repeat, lambda: plain.execute(like_sql, like_params).fetchall()
+                )
+                rank, (hits, _) = best_of(args.repeat, lambda: search_logs(conn, text))
+                recent, _ = best_of(
+                    args.repeat, lambda: search_logs(conn, text, order="recent")
+                )
+                assert hits and all(w.lower() in hits[0]["message"].lower() for w in text.split())
+                if matches <= 2000:
+                    check_pages(conn, text, matches)
+                print(
+                    f"  {label:<10} {matches:>9,} matches  like={like * 1000:10.2f}ms "
+                    f"rank={rank * 1000:9.2f}ms recent={recent * 1000:7.2f}ms"
+                )
+            plain.close()
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
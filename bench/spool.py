@@ -0,0 +1,225 @@
+"""Client spool under outages: a flapping server, a crash, the size cap.
+
+- flapping: the stand-in goes down and up on a schedule while lines are
+  written at a steady rate; everything must arrive exactly once, and the
+  backlog is timed as it drains after the last recovery.
+- crash: the client is SIGKILLed mid-outage and restarted; nothing lost.
+- cap: an outage longer than SPOOL_MAX_BYTES drops the oldest segments only.
+- read path: pread vs mmap over sealed segments.
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from client_send import drive, make_sender, write_lines
+from standin_server import StandinServer
+
+from spool import Spool  # client/, on sys.path via client_send
+
+
+def flapping(args):
+    with tempfile.TemporaryDirectory() as d:
+        server = StandinServer().up()
+        n = int(args.rate * args.seconds)
+        sender = make_sender(
+            server, d, {"fsync_interval": 0.2}, batch_size=500, linger=0.2, retry_max=1.0
+        )
+
+        writer = threading.Thread(target=write_lines, args=(os.path.join(d, "app.log"), 0, n, args.rate))
+        writer.start()
+
+        peak = [0]
+
+        def schedule():
+            for _ in range(args.flaps):
+                time.sleep(args.up)
+                server.down()
+                time.sleep(args.down)
+                peak[0] = max(peak[0], sender.spool.size_bytes())
+                server.up()
+
+        flapper = threading.Thread(target=schedule)
+        flapper.start()
+
+        tracemalloc.start()
+        stop = threading.Event()
+
+        def drain_timer():
+            flapper.join()
+            writer.join()
+            start = time.monotonic(), len(server.lines)
+            while len(server.lines) < n and not stop.is_set():
+                time.sleep(0.005)
+            drain[:] = [time.monotonic() - start[0], len(server.lines) - start[1]]
+
+        drain = []
+        timer = threading.Thread(target=drain_timer)
+        timer.start()
+        ok = drive(sender, lambda: len(server.lines) >= n and not timer.is_alive(), 120)
+        stop.set()
+        timer.join()
+        mem_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        server.down()
+
+    assert ok and server.duplicate_lines == 0, (len(server.lines), n, server.duplicate_lines)
+    elapsed, backlog = drain
+    print(
+        f"[SPOOL] flapping {args.flaps}x ({args.up}s up / {args.down}s down), "
+        f"{args.rate:.0f} lines/sec: {n} lines exactly once, "
+        f"{server.duplicate_batches} retried batches deduped, peak spool {peak[0] / 2**20:.1f} MiB, "
+        f"peak heap {mem_peak / 2**20:.1f} MiB"
+    )
+    print(
+        f"[SPOOL] after the last recovery: {backlog} lines drained in {elapsed:.2f}s "
+        f"({backlog / max(elapsed, 1e-9):,.0f} lines/sec)"
+    )
+
+
+def checkpointed(log_dir):
+    """True once the saved offsets say app.log was spooled to its end."""
+    try:
+        with open(os.path.join(log_dir, ".offsets.json")) as f:
+            files = json.load(f)["files"]
+    except (OSError, ValueError):
+        return False
+    size = os.path.getsize(os.path.join(log_dir, "app.log"))
+    return any(f["name"] == "app.log" and f["offset"] == size for f in files)
+
+
+CHILD = """
+import sys, time
+sys.path.insert(0, {bench!r})
+import client_send
+from standin_server import StandinServer
+server = StandinServer(port={port})
+sender = client_send.make_sender(server, {log_dir!r}, {{"fsync_interval": 0.05}}, retry_max=0.5)
+while True:
+    sender.poll()
+"""
+
+
+def crash(args):
+    n = 50_000
+    with tempfile.TemporaryDirectory() as d:
+        server = StandinServer().up()
+        port = server.port
+        code = CHILD.format(bench=os.path.dirname(os.path.abspath(__file__)), port=port, log_dir=d)
+
+        def spawn():
+            return subprocess.Popen(
+                [sys.executable, "-c", code], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+
+        child = spawn()
+        log = os.path.join(d, "app.log")
+        write_lines(log, 0, 1000)
+        while len(server.lines) < 1000:
+            time.sleep(0.05)
+        server.down()
+
+        write_lines(log, 1000, n - 1000)
+        deadline = time.monotonic() + 30
+        while not checkpointed(d) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        spool_dir = os.path.join(d, "spool")
+        spooled = sum(os.path.getsize(os.path.join(spool_dir, f)) for f in os.listdir(spool_dir))
+        child.send_signal(signal.SIGKILL)
+        child.wait()
+
+        server.up()
+        child = spawn()
+        deadline = time.monotonic() + 60
+        while len(server.lines) < n and time.monotonic() < deadline:
+            time.sleep(0.05)
+        child.kill()
+        child.wait()
+        server.down()
+
+    got = len(server.lines)
+    assert got == n and server.duplicate_lines == 0, (got, server.duplicate_lines)
+    print(
+        f"[SPOOL] SIGKILL mid-outage with {spooled / 2**20:.1f} MiB spooled: "
+        f"{got} unique lines after restart, {server.duplicate_lines} duplicates"
+    )
+
+
+def cap(args):
+    with tempfile.TemporaryDirectory() as d:
+        server = StandinServer().up()
+        opts = {"segment_bytes": 1 << 20, "max_bytes": 4 << 20, "fsync_interval": 0.05}
+        sender = make_sender(server, d, opts, retry_max=0.2)
+        server.down()
+
+        n = 100_000
+        write_lines(os.path.join(d, "app.log"), 0, n)
+        drive(sender, lambda: checkpointed(d), 60)
+        size = sender.spool.size_bytes()
+
+        server.up()
+        drive(sender, lambda: sender.spool.unread == 0 and sender.sent_events, 60)
+        time.sleep(0.5)
+        server.down()
+
+    got = sorted(int(line.split()[1][4:]) for line in server.lines)
+    assert got and got[-1] == n - 1 and size <= (4 << 20) + (1 << 20), (size, got[-1:])
+    print(
+        f"[SPOOL] cap 4 MiB, {n} lines during an outage: spool held {size / 2**20:.1f} MiB, "
+        f"dropped {sender.spool.dropped_bytes / 2**20:.1f} MiB oldest, "
+        f"delivered lines {got[0]}..{got[-1]} ({len(got)})"
+    )
+
+
+def read_path(args):
+    line = "x" * 150
+    for use_mmap in (False, True):
+        with tempfile.TemporaryDirectory() as d:
+            spool = Spool(d, segment_bytes=8 << 20, max_bytes=1 << 30)
+            for _ in range(args.read_mib * 1024 * 1024 // 158 // 1000):
+                spool.append([line] * 1000)
+            spool.sync_if_due(force=True)
+            spool.close()
+
+            spool = Spool(d, segment_bytes=8 << 20, max_bytes=1 << 30, use_mmap=use_mmap)
+            total = spool.unread
+            t0 = time.perf_counter()
+            read = 0
+            while True:
+                lines, position = spool.read(500)
+                if not lines:
+                    break
+                read += len(lines)
+                spool.commit(position)
+            elapsed = time.perf_counter() - t0
+            spool.close()
+        assert read == total
+        label = "mmap" if use_mmap else "pread"
+        print(f"[SPOOL] read {args.read_mib} MiB via {label:<5}: {read / elapsed:>10,.0f} lines/sec")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="client spool under outages")
+    parser.add_argument("--rate", type=float, default=2000)
+    parser.add_argument("--seconds", type=float, default=12)
+    parser.add_argument("--flaps", type=int, default=3)
+    parser.add_argument("--up", type=float, default=1.0)
+    parser.add_argument("--down", type=float, default=2.5)
+    parser.add_argument("--read-mib", type=int, default=64)
+    args = parser.parse_args()
+
+    read_path(args)
+    cap(args)
+    crash(args)
+    flapping(args)
+
+
+if __name__ == "__main__":
+    main()
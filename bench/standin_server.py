@@ -0,0 +1,155 @@
+"""Minimal stand-in for the SIEM server, for client-side benchmarks.
+
+Speaks /api/auth and /api/log like server/main.py, decodes batches with
+server/batch_codec, and drops repeated X-Batch-Ids. Each received line is
+recorded once, along with its delivery latency when the line starts with
+its write time (time.time()). Faults can be injected: a share of requests
+answered 503, a share accepted but answered 500 (a lost response), a fixed
+service time, and down() / up() to refuse connections entirely.
+"""
+
+import io
+import json
+import random
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import corpus
+
+sys.path.append(corpus.SERVER_DIR)
+
+from batch_codec import NDJSON_MIMETYPE, read_batch  # noqa: E402
+
+
+class StandinServer:
+    def __init__(self, port=0, service_time=0.0, busy_rate=0.0, lost_rate=0.0, seed=1):
+        self.service_time = service_time
+        self.busy_rate = busy_rate
+        self.lost_rate = lost_rate
+        self.rng = random.Random(seed)
+
+        self.lock = threading.Lock()
+        self.lines = set()
+        self.batch_ids = set()
+        self.latencies = []
+        self.requests = 0
+        self.duplicate_batches = 0
+        self.duplicate_lines = 0
+
+        self.port = port
+        self.httpd = None
+        self.connections = set()
+
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def up(self):
+        handler = type("Handler", (_Handler,), {"standin": self})
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", self.port), handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def down(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+        # keep-alive connections would otherwise go on being served
+        with self.lock:
+            for conn in self.connections:
+                try:
+                    conn.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+            self.connections.clear()
+
+    def record(self, batch_id, messages):
+        now = time.time()
+        with self.lock:
+            self.requests += 1
+            if batch_id in self.batch_ids:
+                self.duplicate_batches += 1
+                return
+            if batch_id:
+                self.batch_ids.add(batch_id)
+            for message in messages:
+                if message in self.lines:
+                    self.duplicate_lines += 1
+                    continue
+                self.lines.add(message)
+                try:
+                    self.latencies.append(now - float(message.split(" ", 1)[0]))
+                except ValueError:
+                    pass
+
+    def fault(self):
+        with self.lock:
+            roll = self.rng.random()
+        if roll < self.busy_rate:
+            return "busy"
+        if roll < self.busy_rate + self.lost_rate:
+            return "lost"
+        return None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    standin = None
+
+    def setup(self):
+        super().setup()
+        with self.standin.lock:
+            self.standin.connections.add(self.connection)
+
+    def finish(self):
+        super().finish()
+        with self.standin.lock:
+            self.standin.connections.discard(self.connection)
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body, headers=()):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in headers:
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        standin = self.standin
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        if self.path == "/api/auth":
+            return self._reply(
+                200,
+                {"status": "authenticated"},
+                [("Set-Cookie", "access_token=standin; Path=/"), ("Accept-Encoding", "gzip, identity")],
+            )
+
+        if standin.service_time:
+            time.sleep(standin.service_time)
+
+        fault = standin.fault()
+        if fault == "busy":
+            return self._reply(503, {"error": "Ingest queue full"}, [("Retry-After", "0")])
+
+        if self.headers.get_content_type() == NDJSON_MIMETYPE:
+            events, _ = read_batch(
+                io.BytesIO(body), self.headers.get("Content-Encoding"), {}, 1 << 30
+            )
+        else:
+            events = json.loads(body)["events"]
+
+        standin.record(self.headers.get("X-Batch-Id"), [e["message"] for e in events])
+        if fault == "lost":
+            return self._reply(500, {"error": "response lost"})
+        return self._reply(200, {"status": "accepted", "count": len(events)})
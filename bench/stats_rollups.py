@@ -0,0 +1,187 @@
+"""Stats rollups: CLI stats commands from rollup tables vs full scans.
+
+- check: batches through DBWriter (with correlated incidents), then a
+  batch correlation, replay --table style re-scoring and an event_type
+  backfill; rollups.check must find nothing after each, and must notice
+  a rollup count that was tampered with
+- write cost: rollups.add_logs / add_threats per ingest batch next to the
+  partition INSERT they ride along with
+- latency: stats / stats levels / clients / top-threats at 1M and 10M
+  rows, the baseline queries vs the rollups, and how long check takes
+  once the rows are split into day partitions
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import corpus
+import indexes
+
+sys.path.insert(0, corpus.SERVER_DIR)
+
+import rollups  # noqa: E402
+from correlation import Correlator, backfill_event_types, correlate_history  # noqa: E402
+from legacy import LEGACY_STATS_QUERIES  # noqa: E402
+from log_analyzer import LogAnalyzer  # noqa: E402
+from migrations import migrate  # noqa: E402
+from partitions import Partitions  # noqa: E402
+from pipeline import build_rows  # noqa: E402
+from replay import read_table_chunks, write_rescored  # noqa: E402
+from storage import DBWriter  # noqa: E402
+
+ROLLUP_COMMANDS = {
+    "stats": lambda conn: rollups.summary(conn),
+    "stats levels": lambda conn: rollups.levels(conn),
+    "clients": lambda conn: rollups.clients(conn),
+    "top-threats": lambda conn: rollups.top_threats(conn),
+}
+
+
+def make_batches(n, batch_size, seed=1):
+    events = list(corpus.generate(n, seed=seed, attack_rate=0.05, clients=20))
+    start = datetime(2026, 1, 1)
+    for i, e in enumerate(events):
+        e["timestamp"] = (start + timedelta(seconds=i * 0.1)).strftime("%Y-%m-%d %H:%M:%S")
+    analyzer = LogAnalyzer()
+    correlator = Correlator()
+    batches = []
+    for i in range(0, n, batch_size):
+        batch = events[i : i + batch_size]
+        rows, threats = build_rows(batch, analyzer.analyze_batch([e["message"] for e in batch]))
+        batches.append((rows, threats + correlator.feed(rows)))
+    return batches
+
+
+def assert_consistent(conn, step):
+    diffs = rollups.check(conn, Partitions.of(conn))
+    assert not any(diffs.values()), (step, diffs)
+
+
+def check(args):
+    batches = make_batches(20_000, args.batch_size)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "check.sqlite3")
+        conn = sqlite3.connect(path)
+        migrate(conn)
+        partitions = Partitions(path)
+
+        writer = DBWriter(path, commit_rows=5000).start()
+        for rows, threats in batches:
+            writer.write(rows, threats)
+        writer.close()
+        assert_consistent(conn, "writer")
+        # the same incidents again: all skipped, nothing counted twice
+        assert correlate_history(conn) == 0
+        assert_consistent(conn, "correlate")
+
+        # re-score with every other verdict flipped to THREAT / INFO
+        for _, db in partitions.each(conn, write=True):
+            for chunk, _ in read_table_chunks(conn, 5000, 0, db):
+                flipped = [
+                    ("THREAT" if e["old_level"] != "THREAT" else "INFO")
+                    if i % 2
+                    else e["old_level"]
+                    for i, e in enumerate(chunk)
+                ]
+                write_rescored(conn, chunk, flipped, db)
+        assert_consistent(conn, "replay --table")
+
+        for _, db in partitions.each(conn, write=True):
+            with conn:
+                conn.execute(f"UPDATE {db}.logs SET event_type = NULL")
+        rollups.rebuild(conn, partitions)
+        backfill_event_types(conn, chunk_size=5000)
+        assert_consistent(conn, "backfill")
+
+        with conn:
+            conn.execute("UPDATE rollup_threats_total SET count = count + 1")
+        diffs = rollups.check(conn, partitions)
+        assert diffs["rollup_threats_total"] and not diffs["rollup_logs"], diffs
+        rollups.rebuild(conn, partitions)
+        assert_consistent(conn, "rebuild")
+        conn.close()
+    print("[ROLLUPS] writer/correlate/replay/backfill keep rollups consistent, check finds drift")
+
+    # what the rollups add to one batch's transaction
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "cost.sqlite3"))
+        migrate(conn)
+        partitions = Partitions.of(conn)
+        spent = {"insert": 0.0, "rollups": 0.0}
+        for rows, threats in batches:
+            partitions.prepare(conn, partitions.days_of(rows))
+            with conn:
+                t0 = time.perf_counter()
+                partitions.insert(conn, rows)
+                t1 = time.perf_counter()
+                rollups.add_logs(conn, rows)
+                rollups.add_threats(conn, threats)
+                t2 = time.perf_counter()
+            spent["insert"] += t1 - t0
+            spent["rollups"] += t2 - t1
+        conn.close()
+    n = len(batches)
+    print(
+        f"[ROLLUPS] per {args.batch_size}-row batch: insert {spent['insert'] / n * 1000:.2f}ms, "
+        f"rollups {spent['rollups'] / n * 1000:.2f}ms"
+    )
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def latency(args):
+    for rows in map(int, args.rows.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = sqlite3.connect(os.path.join(tmp, "bench.sqlite3"))
+            migrate(conn, target=4)
+            indexes.fill(conn, rows, args.seed)
+            t0 = time.perf_counter()
+            migrate(conn)
+            backfill = time.perf_counter() - t0
+            rollup_rows = conn.execute("SELECT COUNT(*) FROM rollup_logs").fetchone()[0]
+            print(
+                f"[ROLLUPS] rows={rows:,} rollup_logs={rollup_rows:,} rows, "
+                f"built in {backfill:.1f}s"
+            )
+
+            for name, queries in LEGACY_STATS_QUERIES.items():
+                old = best_of(
+                    args.repeat, lambda: [conn.execute(q).fetchall() for q in queries]
+                )
+                new = best_of(args.repeat, lambda: ROLLUP_COMMANDS[name](conn))
+                print(f"  {name:<12} scan={old * 1000:10.2f}ms rollups={new * 1000:7.2f}ms")
+
+            Partitions.of(conn).split_legacy(conn, chunk_size=500_000)
+            t0 = time.perf_counter()
+            assert_consistent(conn, "filled")
+            print(f"  check        {time.perf_counter() - t0:.1f}s")
+            conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="stats rollups vs full scans")
+    parser.add_argument("--rows", default="1000000,10000000")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    check(args)
+    latency(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Events/sec and server RSS: JSON /api/log vs NDJSON /api/log/stream.
+
+Starts server/main.py as a subprocess (needs the server requirements,
+including uvicorn) and drives both endpoints over keep-alive connections.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import corpus
+
+MAC = "AA:BB:CC:00:01"
+
+
+def rss_kib(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, pid):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.peak = 0
+        self.running = True
+
+    def run(self):
+        while self.running:
+            self.peak = max(self.peak, rss_kib(self.pid))
+            time.sleep(0.05)
+
+
+def wait_for(port, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/")
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on :{port} did not come up")
+
+
+def authenticate(port):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    conn.request("POST", "/api/auth")
+    resp = conn.getresponse()
+    resp.read()
+    return resp.getheader("Set-Cookie").split(";")[0]
+
+
+def send_json(port, cookie, events, batch_size):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    headers = {"Cookie": cookie, "X-MAC-ADDRESS": MAC, "Content-Type": "application/json"}
+    accepted = 0
+    for i in range(0, len(events), batch_size):
+        body = json.dumps({"events": events[i : i + batch_size]})
+        while True:
+            conn.request("POST", "/api/log", body=body, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status != 503:
+                break
+            time.sleep(float(resp.getheader("Retry-After", "1")))
+        accepted += batch_size if resp.status == 200 else 0
+    return accepted
+
+
+def send_stream(port, cookie, events, chunk_events):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    headers = {"Cookie": cookie, "X-MAC-ADDRESS": MAC, "Content-Type": "application/x-ndjson"}
+
+    def body():
+        for i in range(0, len(events), chunk_events):
+            yield "".join(json.dumps(e) + "\n" for e in events[i : i + chunk_events]).encode()
+
+    conn.request("POST", "/api/log/stream", body=body(), headers=headers, encode_chunked=True)
+    resp = conn.getresponse()
+    return json.loads(resp.read())["count"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON vs NDJSON stream ingest")
+    parser.add_argument("-n", type=int, default=200_000)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--port", type=int, default=18000)
+    args = parser.parse_args()
+
+    events = list(corpus.generate(args.n, attack_rate=0.02))
+    tmp = tempfile.mkdtemp()
+    env = dict(
+        os.environ,
+        DB_PATH=os.path.join(tmp, "db.sqlite3"),
+        AUTHORIZED_MACS=MAC,
+        AUTHORIZED_IPS="127.0.0.1",
+        SERVER_PORT=str(args.port),
+        STREAM_PORT=str(args.port + 1),
+        INGEST_QUEUE_CAPACITY="1000000",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "main.py"],
+        cwd=corpus.SERVER_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for(args.port)
+        wait_for(args.port + 1)
+        cookie = authenticate(args.port)
+        idle = rss_kib(server.pid)
+
+        for label, fn, port, size in (
+            ("json", send_json, args.port, args.batch_size),
+            ("ndjson", send_stream, args.port + 1, 500),
+        ):
+            sampler = RssSampler(server.pid)
+            sampler.start()
+            t0 = time.perf_counter()
+            count = fn(port, cookie, events, size)
+            elapsed = time.perf_counter() - t0
+            sampler.running = False
+            sampler.join()
+            print(
+                f"[STREAM] {label:<6} {count / elapsed:>10,.0f} events/sec  "
+                f"server rss idle={idle / 1024:.1f}MiB peak={sampler.peak / 1024:.1f}MiB"
+            )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
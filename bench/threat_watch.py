@@ -0,0 +1,231 @@
+"""Threat watch: pushed /api/threats/stream vs the baseline 2 s DB poll.
+
+Starts server/main.py as a subprocess, posts bursts of single-line threats
+to /api/log and follows them with N concurrent watchers of each kind.
+Reports threats delivered / missed / duplicated per watcher, latency from
+the POST to the watcher, and how many DB queries the watchers caused.
+Also checks resuming with Last-Event-ID and the long-poll endpoint.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import corpus
+from legacy import legacy_watch_threats
+from stream_ingest import MAC, authenticate, wait_for
+
+THREAT = "Backup job nightly-{seq} finished - Integrity: CORRUPTED - seq={seq}"
+
+
+def seq_of(message):
+    return int(message.rsplit("seq=", 1)[1])
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else float("nan")
+
+
+def get_json(port, path):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    conn.request("GET", path)
+    return json.loads(conn.getresponse().read())
+
+
+class StreamWatcher(threading.Thread):
+    def __init__(self, port, last_event_id=None):
+        super().__init__(daemon=True)
+        self.port = port
+        self.last_event_id = last_event_id
+        self.received = {}
+        self.ids = []
+        self.connected = threading.Event()
+        self.conn = None
+        self.sock = None
+
+    def run(self):
+        self.conn = http.client.HTTPConnection("127.0.0.1", self.port)
+        headers = {"Accept": "text/event-stream"}
+        if self.last_event_id is not None:
+            headers["Last-Event-ID"] = str(self.last_event_id)
+        self.conn.request("GET", "/api/threats/stream", headers=headers)
+        self.sock = self.conn.sock
+        resp = self.conn.getresponse()
+        data = None
+        try:
+            for raw in resp:
+                line = raw.decode().rstrip("\n")
+                if line.startswith(": cursor"):
+                    self.connected.set()
+                elif line.startswith("data:"):
+                    data = json.loads(line[5:])
+                elif not line and data is not None:
+                    self.ids.append(data["id"])
+                    seq = seq_of(data["message"])
+                    self.received.setdefault(seq, []).append(time.perf_counter())
+                    data = None
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def stop(self):
+        self.sock.shutdown(2)
+
+
+class PollWatcher(threading.Thread):
+    def __init__(self, db_path):
+        super().__init__(daemon=True)
+        self.db_path = db_path
+        self.received = {}
+        self.stats = {}
+        self._stop = threading.Event()
+
+    def run(self):
+        def on_threat(row):
+            self.received.setdefault(seq_of(row[3]), []).append(time.perf_counter())
+
+        legacy_watch_threats(self.db_path, self._stop, on_threat, self.stats)
+
+    def stop(self):
+        self._stop.set()
+
+
+def post_threats(port, cookie, seqs):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    events = [
+        {"client_id": "client1", "mac": MAC, "ip": "127.0.0.1", "message": THREAT.format(seq=s)}
+        for s in seqs
+    ]
+    headers = {"Cookie": cookie, "X-MAC-ADDRESS": MAC, "Content-Type": "application/json"}
+    conn.request("POST", "/api/log", body=json.dumps({"events": events}), headers=headers)
+    resp = conn.getresponse()
+    resp.read()
+    assert resp.status == 200, resp.status
+
+
+def report(label, watchers, sent, seconds, queries):
+    delays, missed, dupes = [], 0, 0
+    for w in watchers:
+        for seq, t_sent in sent.items():
+            got = w.received.get(seq)
+            if not got:
+                missed += 1
+                continue
+            dupes += len(got) - 1
+            delays.append(got[0] - t_sent)
+    total = len(sent) * len(watchers)
+    print(
+        f"[WATCH] {label:<6} x{len(watchers):<3} delivered {total - missed}/{total} "
+        f"dupes {dupes}  latency p50 {percentile(delays, 0.5) * 1000:6.0f}ms "
+        f"p99 {percentile(delays, 0.99) * 1000:6.0f}ms  "
+        f"DB queries {queries} ({queries / seconds:.1f}/s)"
+    )
+
+
+def run(args, port, cookie, db_path, watchers, seq0):
+    rng = random.Random(1)
+    sent = {}
+    t0 = time.time()
+    for w in watchers:
+        w.start()
+        if isinstance(w, StreamWatcher):
+            w.connected.wait(10)
+    seq = seq0
+    for _ in range(args.bursts):
+        seqs = list(range(seq, seq + rng.randint(1, args.burst_max)))
+        seq += len(seqs)
+        now = time.perf_counter()
+        post_threats(port, cookie, seqs)
+        sent.update((s, now) for s in seqs)
+        time.sleep(rng.uniform(0.2, 0.8))
+    time.sleep(3)  # let the last burst reach the pollers
+    for w in watchers:
+        w.stop()
+    return sent, time.time() - t0, seq
+
+
+def main():
+    parser = argparse.ArgumentParser(description="threat watch push vs poll")
+    parser.add_argument("--watchers", default="1,20")
+    parser.add_argument("--bursts", type=int, default=20)
+    parser.add_argument("--burst-max", type=int, default=5)
+    parser.add_argument("--port", type=int, default=18100)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    db_path = os.path.join(tmp, "db.sqlite3")
+    env = dict(
+        os.environ,
+        DB_PATH=db_path,
+        AUTHORIZED_MACS=MAC,
+        AUTHORIZED_IPS="127.0.0.1",
+        SERVER_PORT=str(args.port),
+        STREAM_PORT="0",
+        ANALYSIS_INTERVAL="0.05",
+        INGEST_WAKE_THRESHOLD="1",
+        THREAT_FEED_BUFFER="50",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "main.py"],
+        cwd=corpus.SERVER_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for(args.port)
+        cookie = authenticate(args.port)
+
+        seq = 0
+        for n in map(int, args.watchers.split(",")):
+            watchers = [PollWatcher(db_path) for _ in range(n)]
+            sent, seconds, seq = run(args, args.port, cookie, db_path, watchers, seq)
+            queries = sum(w.stats.get("queries", 0) for w in watchers)
+            report("poll", watchers, sent, seconds, queries)
+
+            before = get_json(args.port, "/api/threats/stats")["backfills"]
+            watchers = [StreamWatcher(args.port) for _ in range(n)]
+            sent, seconds, seq = run(args, args.port, cookie, db_path, watchers, seq)
+            queries = get_json(args.port, "/api/threats/stats")["backfills"] - before
+            report("stream", watchers, sent, seconds, queries)
+
+        # resume: a cursor inside the buffer, and one older than the buffer
+        last_id = get_json(args.port, "/api/threats/stats")["last_id"]
+        for back in (min(10, last_id), min(200, last_id)):
+            w = StreamWatcher(args.port, last_event_id=last_id - back)
+            w.start()
+            deadline = time.time() + 5
+            while len(w.ids) < back and time.time() < deadline:
+                time.sleep(0.05)
+            w.stop()
+            assert w.ids == list(range(last_id - back + 1, last_id + 1)), (back, w.ids[:5])
+        print("[WATCH] Last-Event-ID resume from the buffer and from the table ok")
+
+        # long-poll: waits for the next threat, returns it with the new cursor
+        result = {}
+        poller = threading.Thread(
+            target=lambda: result.update(
+                get_json(args.port, f"/api/threats?after={last_id}&wait=10")
+            )
+        )
+        t0 = time.perf_counter()
+        poller.start()
+        time.sleep(0.3)
+        post_threats(args.port, cookie, [seq])
+        poller.join()
+        assert result["cursor"] == last_id + 1 and len(result["threats"]) == 1, result
+        print(f"[WATCH] long-poll woke after {(time.perf_counter() - t0) * 1000:.0f}ms ok")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
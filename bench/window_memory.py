@@ -0,0 +1,56 @@
+import argparse
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import corpus
+
+sys.path.insert(0, corpus.SERVER_DIR)
+
+from legacy import LogAnalyzer as LegacyAnalyzer  # noqa: E402
+from log_analyzer import LogAnalyzer  # noqa: E402
+
+
+def scan_lines(n, step, seed):
+    # scanning traffic: failed logins from a fresh spoofed IP almost every time
+    start = datetime(2026, 1, 1)
+    for i in range(n):
+        ts = (start + timedelta(seconds=i * step)).strftime("%b %d %H:%M:%S")
+        ip = f"{(i * 7919 + seed) % 223 + 1}.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}"
+        yield f"{ts} edge@10.0.0.1 auth-service[1]: Failed login attempt for admin - IP: {ip}"
+
+
+def measure(label, analyzer, args):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    for line in scan_lines(args.n, args.step, args.seed):
+        analyzer.analyze_line(line)
+    elapsed = time.perf_counter() - t0
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    keys = len(analyzer.failed_logins)
+    print(
+        f"[WINDOWS] {label:<6} {args.n / elapsed:>9,.0f} lines/sec  tracked ips={keys:,} "
+        f"heap={current / 2**20:.1f}MiB peak={peak / 2**20:.1f}MiB"
+    )
+    if hasattr(analyzer, "memory_stats"):
+        print(f"          {analyzer.memory_stats()['failed_logins']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="window state memory under IP scanning")
+    parser.add_argument("-n", type=int, default=200_000)
+    parser.add_argument("--step", type=float, default=0.01, help="event-time seconds per line")
+    parser.add_argument("--max-keys", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    measure("old", LegacyAnalyzer(), args)
+    measure("new", LogAnalyzer(max_keys=args.max_keys), args)
+    measure("capped", LogAnalyzer(max_keys=1000), args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import sys
+import threading
+import time
+from collections import Counter
+
+import corpus
+
+sys.path.insert(0, corpus.SERVER_DIR)
+
+from log_analyzer import LogAnalyzer  # noqa: E402
+from pipeline import classify_batch  # noqa: E402
+from workers import AnalysisPool  # noqa: E402
+
+
+def make_batches(n, batch_size, seed):
+    entries = list(corpus.generate(n, seed=seed, attack_rate=0.05, clients=50))
+    for e in entries:
+        e["timestamp"] = "2026-01-01 00:00:00"
+    return [entries[i : i + batch_size] for i in range(0, n, batch_size)]
+
+
+def run_inline(batches):
+    analyzer = LogAnalyzer()
+    levels = Counter()
+    t0 = time.perf_counter()
+    for batch in batches:
+        rows, _ = classify_batch(analyzer, batch)
+        levels.update(r[4] for r in rows)
+    return time.perf_counter() - t0, levels
+
+
+def run_pool(batches, workers):
+    total = sum(len(b) for b in batches)
+    levels = Counter()
+    done = threading.Event()
+
+    def on_result(batch, shard_levels, parsed):
+        levels.update(shard_levels)
+        if sum(levels.values()) >= total:
+            done.set()
+
+    pool = AnalysisPool(workers, on_result).start()
+    t0 = time.perf_counter()
+    for batch in batches:
+        pool.submit(batch)
+    done.wait()
+    elapsed = time.perf_counter() - t0
+    pool.close()
+    return elapsed, levels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="sharded analysis worker scaling")
+    parser.add_argument("-n", type=int, default=400_000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    batches = make_batches(args.n, args.batch_size, args.seed)
+
+    elapsed, expected = run_inline(batches)
+    print(f"[WORKERS] inline    {args.n / elapsed:>10,.0f} lines/sec  {dict(expected)}")
+
+    for workers in map(int, args.workers.split(",")):
+        elapsed, levels = run_pool(batches, workers)
+        status = "ok" if levels == expected else f"MISMATCH {dict(levels)}"
+        print(f"[WORKERS] workers={workers} {args.n / elapsed:>10,.0f} lines/sec  verdicts {status}")
+
+
+if __name__ == "__main__":
+    main()
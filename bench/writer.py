@@ -0,0 +1,195 @@
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from contextlib import closing
+
+import corpus
+
+sys.path.insert(0, corpus.SERVER_DIR)
+
+from legacy import LEGACY_INSERT_LOG, legacy_init_db  # noqa: E402
+from migrations import migrate  # noqa: E402
+from partitions import Partitions  # noqa: E402
+from pipeline import build_rows  # noqa: E402
+from storage import DBWriter, ReadPool  # noqa: E402
+
+READ_QUERIES = [
+    "SELECT timestamp, client_id, level, message FROM logs ORDER BY timestamp DESC LIMIT 20",
+    "SELECT level, COUNT(*) FROM logs GROUP BY level",
+    "SELECT COUNT(DISTINCT client_id) FROM logs",
+]
+
+# (label, DBWriter commit_rows): the baseline, DBWriter committing every
+# batch, and DBWriter group commit as the server runs it
+VARIANTS = [("old", None), ("per-batch", 1), ("new", 5000)]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def make_batches(batches, batch_size):
+    entries = [dict(e, timestamp="2026-01-01 00:00:00") for e in corpus.generate(batch_size * 4)]
+    rows, _ = build_rows(entries, ["INFO"] * len(entries))
+    return [rows[(i % 4) * batch_size : (i % 4 + 1) * batch_size] for i in range(batches)]
+
+
+def reader_loop(open_conn, stop, counter, partitioned):
+    while not stop.is_set():
+        with open_conn() as conn:
+            if partitioned:
+                # the same queries against the day partition the writer fills
+                for _, db in Partitions.of(conn).each(conn):
+                    for q in READ_QUERIES:
+                        conn.execute(q.replace("FROM logs", f"FROM {db}.logs")).fetchall()
+            else:
+                for q in READ_QUERIES:
+                    conn.execute(q).fetchall()
+        counter.append(1)
+
+
+def legacy_writes(path, batches, latencies):
+    # baseline analysis_loop: connect per cycle, default journal, row by row
+    for rows in batches:
+        conn = sqlite3.connect(path)
+        cur = conn.cursor()
+        for row in rows:
+            cur.execute(LEGACY_INSERT_LOG, row[:6])
+        t0 = time.perf_counter()
+        conn.commit()
+        latencies.append(time.perf_counter() - t0)
+        conn.close()
+
+
+def run(label, path, batches, readers, synchronous, commit_rows=5000):
+    """label "old" is the baseline loop; anything else is a DBWriter that
+    commits every commit_rows rows (1: after every batch)."""
+    conn = sqlite3.connect(path)
+    if label == "old":
+        legacy_init_db(conn)
+    else:
+        # everything the writer keeps: day partition with its indexes and
+        # full-text index, rollups
+        migrate(conn)
+    conn.close()
+
+    stop = threading.Event()
+    reads = []
+    if label == "old":
+
+        def open_conn():
+            return closing(sqlite3.connect(path, timeout=30))
+
+    else:
+        pool = ReadPool(path, readers)
+        writer = DBWriter(path, synchronous=synchronous, commit_rows=commit_rows).start()
+        writer.flush()
+        open_conn = pool.connection
+
+    threads = [
+        threading.Thread(
+            target=reader_loop, args=(open_conn, stop, reads, label != "old"), daemon=True
+        )
+        for _ in range(readers)
+    ]
+    for t in threads:
+        t.start()
+
+    latencies = []
+    t0 = time.perf_counter()
+    if label == "old":
+        legacy_writes(path, batches, latencies)
+    else:
+        for rows in batches:
+            writer.write(rows)
+        writer.flush()
+        latencies = list(writer.commit_latencies)
+        written = writer.rows_written
+        writer.close()
+        assert written == sum(len(b) for b in batches), f"writer stored {written} rows"
+    elapsed = time.perf_counter() - t0
+
+    stop.set()
+    for t in threads:
+        t.join()
+
+    total = sum(len(b) for b in batches)
+    result = {
+        "rows_per_sec": total / elapsed,
+        "commits": len(latencies),
+        "commit_p50_ms": percentile(latencies, 0.5) * 1000,
+        "commit_p99_ms": percentile(latencies, 0.99) * 1000,
+        "reader_queries": len(reads),
+    }
+    if label == "old":
+        synchronous = "FULL (rollback journal)"
+    print(
+        f"[WRITER] {label:<10} sync={synchronous} readers={readers} "
+        f"{result['rows_per_sec']:>10,.0f} rows/sec  commits={result['commits']} "
+        f"p50={result['commit_p50_ms']:.2f}ms "
+        f"p99={result['commit_p99_ms']:.2f}ms  reader queries={result['reader_queries']}"
+    )
+    return result
+
+
+def check_group_commit(batches):
+    """Batches of one open group must stay invisible to readers until its
+    commit; a SAVEPOINT released outside a transaction commits by itself."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.sqlite3")
+        conn = sqlite3.connect(path)
+        migrate(conn)
+        conn.close()
+        writer = DBWriter(path, commit_rows=1 << 30, commit_interval=3600).start()
+        pool = ReadPool(path, 1)
+        try:
+            for rows in batches[:3]:
+                writer.write(rows)
+            # let the writer take and insert them, still inside the open group
+            while writer._queue.qsize():
+                time.sleep(0.01)
+            time.sleep(0.2)
+            with pool.connection() as conn:
+                visible = sum(
+                    conn.execute(f"SELECT COUNT(*) FROM {db}.logs").fetchone()[0]
+                    for _, db in Partitions.of(conn).each(conn)
+                )
+            assert visible == 0, f"{visible} rows visible before the group commit"
+            writer.flush()
+            assert writer.commits == 1 and writer.rows_written == sum(len(b) for b in batches[:3])
+        finally:
+            writer.close()
+    print("[WRITER] group commit: batches stay invisible until one commit")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ingest writer throughput")
+    parser.add_argument("--batches", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--synchronous", default="NORMAL")
+    args = parser.parse_args()
+
+    batches = make_batches(args.batches, args.batch_size)
+    check_group_commit(batches)
+    for label, commit_rows in VARIANTS:
+        with tempfile.TemporaryDirectory() as tmp:
+            run(
+                label,
+                os.path.join(tmp, "bench.sqlite3"),
+                batches,
+                args.readers,
+                args.synchronous,
+                commit_rows,
+            )
+
+
+if __name__ == "__main__":
+    main()
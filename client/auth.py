@@ -6,6 +6,7 @@ class AuthClient:
     def __init__(self):
         self.session = requests.Session()
         self.session.headers.update({"X-MAC-ADDRESS": MAC_ADDRESS})
+        self.accept_encoding = None
 
     def authenticate(self):
         try:
@@ -13,6 +14,7 @@ class AuthClient:
                 SERVER_URL + AUTH_ENDPOINT, verify=VERIFY_TLS, timeout=5
             )
             if resp.status_code == 200:
+                self.accept_encoding = resp.headers.get("Accept-Encoding")
                 print("[AUTH] Auth success")
                 return True
             else:
@@ -8,6 +8,19 @@ VERIFY_TLS = os.getenv("VERIFY_TLS", False)
 
 LOG_DIR = os.path.join(os.path.dirname(__file__), "logs")
 LOG_FILE = os.path.join(LOG_DIR, f"log_{CLIENT_ID}.log")
+# read offsets of the watched logs, so a restart resumes where it stopped
+LOG_OFFSETS_PATH = os.getenv("LOG_OFFSETS_PATH", os.path.join(LOG_DIR, ".offsets.json"))
+# where generator events come from: "files" (.jsonl in LOG_DIR, converted to
+# .log and tailed), "pipe" (the generator's stdout) or "socket" (NDJSON over
+# TCP on GENERATOR_SOCKET); pipe and socket skip the files entirely
+CLIENT_INPUT = os.getenv("CLIENT_INPUT", "files")
+GENERATOR_SOCKET = os.getenv("GENERATOR_SOCKET", "127.0.0.1:5140")
+# log_formatter: read offsets of the generator's .jsonl files, and how long a
+# fully converted .jsonl file stays unchanged before it is deleted
+CONVERT_OFFSETS_PATH = os.getenv(
+    "CONVERT_OFFSETS_PATH", os.path.join(LOG_DIR, ".jsonl-offsets.json")
+)
+CONVERT_REMOVE_AFTER = float(os.getenv("CONVERT_REMOVE_AFTER", "60"))
 LOG_GENERATOR_DIR = os.path.join(os.path.dirname(__file__), "log-generator")
 CONFIG_PATH = os.path.join(os.path.dirname(__file__), "generator-config.yaml")
 
@@ -18,3 +31,24 @@ LOG_ENDPOINT = "/api/log"
 USERNAMES = ["guest", "admin"]
 
 SEND_INTERVAL = 2
+
+# a batch is sent at BATCH_MAX_EVENTS lines or once its oldest line has
+# waited BATCH_LINGER seconds
+BATCH_MAX_EVENTS = int(os.getenv("BATCH_MAX_EVENTS", "500"))
+BATCH_LINGER = float(os.getenv("BATCH_LINGER", "1"))
+# concurrent /api/log requests, each on its own keep-alive connection
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", "4"))
+# on-disk spool between the log files and the server; past SPOOL_MAX_BYTES
+# the oldest segment is dropped
+SPOOL_DIR = os.getenv("SPOOL_DIR", os.path.join(os.path.dirname(__file__), "spool"))
+SPOOL_MAX_BYTES = int(os.getenv("SPOOL_MAX_BYTES", str(256 << 20)))
+SPOOL_SEGMENT_BYTES = int(os.getenv("SPOOL_SEGMENT_BYTES", str(8 << 20)))
+SPOOL_FSYNC_INTERVAL = float(os.getenv("SPOOL_FSYNC_INTERVAL", "1"))
+SPOOL_MMAP = os.getenv("SPOOL_MMAP", "0") == "1"
+# retry backoff: random in [0, min(RETRY_MAX, RETRY_BASE * 2^attempt)]
+RETRY_BASE = float(os.getenv("RETRY_BASE", "0.5"))
+RETRY_MAX = float(os.getenv("RETRY_MAX", "30"))
+
+# /api/log batch format: "auto" takes the best encoding the server offers
+# at auth time, or force "zstd", "gzip" or "json"
+BATCH_ENCODING = os.getenv("BATCH_ENCODING", "auto")
@@ -0,0 +1,123 @@
+import json
+import queue
+import socket
+import threading
+from collections import deque
+
+from log_formatter import format_syslog
+
+READ_CHUNK = 64 * 1024
+# formatted chunks waiting for the sender; one chunk is at most READ_CHUNK
+# of input, so this bounds the buffer to a few MiB
+QUEUE_CHUNKS = 64
+# lines per read_new call, like the watcher's per-file read budget
+MAX_READ_LINES = 10_000
+
+
+class EventStream:
+    """Generator events from a pipe or socket, formatted in memory.
+
+    feed() reads newline-delimited JSON from a binary stream (the
+    generator's stdout, or a connection accepted by serve()), formats each
+    event with format_syslog and queues the lines for the sender. The
+    queue is bounded: when the sender falls behind, the reader blocks and
+    the generator blocks on its pipe in turn.
+
+    read_new() and wait() match LogWatcher, so the Sender takes either.
+    There are no offsets: snapshot() is None and checkpoint() does nothing.
+    """
+
+    def __init__(self, name="generator", max_chunks=QUEUE_CHUNKS):
+        self.name = name
+        self._queue = queue.Queue(maxsize=max_chunks)
+        self._pending = deque()
+        self._server = None
+
+        self.received = 0
+        self.invalid = 0
+
+    def feed(self, stream):
+        """Read events from stream until EOF; blocks, run it on a thread."""
+        rest = b""
+        while True:
+            chunk = stream.read1(READ_CHUNK)
+            if not chunk:
+                break
+            end = chunk.rfind(b"\n") + 1
+            if not end:
+                rest += chunk
+                continue
+            self._put(rest + chunk[:end])
+            rest = chunk[end:]
+        if rest:
+            self._put(rest)
+
+    def _put(self, data):
+        lines = []
+        for raw in data.split(b"\n"):
+            if not raw.strip():
+                continue
+            try:
+                lines.append(format_syslog(json.loads(raw)))
+            except (ValueError, AttributeError):
+                self.invalid += 1
+        if lines:
+            self.received += len(lines)
+            self._queue.put(lines)
+
+    def serve(self, address):
+        """Accept generator connections on a TCP (host, port) in the background."""
+        self._server = socket.create_server(address)
+        threading.Thread(target=self._accept, daemon=True, name="stream-accept").start()
+        host, port = self._server.getsockname()[:2]
+        print(f"[STREAM] listening for generator events on {host}:{port}")
+        return host, port
+
+    def _accept(self):
+        while True:
+            try:
+                conn, peer = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(
+                target=self._serve_conn, args=(conn, peer), daemon=True
+            ).start()
+
+    def _serve_conn(self, conn, peer):
+        with conn, conn.makefile("rb") as stream:
+            try:
+                self.feed(stream)
+            except OSError as e:
+                print(f"[STREAM] {peer[0]}:{peer[1]} dropped: {e}")
+
+    def read_new(self):
+        lines = []
+        while len(lines) < MAX_READ_LINES:
+            if self._pending:
+                lines.extend(self._pending.popleft())
+                continue
+            try:
+                lines.extend(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return [{"file": self.name, "line": line} for line in lines]
+
+    def wait(self, timeout):
+        """Block until events are queued or timeout passes."""
+        if self._pending:
+            return
+        try:
+            self._pending.append(self._queue.get(timeout=timeout))
+        except queue.Empty:
+            pass
+
+    def snapshot(self):
+        return None
+
+    def checkpoint(self, files=None):
+        pass
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
@@ -4,7 +4,8 @@ import subprocess
 from config import CLIENT_ID, CONFIG_PATH, LOG_GENERATOR_DIR
 
 
-def start_generator():
+def start_generator(on_output=None):
+    """Run the log generator; with on_output, hand it the generator's stdout."""
     env = os.environ.copy()
 
     env["HOSTNAME"] = CLIENT_ID
@@ -24,10 +25,23 @@ def start_generator():
     print(" ".join(cmd))
     print(f"[GENERATOR] cwd = {LOG_GENERATOR_DIR}")
 
-    subprocess.run(
+    if on_output is None:
+        subprocess.run(
+            cmd,
+            cwd=LOG_GENERATOR_DIR,  # 🔑 ВАЖНО
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        return
+
+    proc = subprocess.Popen(
         cmd,
-        cwd=LOG_GENERATOR_DIR,  # 🔑 ВАЖНО
+        cwd=LOG_GENERATOR_DIR,
         env=env,
         stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
     )
+    with proc.stdout:
+        on_output(proc.stdout)
+    print(f"[GENERATOR] exited with {proc.wait()}")
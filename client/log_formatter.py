@@ -2,19 +2,51 @@ import ipaddress
 import json
 import os
 import random
+import re
 import time
 from datetime import datetime
-from pathlib import Path
 
-from config import CLIENT_ID, CLIENT_IP, LOG_DIR, USERNAMES
+from config import (CLIENT_ID, CLIENT_IP, CONVERT_OFFSETS_PATH,
+                    CONVERT_REMOVE_AFTER, LOG_DIR, USERNAMES)
+from log_watcher import LogWatcher
 
-used = {}
+# how often converted .jsonl files are checked for removal
+IDLE_CHECK_INTERVAL = 5.0
 
 
 def random_ipv4():
     return ".".join(str(random.randint(0, 255)) for _ in range(4))
 
 
+# generator placeholders left in messages; each is filled once per message,
+# and only if it occurs, so plain messages skip the random calls
+PLACEHOLDERS = {
+    "USERID": lambda: random.choice(USERNAMES),
+    "USERNAME": lambda: random.choice(USERNAMES),
+    "CLIENTIP": lambda: CLIENT_IP,
+    "SESSIONID": lambda: CLIENT_IP,
+    "SRCIP": lambda: CLIENT_IP,
+    "DSTIP": random_ipv4,
+    "SRCPORT": lambda: str(random.randint(1024, 65535)),
+    "DSTPORT": lambda: str(random.randint(1024, 65535)),
+}
+PLACEHOLDER_RE = re.compile(r"\{(" + "|".join(PLACEHOLDERS) + r")\}")
+
+
+def fill_placeholders(message: str) -> str:
+    if "{" not in message:
+        return message
+    values = {}
+
+    def sub(m):
+        key = m.group(1)
+        if key not in values:
+            values[key] = PLACEHOLDERS[key]()
+        return values[key]
+
+    return PLACEHOLDER_RE.sub(sub, message)
+
+
 def format_syslog(entry: dict) -> str:
     ts_raw = entry.get("timestamp")
     try:
@@ -38,50 +70,100 @@ def format_syslog(entry: dict) -> str:
         correlation = entry.get("metadata", {}).get("correlationId", "0000")
         pid = str(abs(hash(correlation)) % 10000)
 
-    message = (
-        entry.get("message", "")
-        .strip()
-        .replace("{USERID}", random.choice(USERNAMES))
-        .replace("{USERNAME}", random.choice(USERNAMES))
-        .replace("{CLIENTIP}", CLIENT_IP)
-        .replace("{SESSIONID}", CLIENT_IP)
-        .replace("{SRCIP}", CLIENT_IP)
-        .replace("{DSTIP}", str(random_ipv4()))
-        .replace("{SRCPORT}", str(random.randint(1024, 65535)))
-        .replace("{DSTPORT}", str(random.randint(1024, 65535)))
-    )
+    message = fill_placeholders(entry.get("message", "").strip())
 
     return f"{ts_str} {host} {service}[{pid}]: {message}"
 
 
-def jsonl_to_linux_logs_loop():
-    while True:
-        for jsonl_file in Path(LOG_DIR).glob("*.jsonl"):
-            if used.get(jsonl_file) is None:
-                time.sleep(1)
-                process_file(jsonl_file)
+class JsonlConverter:
+    """Converts the generator's *.jsonl files in log_dir into *.log syslog lines.
 
-                try:
-                    os.remove(jsonl_file)
-                except:
-                    pass
+    The .jsonl files are tailed with a LogWatcher while the generator
+    appends to them, so every complete line is converted right away and
+    no more than the watcher's read budget is held in memory. Between
+    passes the converter sleeps on directory events.
 
+    Input offsets are checkpointed after the output is flushed; a crash in
+    between converts a few lines twice rather than losing them. A .jsonl
+    file converted to its end and left unchanged for remove_after seconds
+    is deleted, as the old converter did after each file.
+    """
 
-def process_file(jsonl_path: Path):
-    out_path = str(jsonl_path).replace(".jsonl", ".log")
+    def __init__(self, log_dir, state_path=None, remove_after=60.0, use_inotify=True):
+        self.log_dir = log_dir
+        self.remove_after = remove_after
+        self.watcher = LogWatcher(log_dir, state_path, use_inotify, suffix=".jsonl")
 
-    with open(jsonl_path, "r") as src, open(out_path, "w") as dst:
-        for line in src:
-            line = line.strip()
+        self._outputs = {}
+        self._last_line = {}
+        self._next_idle_check = time.monotonic() + IDLE_CHECK_INTERVAL
 
-            if not line:
-                continue
+        self.converted = 0
+        self.invalid = 0
+
+    def _output(self, name):
+        out = self._outputs.get(name)
+        if out is None:
+            path = os.path.join(self.log_dir, name.replace(".jsonl", ".log"))
+            out = self._outputs[name] = open(path, "a", encoding="utf-8")
+        return out
+
+    def convert_new(self):
+        """Convert what was appended since the last call; lines read."""
+        entries = self.watcher.read_new()
+        now = time.monotonic()
+
+        for entry in entries:
             try:
-                entry = json.loads(line)
-                dst.write(format_syslog(entry) + "\n")
-            except json.JSONDecodeError:
+                line = format_syslog(json.loads(entry["line"]))
+            except (ValueError, AttributeError):
+                self.invalid += 1
                 continue
+            self._output(entry["file"]).write(line + "\n")
+            self._last_line[entry["file"]] = now
+
+        if entries:
+            for out in self._outputs.values():
+                out.flush()
+            self.watcher.checkpoint()
+            self.converted += len(entries)
+
+        if now >= self._next_idle_check:
+            self._remove_idle(now)
+            self._next_idle_check = now + IDLE_CHECK_INTERVAL
+        return len(entries)
+
+    def _remove_idle(self, now):
+        offsets = {(f["dev"], f["ino"]): f["offset"] for f in self.watcher.snapshot()}
+        for name, last in list(self._last_line.items()):
+            if now - last < self.remove_after:
+                continue
+            del self._last_line[name]
+            out = self._outputs.pop(name, None)
+            if out:
+                out.close()
+
+            path = os.path.join(self.log_dir, name)
+            try:
+                st = os.stat(path)
+                # only once everything in it is converted
+                if offsets.get((st.st_dev, st.st_ino)) == st.st_size:
+                    os.remove(path)
+                    print(f"[OK] {name} → {name.replace('.jsonl', '.log')}")
+            except OSError:
+                pass
+
+    def run(self):
+        while True:
+            if not self.convert_new():
+                self.watcher.wait(max(0.0, self._next_idle_check - time.monotonic()))
+
+    def close(self):
+        for out in self._outputs.values():
+            out.close()
+        self._outputs.clear()
+        self.watcher.close()
 
-        used[jsonl_path] = True
 
-    print(f"[OK] {os.path.basename(jsonl_path)} → {os.path.basename(out_path)}")
+def jsonl_to_linux_logs_loop():
+    JsonlConverter(LOG_DIR, CONVERT_OFFSETS_PATH, CONVERT_REMOVE_AFTER).run()
@@ -1,36 +1,319 @@
+import json
 import os
+import select
+import stat
+import time
+
+from inotify import IN_Q_OVERFLOW, Inotify
+
+READ_CHUNK = 64 * 1024
+# a longer line is cut here and marked, the rest of it skipped
+MAX_LINE_BYTES = 1 << 20
+TRUNCATED = " [truncated]"
+# per file per read_new call, so one busy file cannot balloon a batch
+MAX_READ_BYTES = 1 << 20
+# how long a rotated-away file is still drained before it is let go
+ROTATED_GRACE = 5.0
+# bytes just before the offset, re-checked to catch a file rewritten in place
+TAIL_BYTES = 32
+
+
+class _Tracked:
+    __slots__ = ("key", "name", "fd", "offset", "tail", "skipping", "rotated_at", "behind")
+
+    def __init__(self, key, name, fd, offset=0, tail=b"", skipping=False):
+        self.key = key
+        self.name = name
+        self.fd = fd
+        self.offset = offset
+        self.tail = tail
+        # inside the cut-off rest of an over-long line
+        self.skipping = skipping
+        self.rotated_at = None
+        # stopped at MAX_READ_BYTES with more to read
+        self.behind = False
 
 
 class LogWatcher:
-    def __init__(self, log_dir):
+    """Tails the files in log_dir whose names end in suffix (*.log).
+
+    Files are tracked by (st_dev, st_ino) through an open fd, so a file that
+    is renamed or deleted by rotation is still read to the end, and the new
+    file under the old name starts from 0. A file that shrinks, or whose
+    bytes just before the offset changed, is treated as truncated and
+    re-read from the start. Only complete lines are returned; one longer
+    than MAX_LINE_BYTES comes out cut there, ending in TRUNCATED. Directory
+    changes come from inotify where available, else from listing the
+    directory on every call.
+
+    Offsets live in memory until checkpoint(), which writes them to
+    state_path atomically; call it once the returned lines are delivered,
+    or pass it a snapshot() taken when the delivered lines were read.
+    """
+
+    def __init__(self, log_dir, state_path=None, use_inotify=True, suffix=".log"):
         self.log_dir = log_dir
-        self.positions = {}
+        self.state_path = state_path
+        self.suffix = suffix
+        os.makedirs(log_dir, exist_ok=True)
 
-    def read_new(self):
-        entries = []
+        self._files = {}
+        self._by_name = {}
+        self._saved = self._load_state()
+        self._checkpointed = None
+        self._rescan = True
 
-        for filename in os.listdir(self.log_dir):
-            if not filename.endswith(".log"):
-                continue
+        self._inotify = None
+        if use_inotify:
+            try:
+                self._inotify = Inotify()
+                self._inotify.add_watch(log_dir)
+            except OSError as e:
+                print(f"[WATCHER] inotify unavailable ({e}), polling {log_dir}")
+                self._close_inotify()
+
+        self._resume_rotated()
 
-            path = os.path.join(self.log_dir, filename)
+    def _load_state(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[WATCHER] ignoring unreadable offsets {self.state_path}: {e}")
+            return {}
+        return {
+            (f["dev"], f["ino"]): (
+                f["offset"],
+                bytes.fromhex(f.get("tail", "")),
+                f.get("skipping", False),
+            )
+            for f in state.get("files", [])
+        }
 
-            if not os.path.isfile(path):
+    def _resume_rotated(self):
+        # a checkpointed file may have been rotated away while we were down
+        for name in os.listdir(self.log_dir):
+            if name.endswith(self.suffix):
                 continue
+            try:
+                st = os.stat(os.path.join(self.log_dir, name))
+            except OSError:
+                continue
+            if (st.st_dev, st.st_ino) in self._saved:
+                tracked = self._open(name, (st.st_dev, st.st_ino))
+                if tracked:
+                    tracked.rotated_at = time.monotonic()
+
+    def _open(self, name, key):
+        try:
+            fd = os.open(os.path.join(self.log_dir, name), os.O_RDONLY | os.O_CLOEXEC)
+        except OSError:
+            return None
+        st = os.fstat(fd)
+        if (st.st_dev, st.st_ino) != key:
+            # replaced between stat and open, pick it up on the next pass
+            os.close(fd)
+            return None
+
+        tracked = _Tracked(key, name, fd, *self._saved.pop(key, (0, b"", False)))
+        self._files[key] = tracked
+        return tracked
+
+    def _track(self, name):
+        try:
+            st = os.stat(os.path.join(self.log_dir, name))
+        except OSError:
+            st = None
+
+        current = self._by_name.get(name)
+        key = (st.st_dev, st.st_ino) if st else None
+        if current == key:
+            return
+
+        if current is not None:
+            # renamed away or deleted: drain what is left through the fd
+            del self._by_name[name]
+            old = self._files.get(current)
+            if old:
+                old.rotated_at = time.monotonic()
+
+        if st is None or not name.endswith(self.suffix) or not stat.S_ISREG(st.st_mode):
+            return
+
+        tracked = self._files.get(key) or self._open(name, key)
+        if tracked:
+            tracked.name = name
+            tracked.rotated_at = None
+            self._by_name[name] = key
+
+    def _changed_names(self):
+        if self._inotify is None or self._rescan:
+            self._rescan = False
+            return set(os.listdir(self.log_dir)) | set(self._by_name)
+
+        names = set()
+        for mask, name in self._inotify.read_events():
+            if mask & IN_Q_OVERFLOW:
+                return set(os.listdir(self.log_dir)) | set(self._by_name)
+            if name:
+                names.add(name)
+        return names
+
+    def _read(self, tracked):
+        entries = []
+        size = os.fstat(tracked.fd).st_size
+        if size < tracked.offset or not self._same_tail(tracked):
+            print(f"[WATCHER] {tracked.name} truncated, reading from the start")
+            tracked.offset = 0
+            tracked.tail = b""
+            tracked.skipping = False
+
+        read = 0
+        while read < MAX_READ_BYTES:
+            chunk = os.pread(tracked.fd, READ_CHUNK, tracked.offset)
+            if not chunk:
+                break
 
-            if path not in self.positions:
-                self.positions[path] = 0
+            if tracked.skipping:
+                end = chunk.find(b"\n") + 1
+                tracked.skipping = not end
+                read += self._advance(tracked, chunk[: end or len(chunk)])
+                continue
 
-            with open(path, "r", errors="ignore") as f:
-                f.seek(self.positions[path])
-                lines = f.readlines()
-                self.positions[path] = f.tell()
+            end = chunk.rfind(b"\n") + 1
+            if not end and len(chunk) == READ_CHUNK:
+                # one line longer than a chunk: wait for all of it, up to
+                # MAX_LINE_BYTES, the offset staying at its start meanwhile
+                chunk = os.pread(tracked.fd, MAX_LINE_BYTES, tracked.offset)
+                end = chunk.find(b"\n") + 1
+            if not end:
+                if len(chunk) < MAX_LINE_BYTES:
+                    # incomplete last line, wait for the rest
+                    break
+                print(
+                    f"[WATCHER] {tracked.name}: line at {tracked.offset} longer than "
+                    f"{MAX_LINE_BYTES} bytes, truncated"
+                )
+                entries.append(self._entry(tracked, chunk, truncated=True))
+                tracked.skipping = True
+                read += self._advance(tracked, chunk)
+                continue
 
-            for line in lines:
+            for line in chunk[:end].split(b"\n"):
                 line = line.strip()
-                if not line:
-                    continue
+                if line:
+                    entries.append(self._entry(tracked, line))
+            read += self._advance(tracked, chunk[:end])
+
+        tracked.behind = read >= MAX_READ_BYTES
+        return entries
 
-                entries.append({"file": filename, "line": line})
+    @staticmethod
+    def _entry(tracked, line, truncated=False):
+        line = line.decode("utf-8", "ignore")
+        if truncated:
+            line = line.rstrip() + TRUNCATED
+        return {"file": tracked.name, "line": line}
+
+    @staticmethod
+    def _advance(tracked, data):
+        tracked.offset += len(data)
+        tracked.tail = (tracked.tail + data)[-TAIL_BYTES:]
+        return len(data)
+
+    @staticmethod
+    def _same_tail(tracked):
+        if not tracked.tail:
+            return True
+        start = tracked.offset - len(tracked.tail)
+        return os.pread(tracked.fd, len(tracked.tail), start) == tracked.tail
+
+    def _release(self, tracked):
+        # last line of a rotated file may lack its newline
+        rest = b""
+        if not tracked.skipping:
+            rest = os.pread(tracked.fd, MAX_LINE_BYTES + 1, tracked.offset).strip()
+        os.close(tracked.fd)
+        del self._files[tracked.key]
+        if rest:
+            truncated = len(rest) > MAX_LINE_BYTES
+            return [self._entry(tracked, rest[:MAX_LINE_BYTES], truncated)]
+        return []
+
+    def read_new(self):
+        changed = self._changed_names()
+        for name in changed:
+            self._track(name)
+
+        entries = []
+        now = time.monotonic()
+        for tracked in list(self._files.values()):
+            rotated = tracked.rotated_at is not None
+            quiet = not (rotated or tracked.behind or tracked.name in changed)
+            if self._inotify is not None and quiet:
+                continue
+
+            lines = self._read(tracked)
+            entries.extend(lines)
+
+            if rotated and not lines:
+                gone = os.fstat(tracked.fd).st_nlink == 0
+                if gone or now - tracked.rotated_at > ROTATED_GRACE:
+                    entries.extend(self._release(tracked))
 
         return entries
+
+    def wait(self, timeout):
+        """Block until the directory changes or timeout passes."""
+        if any(t.behind for t in self._files.values()):
+            return
+        if self._inotify is None:
+            time.sleep(timeout)
+        else:
+            select.select([self._inotify], [], [], timeout)
+
+    def snapshot(self):
+        """Offsets of everything returned so far, for a later checkpoint()."""
+        return [
+            {
+                "dev": t.key[0],
+                "ino": t.key[1],
+                "name": t.name,
+                "offset": t.offset,
+                "tail": t.tail.hex(),
+                "skipping": t.skipping,
+            }
+            for t in self._files.values()
+        ]
+
+    def checkpoint(self, files=None):
+        """Persist offsets atomically: the current ones, or a snapshot()."""
+        if not self.state_path:
+            return
+
+        if files is None:
+            files = self.snapshot()
+        if files == self._checkpointed:
+            return
+
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"files": files}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.state_path)
+        self._checkpointed = files
+
+    def _close_inotify(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def close(self):
+        self._close_inotify()
+        for tracked in self._files.values():
+            os.close(tracked.fd)
+        self._files.clear()
+        self._by_name.clear()
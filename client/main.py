@@ -2,69 +2,77 @@ import threading
 import time
 
 from auth import AuthClient
-from config import (CLIENT_ID, CLIENT_IP, LOG_DIR, LOG_ENDPOINT, MAC_ADDRESS,
-                    SEND_INTERVAL, SERVER_URL)
+from config import (BATCH_ENCODING, BATCH_LINGER, BATCH_MAX_EVENTS, CLIENT_ID,
+                    CLIENT_INPUT, CLIENT_IP, GENERATOR_SOCKET, LOG_DIR,
+                    LOG_ENDPOINT, LOG_OFFSETS_PATH, MAC_ADDRESS, MAX_IN_FLIGHT,
+                    RETRY_BASE, RETRY_MAX, SERVER_URL, SPOOL_DIR,
+                    SPOOL_FSYNC_INTERVAL, SPOOL_MAX_BYTES, SPOOL_MMAP,
+                    SPOOL_SEGMENT_BYTES)
+from event_stream import EventStream
 from generator_runner import start_generator
 from log_formatter import jsonl_to_linux_logs_loop
 from log_watcher import LogWatcher
+from sender import Sender
+from spool import Spool
+from transport import pick_encoding
 
-BATCH_SIZE = 50
 
-
-def send_loop():
+def send_loop(source):
     auth = AuthClient()
 
     while not auth.authenticate():
         print("[CLIENT] Waiting for authentication...")
         time.sleep(2)
 
-    session = auth.get_session()
-    watcher = LogWatcher(LOG_DIR)
-
-    buffer = []
-
-    while True:
-        entries = watcher.read_new()
-
-        for entry in entries:
-            buffer.append(
-                {
-                    "client_id": CLIENT_ID,
-                    "mac": MAC_ADDRESS,
-                    "ip": CLIENT_IP,
-                    "message": entry["line"],
-                }
-            )
-
-        if len(buffer) >= BATCH_SIZE:
-            try:
-                r = session.post(
-                    SERVER_URL + LOG_ENDPOINT,
-                    json={"events": buffer},
-                    timeout=5,
-                )
-
-                if r.status_code == 401:
-                    print("[CLIENT] JWT expired, re-auth...")
-                    auth.authenticate()
-                    session = auth.get_session()
-                else:
-                    buffer.clear()
-
-            except Exception as e:
-                print("[CLIENT] Send error:", e)
-
-        time.sleep(SEND_INTERVAL)
+    encoding = pick_encoding(BATCH_ENCODING, auth.accept_encoding)
+    print(f"[CLIENT] Batch encoding: {encoding or 'json'}")
+
+    spool = Spool(
+        SPOOL_DIR,
+        segment_bytes=SPOOL_SEGMENT_BYTES,
+        max_bytes=SPOOL_MAX_BYTES,
+        fsync_interval=SPOOL_FSYNC_INTERVAL,
+        use_mmap=SPOOL_MMAP,
+    )
+
+    Sender(
+        auth,
+        source,
+        spool,
+        SERVER_URL + LOG_ENDPOINT,
+        CLIENT_ID,
+        MAC_ADDRESS,
+        CLIENT_IP,
+        encoding=encoding,
+        batch_size=BATCH_MAX_EVENTS,
+        linger=BATCH_LINGER,
+        in_flight=MAX_IN_FLIGHT,
+        retry_base=RETRY_BASE,
+        retry_max=RETRY_MAX,
+    ).run()
 
 
 def main():
     print(f"[CLIENT] Starting client {CLIENT_ID}")
 
-    threading.Thread(target=start_generator, daemon=True).start()
-    threading.Thread(
-        target=jsonl_to_linux_logs_loop, daemon=True, name="jsonl-to-linux"
-    ).start()
-    threading.Thread(target=send_loop, daemon=True).start()
+    if CLIENT_INPUT == "files":
+        threading.Thread(target=start_generator, daemon=True).start()
+        threading.Thread(
+            target=jsonl_to_linux_logs_loop, daemon=True, name="jsonl-to-linux"
+        ).start()
+        source = LogWatcher(LOG_DIR, LOG_OFFSETS_PATH)
+    else:
+        source = EventStream(CLIENT_ID)
+        if CLIENT_INPUT == "pipe":
+            threading.Thread(
+                target=start_generator, args=(source.feed,), daemon=True
+            ).start()
+        else:
+            host, port = GENERATOR_SOCKET.rsplit(":", 1)
+            source.serve((host, int(port)))
+    print(f"[CLIENT] Generator input: {CLIENT_INPUT}")
+
+    threading.Thread(target=send_loop, args=(source,), daemon=True).start()
 
     while True:
         time.sleep(1)
@@ -0,0 +1,261 @@
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from transport import encode_batch
+
+SENT, RETRY, REAUTH, DROP = "sent", "retry", "reauth", "drop"
+
+
+def backoff_delay(attempt, base, cap):
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class Batch:
+    __slots__ = ("seq", "id", "lines", "queued_at", "position", "attempts", "body")
+
+    def __init__(self, seq, lines, queued_at, start, position, spool_id):
+        self.seq = seq
+        # the server drops a batch id it has already accepted, so a retry
+        # after a lost response does not store the lines twice; the spool
+        # span keeps the id when a restart sends the batch again
+        self.id = f"{spool_id}:{start[0]}.{start[1]}-{position[0]}.{position[1]}"
+        self.lines = lines
+        self.queued_at = queued_at
+        self.position = position
+        self.attempts = 0
+        self.body = None
+
+
+class Sender:
+    """Moves lines from a LogWatcher (or EventStream) through a Spool to /api/log.
+
+    Everything the watcher returns is appended to the spool right away,
+    and the watcher's offsets are checkpointed once the spool has fsync'ed
+    it, so an outage or restart loses nothing short of the spool cap.
+
+    A batch goes out when the spool holds batch_size unread lines or when
+    its oldest unread line has waited linger seconds. Up to in_flight
+    batches are posted at once, each worker on its own keep-alive session.
+    Failed posts are retried with exponential backoff and jitter under the
+    same batch id; the first success wakes the other workers, so a
+    recovered server is drained at full speed. 401 and 403 keep the batch
+    and re-authenticate before the retry; only a batch the server rejects
+    as malformed (400) or too large (413) is dropped. The spool is
+    committed only up to the oldest batch not yet acknowledged.
+    """
+
+    def __init__(
+        self,
+        auth,
+        watcher,
+        spool,
+        url,
+        client_id,
+        mac,
+        ip,
+        encoding=None,
+        batch_size=500,
+        linger=1.0,
+        in_flight=4,
+        retry_base=0.5,
+        retry_max=30.0,
+        timeout=5,
+    ):
+        self.auth = auth
+        self.watcher = watcher
+        self.spool = spool
+        self.url = url
+        self.client_id = client_id
+        self.mac = mac
+        self.ip = ip
+        self.encoding = encoding
+        self.batch_size = batch_size
+        self.linger = linger
+        self.in_flight = in_flight
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.timeout = timeout
+
+        self._batches = queue.Queue(maxsize=in_flight)
+        self._seq = 0
+        self._snapshot = None
+
+        self._ack_lock = threading.Lock()
+        self._acked = {}
+        self._next_ack = 0
+        self._recovered = threading.Condition()
+
+        self._auth_lock = threading.Lock()
+        self._auth_epoch = 0
+
+        self.sent_events = 0
+        self.sent_batches = 0
+        self.retries = 0
+        self.dropped = 0
+        self.latencies = deque(maxlen=100_000)
+
+    def start(self):
+        for i in range(self.in_flight):
+            threading.Thread(
+                target=self._worker, daemon=True, name=f"sender-{i}"
+            ).start()
+        return self
+
+    def run(self):
+        self.start()
+        while True:
+            self.poll()
+
+    def poll(self):
+        """One round: spool new lines, send what is due, wait if idle."""
+        entries = self.watcher.read_new()
+        if entries:
+            self.spool.append([entry["line"] for entry in entries])
+            self._snapshot = self.watcher.snapshot()
+
+        if self.spool.sync_if_due() and self._snapshot is not None:
+            # the spooled lines are on disk, the log files may move on
+            self.watcher.checkpoint(self._snapshot)
+
+        self._flush_due()
+
+        if not entries:
+            oldest = self.spool.oldest_unread_at()
+            wait = self.spool.fsync_interval
+            if oldest is not None:
+                wait = min(wait, oldest + self.linger - time.monotonic())
+            if wait > 0:
+                self.watcher.wait(wait)
+
+    def _flush_due(self):
+        while not self._batches.full():
+            oldest = self.spool.oldest_unread_at()
+            if oldest is None:
+                return
+            if self.spool.unread < self.batch_size and time.monotonic() - oldest < self.linger:
+                return
+
+            start = self.spool.read_position
+            lines, position = self.spool.read(self.batch_size)
+            if not lines:
+                return
+            # never blocks: while all workers are busy lines wait in the spool
+            self._batches.put(Batch(self._seq, lines, oldest, start, position, self.spool.id))
+            self._seq += 1
+
+    def _session(self):
+        session = requests.Session()
+        session.headers.update(self.auth.get_session().headers)
+        session.cookies.update(self.auth.get_session().cookies)
+        return session
+
+    def _reauth(self, epoch):
+        with self._auth_lock:
+            # one worker re-authenticates, the others pick up its cookie
+            if self._auth_epoch == epoch:
+                print("[CLIENT] JWT expired, re-auth...")
+                self.auth.authenticate()
+                self._auth_epoch += 1
+            return self._auth_epoch
+
+    def _worker(self):
+        session = self._session()
+        epoch = self._auth_epoch
+        while True:
+            batch = self._batches.get()
+            while True:
+                outcome, delay = self._post(session, batch)
+                if outcome == REAUTH:
+                    epoch = self._reauth(epoch)
+                    session = self._session()
+                    # back off if the fresh token is refused as well
+                    if batch.attempts:
+                        with self._recovered:
+                            self._recovered.wait(delay)
+                    batch.attempts += 1
+                elif outcome == RETRY:
+                    batch.attempts += 1
+                    self.retries += 1
+                    with self._recovered:
+                        self._recovered.wait(delay)
+                else:
+                    break
+            self._ack(batch, outcome)
+
+    def _post(self, session, batch):
+        encoding = self.encoding
+        if batch.body is None or batch.body[0] != encoding:
+            body, headers = encode_batch(
+                batch.lines, encoding, self.client_id, self.mac, self.ip
+            )
+            headers["X-Batch-Id"] = batch.id
+            batch.body = (encoding, body, headers)
+        _, body, headers = batch.body
+
+        delay = backoff_delay(batch.attempts, self.retry_base, self.retry_max)
+        try:
+            r = session.post(self.url, data=body, headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            print(f"[CLIENT] Send error: {e}, retry #{batch.attempts + 1} in {delay:.1f}s")
+            return RETRY, delay
+
+        if r.status_code < 300:
+            return SENT, 0
+        if r.status_code in (401, 403):
+            # an expired token, or a MAC / IP the allowlist lost: the
+            # lines stay spooled until the server takes them again
+            if r.status_code == 403:
+                print(f"[CLIENT] Refused ({r.text.strip()}), re-auth in {delay:.1f}s")
+            return REAUTH, delay
+        if r.status_code == 415 and encoding is not None:
+            print(f"[CLIENT] Server refused {encoding}, falling back to json")
+            self.encoding = None
+            return RETRY, 0
+        if r.status_code in (400, 413):
+            # the batch itself is refused, sending it again cannot help
+            print(f"[CLIENT] Batch of {len(batch.lines)} rejected: {r.status_code} {r.text}")
+            return DROP, 0
+
+        retry_after = r.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            delay = max(delay, int(retry_after))
+        print(f"[CLIENT] Server busy ({r.status_code}), retry in {delay:.1f}s")
+        return RETRY, delay
+
+    def _ack(self, batch, outcome):
+        if outcome == SENT and batch.attempts:
+            # the server is reachable again: stop the others backing off
+            with self._recovered:
+                self._recovered.notify_all()
+
+        with self._ack_lock:
+            if outcome == SENT:
+                self.sent_events += len(batch.lines)
+                self.sent_batches += 1
+                self.latencies.append(time.monotonic() - batch.queued_at)
+            else:
+                self.dropped += len(batch.lines)
+
+            # commit up to the oldest batch still in flight
+            self._acked[batch.seq] = batch.position
+            position = None
+            while self._next_ack in self._acked:
+                position = self._acked.pop(self._next_ack)
+                self._next_ack += 1
+            if position is not None:
+                self.spool.commit(position)
+
+    def stats(self):
+        return {
+            "spooled": self.spool.unread,
+            "spool_bytes": self.spool.size_bytes(),
+            "sent_events": self.sent_events,
+            "sent_batches": self.sent_batches,
+            "retries": self.retries,
+            "dropped": self.dropped,
+        }
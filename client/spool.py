@@ -0,0 +1,358 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import uuid
+import zlib
+from collections import deque
+
+# record: length, crc32 of the payload, then the UTF-8 line
+HEADER = struct.Struct("<II")
+READ_AHEAD = 256 * 1024
+
+
+def _segment_name(seq):
+    return f"{seq:08d}.seg"
+
+
+class Spool:
+    """Append-only on-disk queue of log lines between the watcher and sender.
+
+    Lines go to numbered segment files of about segment_bytes each. A
+    reader cursor walks them in order. commit() records how far the
+    server has acknowledged, and whole segments behind it are deleted.
+    Past max_bytes the oldest segment is dropped even if it was never
+    sent, so an outage costs the oldest data rather than unbounded disk.
+
+    Writes are one write() per append and are fsync'ed at most every
+    fsync_interval seconds by sync_if_due(). Sealed segments can be read
+    through mmap (use_mmap); the active one is always read with pread.
+    """
+
+    def __init__(
+        self,
+        path,
+        segment_bytes=8 << 20,
+        max_bytes=256 << 20,
+        fsync_interval=1.0,
+        use_mmap=False,
+    ):
+        self.path = path
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max(max_bytes, segment_bytes)
+        self.fsync_interval = fsync_interval
+        self.use_mmap = use_mmap
+        os.makedirs(path, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._cursor_path = os.path.join(path, "cursor.json")
+        self.id = self._load_id()
+        self._sizes = {}
+        for name in sorted(os.listdir(path)):
+            if name.endswith(".seg"):
+                self._sizes[int(name[:-4])] = os.path.getsize(os.path.join(path, name))
+
+        committed = self._load_cursor()
+        if committed[0] not in self._sizes and self._sizes:
+            committed = (min(self._sizes), 0)
+        self._committed = committed
+        self._read_pos = committed
+        self._cursor_written = committed
+
+        self._recover_tail()
+        self._write_seq = max(self._sizes, default=committed[0])
+        self._fd = self._open_segment(self._write_seq)
+
+        self._readers = {}
+        self._dirty = False
+        self._last_sync = time.monotonic()
+
+        # [records, appended_at] per append, for linger; data from a
+        # previous run counts as already overdue
+        self.unread = self._count_records(self._read_pos)
+        self._marks = deque([[self.unread, 0.0]] if self.unread else [])
+        self.dropped_bytes = 0
+
+    def _load_cursor(self):
+        try:
+            with open(self._cursor_path) as f:
+                cursor = json.load(f)
+            return cursor["segment"], cursor["offset"]
+        except (OSError, ValueError, KeyError):
+            return 0, 0
+
+    def _load_id(self):
+        # positions restart at 0 in a new spool; the id tells its batches
+        # apart from an old one's, and from other clients', on the server
+        id_path = os.path.join(self.path, "spool.id")
+        try:
+            with open(id_path) as f:
+                spool_id = f.read().strip()
+            if spool_id:
+                return spool_id
+        except OSError:
+            pass
+        spool_id = uuid.uuid4().hex
+        tmp = id_path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(spool_id)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, id_path)
+        return spool_id
+
+    @property
+    def read_position(self):
+        """Where the next read() starts."""
+        with self._lock:
+            return self._read_pos
+
+    def _segment_path(self, seq):
+        return os.path.join(self.path, _segment_name(seq))
+
+    def _open_segment(self, seq):
+        new = seq not in self._sizes
+        fd = os.open(
+            self._segment_path(seq), os.O_WRONLY | os.O_CREAT | os.O_APPEND | os.O_CLOEXEC, 0o644
+        )
+        self._sizes.setdefault(seq, 0)
+        if new:
+            dir_fd = os.open(self.path, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        return fd
+
+    def _scan(self, seq, offset):
+        """Walk record headers from offset; return (records, end offset)."""
+        size = self._sizes[seq]
+        records = 0
+        with open(self._segment_path(seq), "rb") as f:
+            f.seek(offset)
+            while offset + HEADER.size <= size:
+                header = f.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    break
+                length, _ = HEADER.unpack(header)
+                if offset + HEADER.size + length > size:
+                    break
+                f.seek(length, os.SEEK_CUR)
+                offset += HEADER.size + length
+                records += 1
+        return records, offset
+
+    def _recover_tail(self):
+        # a crash can leave half a record at the end of the last segment
+        if not self._sizes:
+            return
+        last = max(self._sizes)
+        _, end = self._scan(last, 0)
+        if end < self._sizes[last]:
+            print(f"[SPOOL] truncating torn tail of {_segment_name(last)} at {end}")
+            os.truncate(self._segment_path(last), end)
+            self._sizes[last] = end
+
+    def _count_records(self, pos):
+        seq, offset = pos
+        total = 0
+        for s in sorted(self._sizes):
+            if s < seq:
+                continue
+            records, _ = self._scan(s, offset if s == seq else 0)
+            total += records
+        return total
+
+    def size_bytes(self):
+        return sum(self._sizes.values())
+
+    def append(self, lines):
+        if not lines:
+            return
+        data = bytearray()
+        for line in lines:
+            payload = line.encode("utf-8", "replace")
+            data += HEADER.pack(len(payload), zlib.crc32(payload))
+            data += payload
+
+        with self._lock:
+            if self._sizes[self._write_seq] and (
+                self._sizes[self._write_seq] + len(data) > self.segment_bytes
+            ):
+                self._roll()
+            os.write(self._fd, data)
+            self._sizes[self._write_seq] += len(data)
+            self._dirty = True
+
+            self.unread += len(lines)
+            self._marks.append([len(lines), time.monotonic()])
+            self._evict()
+
+    def _roll(self):
+        os.fsync(self._fd)
+        os.close(self._fd)
+        self._write_seq += 1
+        self._fd = self._open_segment(self._write_seq)
+
+    def _evict(self):
+        while self.size_bytes() > self.max_bytes and len(self._sizes) > 1:
+            oldest = min(self._sizes)
+            if oldest == self._write_seq:
+                break
+
+            if self._read_pos[0] == oldest:
+                lost, _ = self._scan(oldest, self._read_pos[1])
+                self._consume_marks(lost)
+                self.unread -= lost
+                self._read_pos = (oldest + 1, 0)
+            if self._committed[0] <= oldest:
+                self._committed = (oldest + 1, 0)
+
+            size = self._sizes.pop(oldest)
+            self._drop_reader(oldest)
+            os.remove(self._segment_path(oldest))
+            self.dropped_bytes += size
+            print(f"[SPOOL] over {self.max_bytes} bytes, dropped {_segment_name(oldest)}")
+
+    def _consume_marks(self, n):
+        while n and self._marks:
+            mark = self._marks[0]
+            take = min(n, mark[0])
+            mark[0] -= take
+            n -= take
+            if not mark[0]:
+                self._marks.popleft()
+
+    def oldest_unread_at(self):
+        with self._lock:
+            return self._marks[0][1] if self._marks else None
+
+    def _reader(self, seq):
+        reader = self._readers.get(seq)
+        if reader is None:
+            fd = os.open(self._segment_path(seq), os.O_RDONLY | os.O_CLOEXEC)
+            mm = None
+            if self.use_mmap and seq != self._write_seq and self._sizes[seq]:
+                mm = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+            reader = self._readers[seq] = (fd, mm)
+        return reader
+
+    def _drop_reader(self, seq):
+        reader = self._readers.pop(seq, None)
+        if reader:
+            fd, mm = reader
+            if mm is not None:
+                mm.close()
+            os.close(fd)
+
+    def _read_segment(self, seq, offset, max_records):
+        """(lines, offset after them, offset of a corrupt record or None);
+        past a corrupt record the rest of the segment is skipped."""
+        fd, mm = self._reader(seq)
+        size = self._sizes[seq]
+        lines = []
+        while len(lines) < max_records and offset + HEADER.size <= size:
+            start = offset
+            if mm is not None:
+                buf, base = mm, 0
+            else:
+                buf, base = os.pread(fd, min(READ_AHEAD, size - offset), offset), offset
+                length, _ = HEADER.unpack_from(buf, 0)
+                if HEADER.size + length > len(buf):
+                    buf = os.pread(fd, HEADER.size + length, offset)
+
+            pos = offset - base
+            limit = size - base if mm is not None else len(buf)
+            while len(lines) < max_records and pos + HEADER.size <= limit:
+                length, crc = HEADER.unpack_from(buf, pos)
+                end = pos + HEADER.size + length
+                if end > limit:
+                    break
+                payload = bytes(buf[pos + HEADER.size : end])
+                if zlib.crc32(payload) != crc:
+                    print(f"[SPOOL] corrupt record in {_segment_name(seq)} at {base + pos}")
+                    return lines, size, base + pos
+                lines.append(payload.decode("utf-8", "replace"))
+                pos = end
+            offset = base + pos
+            if offset == start:
+                print(f"[SPOOL] bad record length in {_segment_name(seq)} at {offset}")
+                return lines, size, offset
+        return lines, offset, None
+
+    def read(self, max_records):
+        """Next unread lines and the position just after them, for commit()."""
+        with self._lock:
+            lines = []
+            skipped = []
+            seq, offset = self._read_pos
+            while len(lines) < max_records and seq in self._sizes:
+                got, offset, corrupt = self._read_segment(seq, offset, max_records - len(lines))
+                lines.extend(got)
+                if corrupt is not None:
+                    skipped.append((seq, corrupt, offset))
+                if offset < self._sizes[seq] or seq == self._write_seq:
+                    break
+                seq, offset = seq + 1, 0
+
+            self._read_pos = (seq, offset)
+            consumed = len(lines)
+            if skipped:
+                # a bad length hides how many records the skipped bytes
+                # held: count what is left instead, so unread and the
+                # linger marks cannot keep lines that will never be read
+                consumed = self.unread - self._count_records(self._read_pos)
+                for s, start, end in skipped:
+                    self.dropped_bytes += end - start
+                    print(f"[SPOOL] dropped bytes {start}-{end} of {_segment_name(s)}")
+                if consumed > len(lines):
+                    print(f"[SPOOL] {consumed - len(lines)} spooled lines lost with them")
+            self.unread -= consumed
+            self._consume_marks(consumed)
+            return lines, self._read_pos
+
+    def commit(self, position):
+        """Everything before position is delivered; drop finished segments."""
+        with self._lock:
+            if position <= self._committed:
+                return
+            self._committed = position
+            for seq in sorted(self._sizes):
+                if seq >= position[0] or seq == self._write_seq:
+                    break
+                self._drop_reader(seq)
+                self._sizes.pop(seq)
+                os.remove(self._segment_path(seq))
+
+    def sync_if_due(self, force=False):
+        """fsync appended data and save the cursor; True if data was synced."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_sync < self.fsync_interval:
+                return False
+            self._last_sync = now
+
+            synced = self._dirty
+            if self._dirty:
+                os.fsync(self._fd)
+                self._dirty = False
+
+            if self._committed != self._cursor_written:
+                tmp = self._cursor_path + ".tmp"
+                with open(tmp, "w") as f:
+                    json.dump({"segment": self._committed[0], "offset": self._committed[1]}, f)
+                    # on disk before the rename, or a crash can leave an empty cursor
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self._cursor_path)
+                self._cursor_written = self._committed
+            return synced
+
+    def close(self):
+        self.sync_if_due(force=True)
+        with self._lock:
+            for seq in list(self._readers):
+                self._drop_reader(seq)
+            os.close(self._fd)
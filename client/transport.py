@@ -0,0 +1,53 @@
+import gzip
+import json
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# preferred first
+LOCAL_ENCODINGS = ["zstd", "gzip"] if zstandard else ["gzip"]
+
+
+def pick_encoding(preference, server_accepts):
+    """Batch encoding for /api/log, or None for the plain JSON body."""
+    if preference == "json":
+        return None
+
+    offered = {e.strip().lower() for e in (server_accepts or "").split(",")}
+    candidates = LOCAL_ENCODINGS if preference == "auto" else [preference]
+    for encoding in candidates:
+        if encoding in offered and encoding in LOCAL_ENCODINGS:
+            return encoding
+    return None
+
+
+def encode_batch(messages, encoding, client_id, mac, ip):
+    """Return (body, headers) for one batch of raw log lines."""
+    if encoding is None:
+        events = [
+            {"client_id": client_id, "mac": mac, "ip": ip, "message": message}
+            for message in messages
+        ]
+        return json.dumps({"events": events}).encode(), {
+            "Content-Type": "application/json"
+        }
+
+    # mac rides in the session's X-MAC-ADDRESS header
+    body = "\n".join(json.dumps({"message": m}) for m in messages).encode()
+    if encoding == "zstd":
+        body = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    else:
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+    return body, {
+        "Content-Type": NDJSON_MIMETYPE,
+        "Content-Encoding": encoding,
+        "X-Client-Id": client_id,
+        "X-Client-Ip": ip,
+    }
@@ -1,37 +1,156 @@
-import sqlite3
-
-from config import DB_PATH
-from flask import Blueprint, jsonify, request
-
-admin_bp = Blueprint("admin", __name__)
-
-
-@admin_bp.route("/api/admin/threats", methods=["GET"])
-def get_new_threats():
-    since = request.args.get("since", "1970-01-01 00:00:00")
-    with sqlite3.connect(DB_PATH) as conn:
-        c = conn.cursor()
-        c.execute(
-            """
-            SELECT id, client_id, mac, ip, log, timestamp
-            FROM threats
-            WHERE timestamp > ?
-            ORDER BY timestamp ASC
-        """,
-            (since,),
+import csv
+import io
+import json
+
+import rollups
+from auth_middleware import admin_only
+from flask import Blueprint, Response, jsonify, request
+from listing import (
+    LOG_COLUMNS,
+    LOG_FILTERS,
+    THREAT_COLUMNS,
+    THREAT_FILTERS,
+    client_page,
+    iter_logs,
+    iter_threats,
+    log_page,
+    threat_page,
+)
+from search import search_logs
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+# an export response is written out in pieces of about this size
+EXPORT_FLUSH_BYTES = 64 << 10
+
+
+def filters_from(args, allowed):
+    return {name: args[name] for name in allowed if args.get(name)}
+
+
+def export_lines(rows, columns, fmt):
+    """Rows as NDJSON or CSV text, in pieces of about EXPORT_FLUSH_BYTES."""
+    buf = io.StringIO()
+    if fmt == "csv":
+        out = csv.writer(buf)
+        out.writerow(columns)
+        write = out.writerow
+    else:
+        def write(row):
+            buf.write(json.dumps(dict(zip(columns, row))) + "\n")
+
+    for row in rows:
+        write(row)
+        if buf.tell() >= EXPORT_FLUSH_BYTES:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def create_admin_blueprint(reader):
+    """/api/admin/*: logs, threats, clients, stats and search for admins.
+
+    Lists are keyset pages: ?limit= rows newest first, and `next`, passed
+    back as ?cursor= for the page after. Exports stream every matching
+    row oldest first as ?format=ndjson (default) or csv; the reader
+    connection is held until the export is done or the client goes away.
+    """
+    bp = Blueprint("admin", __name__, url_prefix="/api/admin")
+
+    def page(fetch, key, allowed):
+        args = request.args
+        try:
+            with reader.connection() as conn:
+                rows, next_cursor = fetch(
+                    conn, filters_from(args, allowed), args.get("cursor"), args.get("limit", 100)
+                )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({key: rows, "next": next_cursor})
+
+    def export(rows_of, columns, allowed, name):
+        fmt = request.args.get("format", "ndjson")
+        if fmt not in EXPORT_FORMATS:
+            return jsonify({"error": f"unknown format {fmt!r}"}), 400
+        filters = filters_from(request.args, allowed)
+
+        def body():
+            with reader.connection() as conn:
+                yield from export_lines(rows_of(conn, filters), columns, fmt)
+
+        return Response(
+            body(),
+            mimetype=EXPORT_FORMATS[fmt],
+            headers={"Content-Disposition": f"attachment; filename={name}.{fmt}"},
         )
-        rows = c.fetchall()
-
-    return jsonify(
-        [
-            {
-                "id": r[0],
-                "client_id": r[1],
-                "mac": r[2],
-                "ip": r[3],
-                "log": r[4],
-                "timestamp": r[5],
-            }
-            for r in rows
-        ]
-    )
+
+    @bp.route("/logs", methods=["GET"])
+    @admin_only
+    def logs():
+        """?client= ?ip= ?level= ?event_type= ?service= ?src_ip= ?since= ?until=,
+        newest first."""
+        return page(log_page, "logs", LOG_FILTERS)
+
+    @bp.route("/logs/export", methods=["GET"])
+    @admin_only
+    def export_logs():
+        return export(iter_logs, LOG_COLUMNS, LOG_FILTERS, "logs")
+
+    @bp.route("/threats", methods=["GET"])
+    @admin_only
+    def threats():
+        """?client= ?ip= ?since= ?until=, newest first."""
+        return page(threat_page, "threats", THREAT_FILTERS)
+
+    @bp.route("/threats/export", methods=["GET"])
+    @admin_only
+    def export_threats():
+        return export(iter_threats, THREAT_COLUMNS, THREAT_FILTERS, "threats")
+
+    @bp.route("/clients", methods=["GET"])
+    @admin_only
+    def clients():
+        """Every client_id / MAC seen, with its log and threat counts."""
+        args = request.args
+        try:
+            with reader.connection() as conn:
+                rows, next_cursor = client_page(conn, args.get("cursor"), args.get("limit", 100))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"clients": rows, "next": next_cursor})
+
+    @bp.route("/stats", methods=["GET"])
+    @admin_only
+    def stats():
+        """CLI stats from the rollup tables, all time or from ?since=."""
+        since = request.args.get("since")
+        with reader.connection() as conn:
+            result = rollups.summary(conn, since)
+            result["levels"] = dict(rollups.levels(conn, since))
+            result["top_threats"] = [
+                {"client_id": c, "threats": n} for c, n in rollups.top_threats(conn, 10, since)
+            ]
+        return jsonify(result)
+
+    @bp.route("/search", methods=["GET"])
+    @admin_only
+    def search():
+        """Logs matching ?q=, best first (or ?order=recent), ?limit= per
+        page and `next` passed back as ?cursor= for the page after."""
+        args = request.args
+        try:
+            with reader.connection() as conn:
+                results, next_cursor = search_logs(
+                    conn,
+                    args.get("q", ""),
+                    since=args.get("since"),
+                    client=args.get("client"),
+                    limit=args.get("limit", 20),
+                    cursor=args.get("cursor"),
+                    order=args.get("order", "rank"),
+                )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"results": results, "next": next_cursor})
+
+    return bp
@@ -1,22 +1,50 @@
+import json
 import os
 import sqlite3
+import sys
 import threading
 import time
-from datetime import datetime, timedelta
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rollups  # noqa: E402
+from correlation import correlate_history  # noqa: E402
+from listing import log_page  # noqa: E402
+from partitions import Partitions  # noqa: E402
+from search import search_logs  # noqa: E402
+from storage import ReadPool, connect  # noqa: E402
 
 DB_PATH = os.getenv("DB_PATH", "app/db.sqlite3")
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "4"))
+DB_RETENTION_DAYS = int(os.getenv("DB_RETENTION_DAYS", "0"))
+DB_HOT_DAYS = int(os.getenv("DB_HOT_DAYS", "2"))
+THREAT_STREAM_URL = os.getenv(
+    "THREAT_STREAM_URL",
+    f"http://127.0.0.1:{os.getenv('SERVER_PORT', '8000')}/api/threats/stream",
+)
+# the server sends a keep-alive every THREAT_STREAM_KEEPALIVE (15 s)
+WATCH_TIMEOUT = 60
 
 HELP_TEXT = """
 Available commands:
  help                         - show this help
- stats                        - show summary statistics
- stats levels                 - logs count by INFO/WARNING/THREAT
+ stats [since <ts>]           - show summary statistics
+ stats levels [since <ts>]    - logs count by INFO/WARNING/THREAT
  threats [N]                  - show last N threats
  logs                          - show last logs
  logs user <name>             - filter logs by client_id
  logs level <INFO|WARNING|THREAT>
+ logs ip <ip>                 - filter logs by client ip
+ logs src <ip>                - filter logs by the source ip in the message
+ logs service <name>          - filter logs by syslog service
+ search <words> [since <YYYY-MM-DD[THH:MM:SS]>] [client <id>]
+                              - best matching logs, `word*` for a prefix
  clients                      - list all clients
- top-threats                  - top clients by threat count
+ top-threats [since <ts>]     - top clients by threat count
+ rollups check|rebuild        - compare stats rollups with logs/threats, recount them
+ partitions                   - day partitions of logs: size, hot or frozen
+ maintain                     - drop days past DB_RETENTION_DAYS, freeze cold days
  correlate                    - run attack correlation engine
  watch                        - real-time threat monitoring
  stop                         - stop watching
@@ -24,98 +52,165 @@ Available commands:
 """
 
 
+def since_arg(cmd):
+    """The timestamp after `since` in a command, None without one."""
+    parts = cmd.split(" since ", 1)
+    return parts[1].strip() if len(parts) == 2 else None
+
+
 class AdminCLI:
     def __init__(self):
         self.running = True
         self.watching = False
-        self.last_check = "1970-01-01 00:00:00"
+        # threats.id of the last threat shown; None until watch starts
+        self.last_id = None
+        self.stream = None
         self.watch_thread = None
+        self.reader = ReadPool(DB_PATH, DB_READ_POOL_SIZE)
 
     def watch_threats(self):
         print("[WATCH] Real-time THREAT monitoring started")
+        polling = False
         while self.watching:
             try:
-                with sqlite3.connect(DB_PATH) as conn:
-                    c = conn.cursor()
-                    c.execute(
-                        """
-                        SELECT timestamp, client_id, ip, message
-                        FROM threats
-                        WHERE timestamp > ?
-                        ORDER BY timestamp ASC
-                        """,
-                        (self.last_check,),
-                    )
-                    rows = c.fetchall()
-
-                    if rows:
-                        for r in rows:
-                            print(
-                                f"[THREAT] {r[0]} | client={r[1]} | ip={r[2]} | {r[3]}"
-                            )
-                        self.last_check = rows[-1][0]
+                self.follow_stream()
+                polling = False
             except Exception as e:
-                print("[ERROR] watch:", e)
-
-            time.sleep(2)
-
-    def correlate_attacks(self):
-        # more than 4 unsuccesful login then succesful -> bruteforce correlation
-        window_start = (datetime.utcnow() - timedelta(minutes=2)).strftime(
-            "%Y-%m-%d %H:%M:%S"
-        )
-
-        inserted = 0
-
-        with sqlite3.connect(DB_PATH) as conn:
-            c = conn.cursor()
-
-            c.execute(
+                if not self.watching:
+                    break
+                # server not reachable: read the table by id until it is back
+                if not polling:
+                    print(f"[WATCH] stream unavailable ({e}), polling the database")
+                    polling = True
+                try:
+                    self.poll_db()
+                except Exception as e:
+                    print("[ERROR] watch:", e)
+                    time.sleep(2)
+
+    def follow_stream(self):
+        """Print threats pushed on THREAT_STREAM_URL, resuming at self.last_id."""
+        headers = {"Accept": "text/event-stream"}
+        if self.last_id is not None:
+            headers["Last-Event-ID"] = str(self.last_id)
+        req = urllib.request.Request(THREAT_STREAM_URL, headers=headers)
+
+        with urllib.request.urlopen(req, timeout=WATCH_TIMEOUT) as resp:
+            self.stream = resp
+            event_id, data = None, None
+            for raw in resp:
+                if not self.watching:
+                    return
+                line = raw.decode().rstrip("\r\n")
+                if line.startswith("id:"):
+                    event_id = int(line[3:])
+                elif line.startswith("data:"):
+                    data = line[5:].strip()
+                elif line.startswith(": cursor") and self.last_id is None:
+                    self.last_id = int(line.split()[-1])
+                elif not line and data is not None:
+                    t = json.loads(data)
+                    self.print_threat(t["timestamp"], t["client_id"], t["ip"], t["message"])
+                    self.last_id = event_id
+                    event_id, data = None, None
+
+    def poll_db(self):
+        with self.reader.connection() as conn:
+            if self.last_id is None:
+                self.last_id = conn.execute("SELECT MAX(id) FROM threats").fetchone()[0] or 0
+            rows = conn.execute(
                 """
-                SELECT client_id, ip, COUNT(*)
-                FROM logs
-                WHERE message LIKE '%Failed login attempt%'
-                  AND timestamp > ?
-                GROUP BY client_id, ip
-                HAVING COUNT(*) >= 5
+                SELECT id, timestamp, client_id, ip, message
+                FROM threats
+                WHERE id > ?
+                ORDER BY id
                 """,
-                (window_start,),
-            )
-
-            suspects = c.fetchall()
-
-            for client_id, ip, attempts in suspects:
-                c.execute(
-                    """
-                    SELECT timestamp
-                    FROM logs
-                    WHERE client_id = ?
-                      AND message LIKE '%login successful%'
-                      AND timestamp > ?
-                    ORDER BY timestamp DESC
-                    LIMIT 1
-                    """,
-                    (client_id, window_start),
-                )
-                success = c.fetchone()
+                (self.last_id,),
+            ).fetchall()
+        for r in rows:
+            self.print_threat(*r[1:])
+            self.last_id = r[0]
+        time.sleep(2)
 
-                if success:
-                    msg = (
-                        f"Bruteforce suspected: {attempts} failed logins "
-                        f"followed by successful login"
-                    )
-                    ts = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    def print_threat(self, timestamp, client_id, ip, message):
+        print(f"[THREAT] {timestamp} | client={client_id} | ip={ip} | {message}")
 
-                    c.execute(
-                        """
-                        INSERT INTO threats (timestamp, client_id, mac, ip, level, message)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                        """,
-                        (ts, client_id, "-", ip, "THREAT", msg),
-                    )
-                    inserted += 1
+    def stop_watching(self):
+        self.watching = False
+        stream, self.stream = self.stream, None
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+    def search(self, args):
+        words, options = [], {}
+        while args:
+            word = args.pop(0)
+            if word in ("since", "client") and args:
+                options[word] = args.pop(0)
+            else:
+                words.append(word)
 
-            conn.commit()
+        try:
+            with self.reader.connection() as conn:
+                results, next_cursor = search_logs(
+                    conn, " ".join(words), options.get("since"), options.get("client")
+                )
+        except (ValueError, sqlite3.OperationalError) as e:
+            print("[ERROR] search:", e)
+            return
+
+        for r in results:
+            print(f"{r['timestamp']} | {r['client_id']} | {r['level']} | {r['message']}")
+        if next_cursor:
+            print(f"... more than {len(results)} matches, narrow with since/client")
+
+    def show_logs(self, filters, n=20):
+        with self.reader.connection() as conn:
+            rows, _ = log_page(conn, filters, limit=n)
+        for r in rows:
+            print(f"{r['timestamp']} | {r['client_id']} | {r['level']} | {r['message']}")
+
+    def check_rollups(self, repair):
+        # a full recount: seconds on a large table, unlike the stats themselves
+        conn = connect(DB_PATH)
+        try:
+            partitions = Partitions(DB_PATH)
+            if repair:
+                rollups.rebuild(conn, partitions)
+            diffs = rollups.check(conn, partitions)
+        finally:
+            conn.close()
+
+        for table, bad in diffs.items():
+            print(f"{table}: {'ok' if not bad else f'{bad} rows differ'}")
+
+    def show_partitions(self):
+        for day, size, cold in Partitions(DB_PATH).stats():
+            print(f"{day} | {size / 1e6:10.1f} MB | {'frozen' if cold else 'hot'}")
+
+    def maintain(self):
+        # the server does this every DB_MAINTENANCE_INTERVAL as well
+        conn = connect(DB_PATH)
+        try:
+            done = Partitions(DB_PATH).maintain(conn, DB_RETENTION_DAYS, DB_HOT_DAYS)
+        finally:
+            conn.close()
+
+        print(f"Dropped: {', '.join(done['dropped']) or '-'}")
+        print(f"Frozen: {', '.join(done['frozen']) or '-'}")
+        print(f"Expired threats: {done['threats_deleted']}")
+
+    def correlate_attacks(self):
+        # N failed logins then a successful one, over the whole table; the
+        # server raises these live, this catches anything stored before
+        conn = connect(DB_PATH)
+        try:
+            inserted = correlate_history(conn)
+        finally:
+            conn.close()
 
         print(f"[CORRELATION] New correlated threats: {inserted}")
 
@@ -129,7 +224,7 @@ class AdminCLI:
             except (KeyboardInterrupt, EOFError):
                 print("\nExiting CLI...")
                 self.running = False
-                self.watching = False
+                self.stop_watching()
                 break
 
             if not cmd:
@@ -147,27 +242,19 @@ class AdminCLI:
                     self.watch_thread.start()
 
             elif cmd == "stop":
-                self.watching = False
+                self.stop_watching()
                 print("[WATCH] Stopped")
 
-            elif cmd == "stats":
-                with sqlite3.connect(DB_PATH) as conn:
-                    c = conn.cursor()
-                    c.execute("SELECT COUNT(*) FROM logs")
-                    logs = c.fetchone()[0]
-                    c.execute("SELECT COUNT(*) FROM threats")
-                    threats = c.fetchone()[0]
-                    c.execute("SELECT COUNT(DISTINCT client_id) FROM logs")
-                    clients = c.fetchone()[0]
+            elif cmd.startswith("stats levels"):
+                with self.reader.connection() as conn:
+                    for lvl, cnt in rollups.levels(conn, since_arg(cmd)):
+                        print(f"{lvl}: {cnt}")
 
-                print(f"Logs: {logs} | Threats: {threats} | Clients: {clients}")
+            elif cmd.startswith("stats"):
+                with self.reader.connection() as conn:
+                    s = rollups.summary(conn, since_arg(cmd))
 
-            elif cmd == "stats levels":
-                with sqlite3.connect(DB_PATH) as conn:
-                    c = conn.cursor()
-                    c.execute("SELECT level, COUNT(*) FROM logs GROUP BY level")
-                    for lvl, cnt in c.fetchall():
-                        print(f"{lvl}: {cnt}")
+                print(f"Logs: {s['logs']} | Threats: {s['threats']} | Clients: {s['clients']}")
 
             elif cmd.startswith("threats"):
                 n = 10
@@ -178,7 +265,7 @@ class AdminCLI:
                     except:
                         pass
 
-                with sqlite3.connect(DB_PATH) as conn:
+                with self.reader.connection() as conn:
                     c = conn.cursor()
                     c.execute(
                         """
@@ -194,53 +281,53 @@ class AdminCLI:
 
             elif cmd.startswith("logs"):
                 parts = cmd.split()
-                query = "SELECT timestamp, client_id, level, message FROM logs"
-                params = []
+                filters = {}
 
                 if len(parts) == 3 and parts[1] == "user":
-                    query += " WHERE client_id=?"
-                    params.append(parts[2])
+                    filters["client"] = parts[2]
 
                 elif len(parts) == 3 and parts[1] == "level":
-                    query += " WHERE level=?"
-                    params.append(parts[2].upper())
+                    filters["level"] = parts[2]
 
-                query += " ORDER BY timestamp DESC LIMIT 20"
+                elif len(parts) == 3 and parts[1] == "ip":
+                    filters["ip"] = parts[2]
 
-                with sqlite3.connect(DB_PATH) as conn:
-                    c = conn.cursor()
-                    c.execute(query, params)
-                    for r in c.fetchall():
-                        print(f"{r[0]} | {r[1]} | {r[2]} | {r[3]}")
+                elif len(parts) == 3 and parts[1] == "src":
+                    filters["src_ip"] = parts[2]
+
+                elif len(parts) == 3 and parts[1] == "service":
+                    filters["service"] = parts[2]
+
+                self.show_logs(filters)
+
+            elif cmd.startswith("search "):
+                self.search(cmd.split()[1:])
 
             elif cmd == "clients":
-                with sqlite3.connect(DB_PATH) as conn:
-                    c = conn.cursor()
-                    c.execute("SELECT DISTINCT client_id, mac FROM logs")
-                    for r in c.fetchall():
+                with self.reader.connection() as conn:
+                    for r in rollups.clients(conn):
                         print(f"{r[0]} | {r[1]}")
 
-            elif cmd == "top-threats":
-                with sqlite3.connect(DB_PATH) as conn:
-                    c = conn.cursor()
-                    c.execute(
-                        """
-                        SELECT client_id, COUNT(*)
-                        FROM threats
-                        GROUP BY client_id
-                        ORDER BY COUNT(*) DESC
-                        LIMIT 10
-                        """
-                    )
-                    for r in c.fetchall():
+            elif cmd.startswith("top-threats"):
+                with self.reader.connection() as conn:
+                    for r in rollups.top_threats(conn, 10, since_arg(cmd)):
                         print(f"{r[0]} -> {r[1]} threats")
 
+            elif cmd in ("rollups check", "rollups rebuild"):
+                self.check_rollups(repair=cmd.endswith("rebuild"))
+
+            elif cmd == "partitions":
+                self.show_partitions()
+
+            elif cmd == "maintain":
+                self.maintain()
+
             elif cmd == "correlate":
                 self.correlate_attacks()
 
             elif cmd == "exit":
                 self.running = False
-                self.watching = False
+                self.stop_watching()
                 print("Bye")
 
             else:
@@ -0,0 +1,88 @@
+import ipaddress
+import os
+import socket
+
+
+class PrefixSet:
+    """IP membership against a set of CIDR ranges.
+
+    Networks are bucketed by prefix length, so a lookup is one hash probe
+    per distinct length in use (at most 33 for IPv4, usually two or three)
+    no matter how many ranges are listed.
+    """
+
+    def __init__(self, networks=()):
+        self._tables = {4: {}, 6: {}}
+        for net in networks:
+            self.add(net)
+
+    def add(self, net):
+        net = ipaddress.ip_network(net, strict=False)
+        shift = net.max_prefixlen - net.prefixlen
+        table = self._tables[net.version]
+        table.setdefault(shift, set()).add(int(net.network_address) >> shift)
+
+    def __contains__(self, ip):
+        try:
+            # dotted IPv4 is the common case and much cheaper than ipaddress
+            value = int.from_bytes(socket.inet_pton(socket.AF_INET, ip), "big")
+            version = 4
+        except (OSError, TypeError):
+            try:
+                addr = ipaddress.ip_address(ip)
+            except ValueError:
+                return False
+            if addr.version == 6 and addr.ipv4_mapped:
+                addr = addr.ipv4_mapped
+            value, version = int(addr), addr.version
+
+        for shift, prefixes in self._tables[version].items():
+            if value >> shift in prefixes:
+                return True
+        return False
+
+    def __len__(self):
+        return sum(len(p) for t in self._tables.values() for p in t.values())
+
+
+class Allowlist:
+    def __init__(self, macs=(), networks=()):
+        self.macs = {mac.strip().upper() for mac in macs if mac.strip()}
+        self.networks = PrefixSet()
+        for net in networks:
+            net = net.strip()
+            if not net:
+                continue
+            try:
+                self.networks.add(net)
+            except ValueError:
+                print(f"[AUTH] skipping bad allowlist entry: {net}")
+
+    def allows_mac(self, mac):
+        return bool(mac) and mac.upper() in self.macs
+
+    def allows_ip(self, ip):
+        return bool(ip) and ip in self.networks
+
+
+def read_allowlist_file(path):
+    """One MAC, IP or CIDR per line; '#' starts a comment."""
+    macs, networks = [], []
+    with open(path) as f:
+        for line in f:
+            entry = line.split("#", 1)[0].strip()
+            if not entry:
+                continue
+            try:
+                ipaddress.ip_network(entry, strict=False)
+                networks.append(entry)
+            except ValueError:
+                macs.append(entry)
+    return macs, networks
+
+
+def file_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
@@ -1,28 +1,151 @@
+import threading
+import time
+from collections import OrderedDict
+
 import jwt
-from config import AUTHORIZED_IPS, AUTHORIZED_MACS, JWT_ALGORITHM, JWT_SECRET
+from allowlist import Allowlist, file_mtime, read_allowlist_file
+from config import (
+    ADMIN_ALLOWED_IPS,
+    AUTH_ALLOWLIST_FILE,
+    AUTH_RELOAD_INTERVAL,
+    AUTHORIZED_IPS,
+    AUTHORIZED_MACS,
+    JWT_ALGORITHM,
+    JWT_CACHE_SIZE,
+    JWT_SECRET,
+)
 from flask import jsonify, request
 
 
+class ClientAuth:
+    """JWT + MAC/IP checks with decoded tokens cached until their exp.
+
+    The allowlist is AUTHORIZED_MACS / AUTHORIZED_IPS plus AUTH_ALLOWLIST_FILE.
+    The file is stat'ed at most every reload_interval seconds; when it
+    changes the allowlist is rebuilt and the token cache dropped.
+    """
+
+    def __init__(
+        self,
+        secret,
+        algorithm,
+        macs=(),
+        ips=(),
+        allowlist_file="",
+        cache_size=10_000,
+        reload_interval=1.0,
+    ):
+        self.secret = secret
+        self.algorithm = algorithm
+        self.macs = list(macs)
+        self.ips = list(ips)
+        self.allowlist_file = allowlist_file
+        self.cache_size = cache_size
+        self.reload_interval = reload_interval
+
+        self._tokens = OrderedDict()
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._next_check = 0.0
+        self.reloads = 0
+        self.reload()
+
+    def reload(self):
+        macs, ips = list(self.macs), list(self.ips)
+        mtime = None
+        if self.allowlist_file:
+            mtime = file_mtime(self.allowlist_file)
+            if mtime is not None:
+                file_macs, file_ips = read_allowlist_file(self.allowlist_file)
+                macs += file_macs
+                ips += file_ips
+
+        allowlist = Allowlist(macs, ips)
+        with self._lock:
+            self.allowlist = allowlist
+            self._tokens.clear()
+            self._mtime = mtime
+        self.reloads += 1
+        print(
+            f"[AUTH] allowlist loaded: {len(allowlist.macs)} MACs, "
+            f"{len(allowlist.networks)} IP ranges"
+        )
+
+    def _maybe_reload(self, now):
+        if not self.allowlist_file or now < self._next_check:
+            return
+        self._next_check = now + self.reload_interval
+        if file_mtime(self.allowlist_file) != self._mtime:
+            self.reload()
+
+    def decode(self, token, now):
+        with self._lock:
+            cached = self._tokens.get(token)
+            if cached is not None:
+                payload, exp = cached
+                if now < exp:
+                    self._tokens.move_to_end(token)
+                    return payload
+                del self._tokens[token]
+
+        payload = jwt.decode(token, self.secret, algorithms=[self.algorithm])
+
+        exp = payload.get("exp")
+        if exp is not None:
+            with self._lock:
+                self._tokens[token] = (payload, exp)
+                if len(self._tokens) > self.cache_size:
+                    self._tokens.popitem(last=False)
+        return payload
+
+    def check(self, token, mac, client_ip):
+        now = time.time()
+        self._maybe_reload(now)
+
+        if not token:
+            return None, ("JWT required", 401)
+        try:
+            payload = self.decode(token, now)
+        except Exception:
+            return None, ("Invalid token", 401)
+
+        allowlist = self.allowlist
+        if not allowlist.allows_mac(mac):
+            return None, ("Unauthorized MAC", 403)
+
+        if not allowlist.allows_ip(client_ip):
+            return None, ("Unauthorized IP", 403)
+
+        return payload, None
+
+
+client_auth = ClientAuth(
+    JWT_SECRET,
+    JWT_ALGORITHM,
+    AUTHORIZED_MACS,
+    AUTHORIZED_IPS,
+    allowlist_file=AUTH_ALLOWLIST_FILE,
+    cache_size=JWT_CACHE_SIZE,
+    reload_interval=AUTH_RELOAD_INTERVAL,
+)
+
+
+def check_client(token, mac, client_ip):
+    """Return (payload, None) or (None, (error, status)). Framework-agnostic."""
+    return client_auth.check(token, mac, client_ip)
+
+
 def verify_request(f):
     from functools import wraps
 
     @wraps(f)
     def wrapper(*args, **kwargs):
-        token = request.cookies.get("access_token")
-        if not token:
-            return jsonify({"error": "JWT required"}), 401
-        try:
-            payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        except:
-            return jsonify({"error": "Invalid token"}), 401
-
         mac = request.headers.get("X-MAC-ADDRESS")
-        if not mac or mac not in AUTHORIZED_MACS:
-            return jsonify({"error": "Unauthorized MAC"}), 403
-
         client_ip = request.remote_addr
-        if client_ip not in AUTHORIZED_IPS:
-            return jsonify({"error": "Unauthorized IP"}), 403
+
+        payload, error = check_client(request.cookies.get("access_token"), mac, client_ip)
+        if error:
+            return jsonify({"error": error[0]}), error[1]
 
         request.client_mac = mac
         request.client_id = payload.get("client_id")
@@ -31,3 +154,19 @@ def verify_request(f):
         return f(*args, **kwargs)
 
     return wrapper
+
+
+admin_allowlist = Allowlist(networks=ADMIN_ALLOWED_IPS)
+
+
+def admin_only(f):
+    """Admin endpoints: no client JWT, only callers from ADMIN_ALLOWED_IPS."""
+    from functools import wraps
+
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if not admin_allowlist.allows_ip(request.remote_addr):
+            return jsonify({"error": "Unauthorized IP"}), 403
+        return f(*args, **kwargs)
+
+    return wrapper
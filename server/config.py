@@ -6,3 +6,48 @@ JWT_ALGORITHM = "HS256"
 JWT_EXP_SECONDS = 3600
 AUTHORIZED_MACS = os.getenv("AUTHORIZED_MACS", "").split(",")
 AUTHORIZED_IPS = os.getenv("AUTHORIZED_IPS", "").split(",")
+
+DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL")
+DB_COMMIT_ROWS = int(os.getenv("DB_COMMIT_ROWS", "5000"))
+DB_COMMIT_INTERVAL = float(os.getenv("DB_COMMIT_INTERVAL", "0.5"))
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "4"))
+
+INGEST_QUEUE_CAPACITY = int(os.getenv("INGEST_QUEUE_CAPACITY", "100000"))
+INGEST_WAKE_THRESHOLD = int(os.getenv("INGEST_WAKE_THRESHOLD", "1000"))
+INGEST_RETRY_AFTER = int(os.getenv("INGEST_RETRY_AFTER", "2"))
+# how many recent X-Batch-Id values /api/log remembers to drop client retries
+INGEST_DEDUP_BATCHES = int(os.getenv("INGEST_DEDUP_BATCHES", "100000"))
+ANALYSIS_INTERVAL = float(os.getenv("ANALYSIS_INTERVAL", "2"))
+ANALYSIS_BATCH_MAX = int(os.getenv("ANALYSIS_BATCH_MAX", "10000"))
+# 0 keeps analysis in the server process
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "0"))
+# per-window cap on tracked IPs / devices before LRU eviction
+WINDOW_MAX_KEYS = int(os.getenv("WINDOW_MAX_KEYS", "100000"))
+# port for the ASGI NDJSON stream endpoint, 0 disables it
+STREAM_PORT = int(os.getenv("STREAM_PORT", "8001"))
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+# request body cap on /api/log, and the cap on a batch once decompressed
+INGEST_MAX_BODY_BYTES = int(os.getenv("INGEST_MAX_BODY_BYTES", str(8 << 20)))
+INGEST_MAX_BATCH_BYTES = int(os.getenv("INGEST_MAX_BATCH_BYTES", str(32 << 20)))
+# optional file of extra MACs / IPs / CIDR ranges, re-read when it changes
+AUTH_ALLOWLIST_FILE = os.getenv("AUTH_ALLOWLIST_FILE", "")
+AUTH_RELOAD_INTERVAL = float(os.getenv("AUTH_RELOAD_INTERVAL", "1"))
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "10000"))
+# threats kept in memory for /api/threats watchers, how often the feed
+# looks for threats other processes inserted, and how often an idle event
+# stream sends a keep-alive comment
+THREAT_FEED_BUFFER = int(os.getenv("THREAT_FEED_BUFFER", "10000"))
+THREAT_FEED_REFRESH = float(os.getenv("THREAT_FEED_REFRESH", "2"))
+THREAT_STREAM_KEEPALIVE = float(os.getenv("THREAT_STREAM_KEEPALIVE", "15"))
+# who may read the admin endpoints (threat stream); the CLI runs on the server
+ADMIN_ALLOWED_IPS = os.getenv("ADMIN_ALLOWED_IPS", "127.0.0.1,::1").split(",")
+# correlation: this many failed logins from one client/IP, then a successful
+# login within CORRELATION_WINDOW seconds, raise one bruteforce incident
+CORRELATION_FAILURES = int(os.getenv("CORRELATION_FAILURES", "5"))
+CORRELATION_WINDOW = int(os.getenv("CORRELATION_WINDOW", "120"))
+# day partitions of logs (partitions.py): days kept (0 keeps all), days
+# still written to before one is compacted and made read-only, and how
+# often the server runs retention / compaction, in seconds
+DB_RETENTION_DAYS = int(os.getenv("DB_RETENTION_DAYS", "0"))
+DB_HOT_DAYS = int(os.getenv("DB_HOT_DAYS", "2"))
+DB_MAINTENANCE_INTERVAL = float(os.getenv("DB_MAINTENANCE_INTERVAL", "3600"))
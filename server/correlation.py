@@ -0,0 +1,260 @@
+"""Attack correlation over logs.event_type.
+
+    python correlation.py                              # whole logs table
+    python correlation.py --since "2026-01-01 00:00:00"
+    python correlation.py --backfill                   # classify old rows first
+
+The server runs the same Correlator on every batch it writes, so incidents
+are raised as they happen; this is the batch pass for historical data.
+Every incident has a dedup_key and threats holds one row per key, so
+running it again over rows already correlated adds nothing.
+"""
+
+import argparse
+import calendar
+import time
+from collections import OrderedDict, deque
+
+from config import (
+    CORRELATION_FAILURES,
+    CORRELATION_WINDOW,
+    DB_PATH,
+    DB_SYNCHRONOUS,
+    WINDOW_MAX_KEYS,
+)
+from migrations import migrate
+from partitions import Partitions
+from pipeline import event_matcher
+from rollups import add_logs, add_threats
+from storage import connect, insert_threats
+
+LOGIN_EVENTS = ("FAILED_LOGIN", "SUCCESS_LOGIN")
+
+SELECT_LOGINS = """
+    SELECT timestamp, client_id, ip, event_type
+    FROM {db}.logs
+    WHERE event_type IN ('FAILED_LOGIN', 'SUCCESS_LOGIN') AND timestamp > ?
+    ORDER BY timestamp, id
+"""
+
+SELECT_UNTYPED = """
+    SELECT id, timestamp, client_id, mac, level, message FROM {db}.logs
+    WHERE id > ? AND event_type IS NULL
+    ORDER BY id LIMIT ?
+"""
+
+
+def parse_ts(ts):
+    """Epoch seconds of a "%Y-%m-%d %H:%M:%S" logs.timestamp, None if malformed."""
+    try:
+        date = (int(ts[:4]), int(ts[5:7]), int(ts[8:10]))
+        return calendar.timegm(date + (int(ts[11:13]), int(ts[14:16]), int(ts[17:19])))
+    except (TypeError, ValueError):
+        return None
+
+
+class Correlator:
+    """Bruteforce: `failures` failed logins from one (client_id, ip) followed
+    by a successful login on that client within `window` seconds.
+
+    feed() takes log rows as build_rows makes them, in arrival order, and
+    returns incident rows for INSERT_INCIDENT. Failed logins are kept per
+    (client_id, ip) for one window; a success that finds enough of them
+    raises one incident and consumes them. The dedup key names the client,
+    the ip and the first consumed failure, so the streaming and the batch
+    pass key the same incident the same way. At most max_keys pairs are
+    tracked, least recently failed first out.
+    """
+
+    def __init__(self, failures=5, window=120, max_keys=100_000):
+        self.failures = failures
+        self.window = window
+        self.max_keys = max_keys
+
+        self._failed = OrderedDict()  # (client_id, ip) -> deque of (epoch, ts)
+        self._ips = {}  # client_id -> ips with failures on record
+        self._next_sweep = None
+        self._last_ts = None
+        self._last_epoch = None
+
+        self.raised = 0
+        self.evicted = 0
+
+    def _epoch(self, ts):
+        # rows of one batch share their received-at second
+        if ts != self._last_ts:
+            self._last_ts = ts
+            self._last_epoch = parse_ts(ts)
+        return self._last_epoch
+
+    def feed(self, rows):
+        """Log rows (build_rows layout) in arrival order, returns incident rows."""
+        return self.feed_events(
+            (ts, client_id, ip, event_type)
+            for ts, client_id, _, ip, _, _, event_type, *_ in rows
+            if event_type in LOGIN_EVENTS
+        )
+
+    def feed_events(self, events):
+        """(timestamp, client_id, ip, event_type) tuples, returns incident rows."""
+        incidents = []
+        for ts, client_id, ip, event_type in events:
+            if event_type == "FAILED_LOGIN":
+                self.failed(ts, client_id, ip)
+            elif event_type == "SUCCESS_LOGIN":
+                incidents.extend(self.succeeded(ts, client_id))
+        return incidents
+
+    def failed(self, ts, client_id, ip):
+        now = self._epoch(ts)
+        if now is None:
+            return
+        self._sweep(now)
+
+        key = (client_id, ip)
+        failures = self._failed.get(key)
+        if failures is None:
+            failures = self._failed[key] = deque()
+            self._ips.setdefault(client_id, set()).add(ip)
+            if len(self._failed) > self.max_keys:
+                self._drop(next(iter(self._failed)))
+                self.evicted += 1
+        else:
+            self._failed.move_to_end(key)
+
+        failures.append((now, ts))
+        while failures[0][0] < now - self.window:
+            failures.popleft()
+
+    def succeeded(self, ts, client_id):
+        ips = self._ips.get(client_id)
+        if not ips:
+            return []
+        now = self._epoch(ts)
+        if now is None:
+            return []
+
+        incidents = []
+        for ip in list(ips):
+            key = (client_id, ip)
+            failures = self._failed[key]
+            while failures and failures[0][0] < now - self.window:
+                failures.popleft()
+            if len(failures) >= self.failures:
+                incidents.append(
+                    (
+                        ts,
+                        client_id,
+                        "-",
+                        ip,
+                        "THREAT",
+                        f"Bruteforce suspected: {len(failures)} failed logins "
+                        f"followed by successful login",
+                        f"bruteforce:{client_id}:{ip}:{failures[0][1]}",
+                    )
+                )
+                failures.clear()
+            if not failures:
+                self._drop(key)
+        self.raised += len(incidents)
+        return incidents
+
+    def _drop(self, key):
+        del self._failed[key]
+        client_id, ip = key
+        ips = self._ips[client_id]
+        ips.discard(ip)
+        if not ips:
+            del self._ips[client_id]
+
+    def _sweep(self, now):
+        # pairs that stopped failing; once per window of event time
+        if self._next_sweep is not None and now < self._next_sweep:
+            return
+        self._next_sweep = now + self.window
+        stale = [k for k, f in self._failed.items() if f[-1][0] < now - self.window]
+        for key in stale:
+            self._drop(key)
+
+    def stats(self):
+        return {
+            "tracked": len(self._failed),
+            "raised": self.raised,
+            "evicted": self.evicted,
+        }
+
+
+def correlate_history(conn, since="", correlator=None, chunk_size=10_000):
+    """Run a Correlator over stored logins in time order, return incidents added."""
+    if correlator is None:
+        correlator = Correlator(CORRELATION_FAILURES, CORRELATION_WINDOW, WINDOW_MAX_KEYS)
+    incidents = []
+    # day partitions in order, so the correlator sees one ordered stream
+    for _, db in Partitions.of(conn).each(conn, since=since):
+        cur = conn.execute(SELECT_LOGINS.format(db=db), (since,))
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            incidents.extend(correlator.feed_events(rows))
+
+    with conn:
+        inserted = [t for _, t in insert_threats(conn, incidents)]
+        add_threats(conn, inserted)
+    return len(inserted)
+
+
+def backfill_event_types(conn, chunk_size=10_000):
+    """Classify rows stored before logs.event_type existed, return rows typed."""
+    typed = 0
+    for _, db in Partitions.of(conn).each(conn, write=True):
+        last_id = 0
+        while True:
+            rows = conn.execute(SELECT_UNTYPED.format(db=db), (last_id, chunk_size)).fetchall()
+            if not rows:
+                break
+            updates, old_rows, new_rows = [], [], []
+            for row_id, ts, client_id, mac, level, message in rows:
+                kind = event_matcher.first(message or "")
+                if kind is None:
+                    continue
+                updates.append((kind, row_id))
+                old_rows.append((ts, client_id, mac, None, level, None, None))
+                new_rows.append((ts, client_id, mac, None, level, None, kind))
+            with conn:
+                conn.executemany(f"UPDATE {db}.logs SET event_type = ? WHERE id = ?", updates)
+                add_logs(conn, old_rows, -1)
+                add_logs(conn, new_rows)
+            typed += len(updates)
+            last_id = rows[-1][0]
+            print(f"[CORRELATION] classified {db} up to id {last_id:,}, {typed:,} typed")
+    return typed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Correlate stored logs")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--since", default="", help="only logs after this timestamp")
+    parser.add_argument(
+        "--backfill", action="store_true", help="classify rows without an event_type first"
+    )
+    args = parser.parse_args()
+
+    conn = connect(args.db, DB_SYNCHRONOUS)
+    try:
+        migrate(conn)
+        Partitions(args.db).migrate(conn)
+        if args.backfill:
+            backfill_event_types(conn)
+        t0 = time.perf_counter()
+        added = correlate_history(conn, args.since)
+        print(
+            f"[CORRELATION] {added} new correlated threats "
+            f"in {time.perf_counter() - t0:.2f}s"
+        )
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
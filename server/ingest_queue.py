@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class IngestQueue:
+    """Bounded buffer between receive_logs and the analysis worker.
+
+    offer() is all-or-nothing: a request whose events do not fit is
+    rejected as a whole so the client can retry it, nothing already
+    queued is ever dropped.
+
+    A batch_id makes the offer idempotent: the last dedup_batches accepted
+    ids are remembered, and offering one of them again succeeds without
+    queueing anything, so a client retry after a lost response is safe.
+    """
+
+    def __init__(self, capacity=100_000, wake_threshold=1000, dedup_batches=100_000):
+        self.capacity = capacity
+        self.wake_threshold = min(wake_threshold, capacity)
+        self.dedup_batches = dedup_batches
+
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._batch_ids = OrderedDict()
+
+        self.accepted = 0
+        self.rejected = 0
+        self.duplicates = 0
+
+    def offer(self, events, count_rejected=True, batch_id=None):
+        with self._cond:
+            if batch_id is not None and batch_id in self._batch_ids:
+                self.duplicates += len(events)
+                return True
+
+            if len(self._items) + len(events) > self.capacity:
+                if count_rejected:
+                    self.rejected += len(events)
+                return False
+
+            self._items.extend(events)
+            self.accepted += len(events)
+
+            if batch_id is not None:
+                self._batch_ids[batch_id] = None
+                if len(self._batch_ids) > self.dedup_batches:
+                    self._batch_ids.popitem(last=False)
+
+            if len(self._items) >= self.wake_threshold:
+                self._cond.notify()
+            return True
+
+    def take(self, max_items, timeout):
+        """Wait for wake_threshold items or timeout, then pop up to max_items."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while len(self._items) < self.wake_threshold:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            n = min(max_items, len(self._items))
+            return [self._items.popleft() for _ in range(n)]
+
+    def __len__(self):
+        return len(self._items)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+                "duplicates": self.duplicates,
+                "depth": len(self._items),
+                "capacity": self.capacity,
+            }
@@ -0,0 +1,200 @@
+"""Keyset-paginated and streamed reads of logs, threats and clients.
+
+A page is the `limit` rows after a cursor, newest first, with the cursor
+of its last row as `next`; there is never an OFFSET, so page 1000 costs
+what page 1 does. Logs are ordered by (timestamp, id), which every logs
+index ends in, and a page reads the day partitions from the cursor's day
+back only until it is full. Threats are ordered by id, clients by
+(client_id, mac). Cursors are opaque to callers.
+
+iter_logs / iter_threats yield every matching row oldest first, a chunk
+at a time, for exports that must not hold the result in memory.
+"""
+
+import base64
+import json
+
+from partitions import Partitions
+from syslog_parser import COLUMNS
+
+MAX_LIMIT = 1000
+CHUNK_SIZE = 1000
+
+LOG_COLUMNS = ("id", "timestamp", "client_id", "mac", "ip", "level", "message") + COLUMNS
+THREAT_COLUMNS = ("id", "timestamp", "client_id", "mac", "ip", "level", "message", "dedup_key")
+CLIENT_COLUMNS = ("client_id", "mac", "logs", "threats")
+
+# filter -> condition; each equality has an index that ends in timestamp
+# (logs, partitions.PARTITION_MIGRATIONS) or in id (threats, migrations)
+LOG_FILTERS = {
+    "client": "client_id = ?",
+    "ip": "ip = ?",
+    "level": "level = ?",
+    "event_type": "event_type = ?",
+    "service": "service = ?",
+    "src_ip": "src_ip = ?",
+    "since": "timestamp >= ?",
+    "until": "timestamp < ?",
+}
+THREAT_FILTERS = {
+    "client": "client_id = ?",
+    "ip": "ip = ?",
+    "since": "timestamp >= ?",
+    "until": "timestamp < ?",
+}
+
+SELECT_CLIENTS = """
+    SELECT c.client_id, c.mac,
+           (SELECT SUM(count) FROM rollup_logs_total l WHERE l.client_id = c.client_id),
+           (SELECT count FROM rollup_threats_total t WHERE t.client_id = c.client_id)
+    FROM rollup_clients c
+    {where}
+    ORDER BY c.client_id, c.mac
+    LIMIT ?
+"""
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor, size):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, UnicodeError):
+        raise ValueError("bad cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("bad cursor")
+    return values
+
+
+def clamp(limit):
+    return max(1, min(int(limit), MAX_LIMIT))
+
+
+def conditions(filters, allowed):
+    """WHERE clauses and params for the filters that are set."""
+    clauses, params = [], []
+    for name, value in filters.items():
+        if name not in allowed:
+            raise ValueError(f"unknown filter {name!r}")
+        if not value:
+            continue
+        if name == "level":
+            value = value.upper()
+        elif name in ("since", "until"):
+            value = value.replace("T", " ")
+        clauses.append(allowed[name])
+        params.append(value)
+    return clauses, params
+
+
+def where_sql(clauses):
+    return " WHERE " + " AND ".join(clauses) if clauses else ""
+
+
+def log_page(conn, filters, cursor=None, limit=100):
+    """(rows as dicts with LOG_COLUMNS, next cursor or None), newest first."""
+    limit = clamp(limit)
+    until, after = filters.get("until"), None
+    if cursor:
+        after = decode_cursor(cursor, 2)
+        if until and until.replace("T", " ") <= after[0]:
+            after = None  # until alone already ends before the cursor
+        else:
+            # one upper bound, or the index seeks to the other and filters
+            filters = {k: v for k, v in filters.items() if k != "until"}
+            until = after[0]
+    clauses, params = conditions(filters, LOG_FILTERS)
+    if after:
+        clauses.append("(timestamp, id) < (?, ?)")
+        params += after
+
+    sql = (
+        f"SELECT {', '.join(LOG_COLUMNS)} FROM {{db}}.logs{where_sql(clauses)} "
+        "ORDER BY timestamp DESC, id DESC LIMIT ?"
+    )
+    rows = []
+    partitions = Partitions.of(conn)
+    for _, db in partitions.each(conn, filters.get("since"), until, newest_first=True):
+        rows += conn.execute(sql.format(db=db), params + [limit + 1 - len(rows)]).fetchall()
+        if len(rows) > limit:
+            break  # older days sort after these
+
+    page = rows[:limit]
+    next_cursor = encode_cursor([page[-1][1], page[-1][0]]) if len(rows) > limit else None
+    return [dict(zip(LOG_COLUMNS, r)) for r in page], next_cursor
+
+
+def iter_logs(conn, filters, chunk_size=CHUNK_SIZE):
+    """Every matching log row as a LOG_COLUMNS tuple, oldest first."""
+    clauses, params = conditions(filters, LOG_FILTERS)
+    sql = (
+        f"SELECT {', '.join(LOG_COLUMNS)} FROM {{db}}.logs{where_sql(clauses)} "
+        "ORDER BY timestamp, id"
+    )
+    partitions = Partitions.of(conn)
+    for _, db in partitions.each(conn, filters.get("since"), filters.get("until")):
+        cur = conn.execute(sql.format(db=db), params)
+        try:
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            # a partition is detached after this; the statement must be done
+            cur.close()
+
+
+def threat_page(conn, filters, cursor=None, limit=100):
+    """(rows as dicts with THREAT_COLUMNS, next cursor or None), newest first."""
+    limit = clamp(limit)
+    clauses, params = conditions(filters, THREAT_FILTERS)
+    if cursor:
+        clauses.append("id < ?")
+        params += decode_cursor(cursor, 1)
+
+    rows = conn.execute(
+        f"SELECT {', '.join(THREAT_COLUMNS)} FROM threats{where_sql(clauses)} "
+        "ORDER BY id DESC LIMIT ?",
+        params + [limit + 1],
+    ).fetchall()
+    page = rows[:limit]
+    next_cursor = encode_cursor([page[-1][0]]) if len(rows) > limit else None
+    return [dict(zip(THREAT_COLUMNS, r)) for r in page], next_cursor
+
+
+def iter_threats(conn, filters, chunk_size=CHUNK_SIZE):
+    """Every matching threat as a THREAT_COLUMNS tuple, oldest first."""
+    clauses, params = conditions(filters, THREAT_FILTERS)
+    cur = conn.execute(
+        f"SELECT {', '.join(THREAT_COLUMNS)} FROM threats{where_sql(clauses)} ORDER BY id",
+        params,
+    )
+    try:
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cur.close()
+
+
+def client_page(conn, cursor=None, limit=100):
+    """(clients with their log / threat counts, next cursor or None)."""
+    limit = clamp(limit)
+    where, params = "", []
+    if cursor:
+        where = "WHERE (c.client_id, c.mac) > (?, ?)"
+        params = decode_cursor(cursor, 2)
+
+    rows = conn.execute(SELECT_CLIENTS.format(where=where), params + [limit + 1]).fetchall()
+    page = rows[:limit]
+    next_cursor = encode_cursor(list(page[-1][:2])) if len(rows) > limit else None
+    clients = [
+        dict(zip(CLIENT_COLUMNS, (client_id, mac, logs or 0, threats or 0)))
+        for client_id, mac, logs, threats in page
+    ]
+    return clients, next_cursor
@@ -1,112 +1,252 @@
 import re
 import time
-from collections import defaultdict, deque
+
+from syslog_parser import DEVICE_RE, IP_RE, LineMatch, SyslogParser, parse_syslog_time
+from window_store import WindowStore
+
+PATTERNS = {
+    "FAILED_LOGIN": re.compile(r"Failed login attempt", re.I),
+    "SUCCESS_LOGIN": re.compile(r"login successful", re.I),
+    "ACCOUNT_LOCK": re.compile(r"Account .* locked", re.I),
+    "SUSPICIOUS_LOGIN": re.compile(r"Suspicious login", re.I),
+    "RATE_LIMIT": re.compile(r"Rate limit exceeded", re.I),
+    "ATTEMPTS_HIGH": re.compile(r"Attempts:\s*[4-9]/", re.I),
+    "PASSWORD_CHANGE": re.compile(r"Password changed", re.I),
+    "ADMIN_PATH": re.compile(r"/admin", re.I),
+    "ERROR_5XX": re.compile(r"\s5\d\d\s"),
+    "BACKUP_CORRUPT": re.compile(r"Integrity:\s*CORRUPTED", re.I),
+    "BACKUP_GROWTH": re.compile(r"Backup size increased", re.I),
+    "DEVICE_SUSPICIOUS": re.compile(r"Suspicious device behavior", re.I),
+    "DEVICE_OFFLINE": re.compile(r"Device .* offline", re.I),
+    "FIRMWARE_OUTDATED": re.compile(r"firmware outdated", re.I),
+}
+
+# lowercase literal that every match of the rule contains.
+# True -> the literal is the whole pattern, no regex confirm needed
+PREFILTER = {
+    "FAILED_LOGIN": ("failed login attempt", True),
+    "SUCCESS_LOGIN": ("login successful", True),
+    "ACCOUNT_LOCK": ("locked", False),
+    "SUSPICIOUS_LOGIN": ("suspicious login", True),
+    "RATE_LIMIT": ("rate limit exceeded", True),
+    "ATTEMPTS_HIGH": ("attempts:", False),
+    "PASSWORD_CHANGE": ("password changed", True),
+    "ADMIN_PATH": ("/admin", True),
+    "ERROR_5XX": ("5", False),
+    "BACKUP_CORRUPT": ("corrupted", False),
+    "BACKUP_GROWTH": ("backup size increased", True),
+    "DEVICE_SUSPICIOUS": ("suspicious device behavior", True),
+    "DEVICE_OFFLINE": ("offline", False),
+    "FIRMWARE_OUTDATED": ("firmware outdated", True),
+}
+
+
+class RuleMatcher:
+    def __init__(self, patterns=PATTERNS, prefilter=PREFILTER):
+        self.patterns = patterns
+        self.prefilter = prefilter
+        self._checks = []
+        if prefilter:
+            for name, pattern in patterns.items():
+                literal, exact = prefilter[name]
+                self._checks.append((name, literal, None if exact else pattern))
+
+    def rules(self, line: str, low=None) -> set:
+        """Names of the rules the line matches; low is line.lower() if the
+        caller has it already."""
+        # str.lower() only agrees with re.I on ASCII, anything else takes
+        # the plain regex path
+        if self._checks and line.isascii():
+            low = line.lower() if low is None else low
+            return {
+                name
+                for name, literal, confirm in self._checks
+                if literal in low and (confirm is None or confirm.search(line))
+            }
+        return {name for name, p in self.patterns.items() if p.search(line)}
+
+    def match(self, line: str) -> LineMatch:
+        if self._checks and line.isascii():
+            low = line.lower()
+            rules = self.rules(line, low)
+
+            ip = None
+            if "IP:" in line:
+                m = IP_RE.search(line)
+                ip = m.group(1) if m else None
+
+            device = None
+            if "device" in low:
+                m = DEVICE_RE.search(line)
+                device = m.group(1) if m else None
+        else:
+            rules = self.rules(line)
+            m = IP_RE.search(line)
+            ip = m.group(1) if m else None
+            m = DEVICE_RE.search(line)
+            device = m.group(1) if m else None
+
+        return LineMatch(rules, ip, device)
+
+    def first(self, line: str):
+        """Name of the first rule, in PATTERNS order, that the line matches."""
+        if self._checks and line.isascii():
+            low = line.lower()
+            for name, literal, confirm in self._checks:
+                if literal in low and (confirm is None or confirm.search(line)):
+                    return name
+            return None
+        for name, p in self.patterns.items():
+            if p.search(line):
+                return name
+        return None
 
 
 class LogAnalyzer:
-    def __init__(self):
-        self.failed_logins = defaultdict(deque)
-        self.rate_limits = defaultdict(deque)
-        self.device_events = defaultdict(deque)
+    """Rule engine with per-IP / per-device sliding windows in event time.
+
+    Events are stamped with the time parsed from their syslog prefix (or
+    an explicit ts), so verdicts do not depend on when a batch happens to
+    be analyzed. Events may arrive up to allowed_lateness seconds behind
+    the newest one seen; window buckets and idle keys are only expired
+    once the watermark (newest - allowed_lateness) has moved a full WINDOW
+    past them. Anything later than that is still classified, against whatever
+    is left in the window, and counted in late_events.
+    """
 
+    def __init__(self, matcher=None, allowed_lateness=10, max_keys=100_000):
         self.WINDOW = 60  # seconds
 
-        self.patterns = {
-            "FAILED_LOGIN": re.compile(r"Failed login attempt", re.I),
-            "SUCCESS_LOGIN": re.compile(r"login successful", re.I),
-            "ACCOUNT_LOCK": re.compile(r"Account .* locked", re.I),
-            "SUSPICIOUS_LOGIN": re.compile(r"Suspicious login", re.I),
-            "RATE_LIMIT": re.compile(r"Rate limit exceeded", re.I),
-            "ATTEMPTS_HIGH": re.compile(r"Attempts:\s*[4-9]/", re.I),
-            "PASSWORD_CHANGE": re.compile(r"Password changed", re.I),
-            "ADMIN_PATH": re.compile(r"/admin", re.I),
-            "ERROR_5XX": re.compile(r"\s5\d\d\s"),
-            "BACKUP_CORRUPT": re.compile(r"Integrity:\s*CORRUPTED", re.I),
-            "BACKUP_GROWTH": re.compile(r"Backup size increased", re.I),
-            "DEVICE_SUSPICIOUS": re.compile(r"Suspicious device behavior", re.I),
-            "DEVICE_OFFLINE": re.compile(r"Device .* offline", re.I),
-            "FIRMWARE_OUTDATED": re.compile(r"firmware outdated", re.I),
+        self.failed_logins = WindowStore(self.WINDOW, max_keys)
+        self.rate_limits = WindowStore(self.WINDOW, max_keys)
+        self.device_events = WindowStore(self.WINDOW, max_keys)
+        self.allowed_lateness = allowed_lateness
+        self.max_event_time = None
+        self.late_events = 0
+
+        self.matcher = matcher or RuleMatcher()
+        self.patterns = self.matcher.patterns
+        self.parser = SyslogParser(self.matcher)
+
+        self._last_prefix = None
+        self._last_prefix_ts = None
+
+    def event_time(self, line):
+        # consecutive lines usually share the same second
+        prefix = line[:15]
+        if prefix != self._last_prefix:
+            self._last_prefix = prefix
+            self._last_prefix_ts = parse_syslog_time(line)
+        return self._last_prefix_ts
+
+    def watermark(self):
+        if self.max_event_time is None:
+            return None
+        return self.max_event_time - self.allowed_lateness
+
+    def _record(self, store, key, ts):
+        horizon = self.max_event_time - self.allowed_lateness - self.WINDOW
+        return store.record(key, ts, horizon)
+
+    def memory_stats(self):
+        return {
+            "failed_logins": self.failed_logins.stats(),
+            "rate_limits": self.rate_limits.stats(),
+            "device_events": self.device_events.stats(),
         }
 
-    def _cleanup(self, dq):
-        now = time.time()
-        while dq and now - dq[0] > self.WINDOW:
-            dq.popleft()
+    def analyze_line(self, line: str, ts=None) -> str:
+        if ts is None:
+            ts = self.event_time(line)
+            if ts is None:
+                ts = time.time()
+        return self.analyze_match(self.matcher.match(line), ts)
+
+    def analyze_batch(self, lines, times=None, parsed=None):
+        """Classify lines in event-time order, return levels in input order.
 
-    def _extract_ip(self, line):
-        m = re.search(r"IP:\s*([\d\.]+)", line)
-        return m.group(1) if m else None
+        parsed are the lines' ParsedLine records if the caller parsed them
+        already (pipeline.classify_batch), so they are not matched again.
+        """
+        if parsed is None:
+            parsed = [self.parser.parse(line) for line in lines]
+        if times is None:
+            now = time.time()
+            times = [p.event_ts or now for p in parsed]
 
-    def _extract_device(self, line):
-        m = re.search(r"Device\s+([a-f0-9\-]{8,})", line, re.I)
-        return m.group(1) if m else None
+        # syslog time has 1s resolution; break ties on the text so the
+        # order does not depend on how events arrived
+        levels = [None] * len(lines)
+        for i in sorted(range(len(lines)), key=lambda i: (times[i], lines[i])):
+            levels[i] = self.analyze_match(parsed[i].match, times[i])
+        return levels
 
-    def analyze_line(self, line: str) -> str:
-        now = time.time()
+    def analyze_match(self, match: LineMatch, ts=None) -> str:
+        now = time.time() if ts is None else ts
+        if self.max_event_time is None or now > self.max_event_time:
+            self.max_event_time = now
+        elif now < self.max_event_time - self.allowed_lateness:
+            self.late_events += 1
         risk = 0
+        rules = match.rules
 
         #  Brute force
-        if self.patterns["FAILED_LOGIN"].search(line):
-            ip = self._extract_ip(line)
+        if "FAILED_LOGIN" in rules:
+            ip = match.ip
             if ip:
-                self.failed_logins[ip].append(now)
-                self._cleanup(self.failed_logins[ip])
+                count = self._record(self.failed_logins, ip, now)
                 risk += 1
 
-                if len(self.failed_logins[ip]) >= 3:
+                if count >= 3:
                     return "THREAT"
 
-        if self.patterns["ATTEMPTS_HIGH"].search(line):
+        if "ATTEMPTS_HIGH" in rules:
             return "THREAT"
 
-        if self.patterns["ACCOUNT_LOCK"].search(line):
+        if "ACCOUNT_LOCK" in rules:
             return "THREAT"
 
         # Suspicious login
-        if self.patterns["SUSPICIOUS_LOGIN"].search(line):
+        if "SUSPICIOUS_LOGIN" in rules:
             risk += 3
 
         # API abuse / DoS-lite
-        if self.patterns["RATE_LIMIT"].search(line):
-            ip = self._extract_ip(line)
+        if "RATE_LIMIT" in rules:
+            ip = match.ip
             if ip:
-                self.rate_limits[ip].append(now)
-                self._cleanup(self.rate_limits[ip])
-                if len(self.rate_limits[ip]) >= 2:
+                if self._record(self.rate_limits, ip, now) >= 2:
                     return "THREAT"
             risk += 2
 
-        if self.patterns["ERROR_5XX"].search(line):
+        if "ERROR_5XX" in rules:
             risk += 1
 
         #  Account takeover scenario
-        if self.patterns["SUCCESS_LOGIN"].search(line) and risk >= 3:
+        if "SUCCESS_LOGIN" in rules and risk >= 3:
             return "THREAT"
 
-        if self.patterns["PASSWORD_CHANGE"].search(line) and risk >= 3:
+        if "PASSWORD_CHANGE" in rules and risk >= 3:
             return "THREAT"
 
         #  Backup / ransomware indicators
-        if self.patterns["BACKUP_CORRUPT"].search(line):
+        if "BACKUP_CORRUPT" in rules:
             return "THREAT"
 
-        if self.patterns["BACKUP_GROWTH"].search(line):
+        if "BACKUP_GROWTH" in rules:
             risk += 2
 
         #  IoT compromise
-        if self.patterns["DEVICE_SUSPICIOUS"].search(line):
-            device = self._extract_device(line)
+        if "DEVICE_SUSPICIOUS" in rules:
+            device = match.device
             if device:
-                self.device_events[device].append(now)
-                self._cleanup(self.device_events[device])
-                if len(self.device_events[device]) >= 2:
+                if self._record(self.device_events, device, now) >= 2:
                     return "THREAT"
             risk += 3
 
-        if self.patterns["DEVICE_OFFLINE"].search(line):
+        if "DEVICE_OFFLINE" in rules:
             risk += 2
 
-        if self.patterns["FIRMWARE_OUTDATED"].search(line):
+        if "FIRMWARE_OUTDATED" in rules:
             risk += 1
 
         if risk >= 5:
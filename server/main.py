@@ -1,72 +1,101 @@
+import json
 import os
-import sqlite3
 import threading
 import time
 from datetime import datetime, timedelta
 
 import jwt
-from auth_middleware import verify_request
+from admin.admin_views import create_admin_blueprint
+from auth_middleware import admin_only, verify_request
+from batch_codec import (
+    NDJSON_MIMETYPE,
+    BatchTooLarge,
+    UnsupportedEncoding,
+    accept_encoding,
+    batch_defaults,
+    read_batch,
+)
 from config import (
+    ANALYSIS_BATCH_MAX,
+    ANALYSIS_INTERVAL,
+    ANALYSIS_WORKERS,
     AUTHORIZED_IPS,
     AUTHORIZED_MACS,
+    CORRELATION_FAILURES,
+    CORRELATION_WINDOW,
+    DB_COMMIT_INTERVAL,
+    DB_COMMIT_ROWS,
+    DB_HOT_DAYS,
+    DB_MAINTENANCE_INTERVAL,
     DB_PATH,
+    DB_READ_POOL_SIZE,
+    DB_RETENTION_DAYS,
+    DB_SYNCHRONOUS,
+    INGEST_DEDUP_BATCHES,
+    INGEST_MAX_BATCH_BYTES,
+    INGEST_MAX_BODY_BYTES,
+    INGEST_QUEUE_CAPACITY,
+    INGEST_RETRY_AFTER,
+    INGEST_WAKE_THRESHOLD,
     JWT_ALGORITHM,
     JWT_EXP_SECONDS,
     JWT_SECRET,
+    SERVER_PORT,
+    STREAM_PORT,
+    THREAT_FEED_BUFFER,
+    THREAT_FEED_REFRESH,
+    THREAT_STREAM_KEEPALIVE,
+    WINDOW_MAX_KEYS,
 )
-from flask import Flask, jsonify, request
+from correlation import Correlator
+from flask import Flask, Response, jsonify, request
+from ingest_queue import IngestQueue
 from log_analyzer import LogAnalyzer
+from migrations import migrate
+from partitions import Partitions
+from pipeline import build_rows, process_batch, to_entry
+from storage import DBWriter, ReadPool, connect
+from stream_ingest import create_stream_app, serve_stream
+from threat_feed import ThreatFeed
+from workers import AnalysisPool
+
+ingest_queue = IngestQueue(
+    INGEST_QUEUE_CAPACITY, INGEST_WAKE_THRESHOLD, INGEST_DEDUP_BATCHES
+)
 
-ANALYSIS_INTERVAL = 2
-BUFFER_LIMIT = 1000
-
-log_buffer = []
-buffer_lock = threading.Lock()
-
-analyzer = LogAnalyzer()
+analyzer = LogAnalyzer(max_keys=WINDOW_MAX_KEYS)
+correlator = Correlator(CORRELATION_FAILURES, CORRELATION_WINDOW, WINDOW_MAX_KEYS)
+reader = ReadPool(DB_PATH, DB_READ_POOL_SIZE)
+threat_feed = ThreatFeed(reader, THREAT_FEED_BUFFER, refresh_interval=THREAT_FEED_REFRESH)
+writer = DBWriter(
+    DB_PATH,
+    synchronous=DB_SYNCHRONOUS,
+    commit_rows=DB_COMMIT_ROWS,
+    commit_interval=DB_COMMIT_INTERVAL,
+    on_threats=threat_feed.publish,
+)
 
 
 def init_db():
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT,
-            client_id TEXT,
-            mac TEXT,
-            ip TEXT,
-            level TEXT,
-            message TEXT
-        )
-        """
-    )
-
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS threats (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT,
-            client_id TEXT,
-            mac TEXT,
-            ip TEXT,
-            level TEXT,
-            message TEXT
-        )
-        """
-    )
-
-    conn.commit()
-    conn.close()
+    conn = connect(DB_PATH, DB_SYNCHRONOUS)
+    try:
+        migrate(conn)
+        # partition files to the current schema, logs stored before
+        # day partitions moved once
+        Partitions(DB_PATH).migrate(conn)
+        # watchers that connect without a cursor start after this
+        threat_feed.last_id = conn.execute("SELECT MAX(id) FROM threats").fetchone()[0] or 0
+    finally:
+        conn.close()
 
 
 init_db()
 
 
 app = Flask(__name__)
+app.config["MAX_CONTENT_LENGTH"] = INGEST_MAX_BODY_BYTES
+app.register_blueprint(create_admin_blueprint(reader))
 
 
 def create_jwt(client_ip):
@@ -88,61 +117,50 @@ def check_jwt():
         return False
 
 
-def analysis_loop():
+def report_threats(threats):
+    for ts, client_id, _, ip, _, message, _ in threats:
+        print(f"[THREAT] {ts} {client_id} {ip} {message}")
+
+
+def store_results(batch, levels, parsed):
+    rows, threats = build_rows(batch, levels, parsed)
+    threats += correlator.feed(rows)
+    writer.write(rows, threats)
+    report_threats(threats)
+
+
+def analysis_loop(pool=None):
     while True:
-        time.sleep(ANALYSIS_INTERVAL)
+        batch = ingest_queue.take(ANALYSIS_BATCH_MAX, timeout=ANALYSIS_INTERVAL)
+        if not batch:
+            continue
 
-        with buffer_lock:
-            if not log_buffer:
-                continue
-            batch = log_buffer.copy()
-            log_buffer.clear()
-
-        results = analyzer.analyze_logs([entry["message"] for entry in batch])
-
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-
-        for entry in batch:
-            level = analyzer.analyze_line(entry["message"])
-            cur.execute(
-                """
-                INSERT INTO logs (timestamp, client_id, mac, ip, level, message)
-                VALUES (?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    entry["timestamp"],
-                    entry["client_id"],
-                    entry["mac"],
-                    entry["ip"],
-                    level,
-                    entry["message"],
-                ),
-            )
+        if pool:
+            pool.submit(batch)
+            continue
 
-        for threat_msg in results["THREAT"]:
-            for entry in batch:
-                if entry["message"] == threat_msg:
-                    cur.execute(
-                        """
-                        INSERT INTO threats (timestamp, client_id, mac, ip, level, message)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                        """,
-                        (
-                            entry["timestamp"],
-                            entry["client_id"],
-                            entry["mac"],
-                            entry["ip"],
-                            "THREAT",
-                            entry["message"],
-                        ),
-                    )
-                    print(
-                        f"[THREAT] {entry['timestamp']} {entry['client_id']} {entry['ip']} {entry['message']}"
-                    )
-
-        conn.commit()
-        conn.close()
+        _, threats = process_batch(analyzer, writer, batch, correlator)
+        report_threats(threats)
+
+
+def maintenance_loop():
+    """Retention and compaction of day partitions, next to the writer."""
+    partitions = Partitions(DB_PATH)
+    while True:
+        try:
+            conn = connect(DB_PATH, DB_SYNCHRONOUS)
+            try:
+                done = partitions.maintain(conn, DB_RETENTION_DAYS, DB_HOT_DAYS)
+            finally:
+                conn.close()
+            if done["dropped"] or done["frozen"] or done["threats_deleted"]:
+                print(
+                    f"[DB] dropped {done['dropped']}, froze {done['frozen']}, "
+                    f"expired {done['threats_deleted']} threats"
+                )
+        except Exception as e:
+            print("[ERROR] maintenance:", e)
+        time.sleep(DB_MAINTENANCE_INTERVAL)
 
 
 @app.route("/api/auth", methods=["POST"])
@@ -159,36 +177,142 @@ def auth():
         samesite="Strict",
         max_age=JWT_EXP_SECONDS,
     )
+    # batch encodings /api/log can decode, so the client can pick one
+    response.headers["Accept-Encoding"] = accept_encoding()
     return response
 
 
 @app.route("/api/log", methods=["POST"])
 @verify_request
 def receive_logs():
-    data = request.json or {}
-    events = data.get("events", [])
+    invalid = 0
+    if request.mimetype == NDJSON_MIMETYPE:
+        try:
+            events, invalid = read_batch(
+                request.stream,
+                request.content_encoding,
+                batch_defaults(request.headers),
+                INGEST_MAX_BATCH_BYTES,
+            )
+        except UnsupportedEncoding as e:
+            response = jsonify({"error": f"Unsupported encoding: {e}"})
+            response.headers["Accept-Encoding"] = accept_encoding()
+            return response, 415
+        except BatchTooLarge:
+            return jsonify({"error": "Batch too large"}), 413
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    else:
+        data = request.json or {}
+        events = data.get("events", [])
+
+    # more than the whole queue holds would get 503 on every retry
+    if len(events) > ingest_queue.capacity:
+        return jsonify({"error": "Batch too large", "count": len(events)}), 413
 
     now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
 
-    with buffer_lock:
-        for e in events:
-            log_buffer.append(
-                {
-                    "timestamp": now,
-                    "client_id": e.get("client_id", "unknown"),
-                    "mac": e.get("mac", "uknown_mac"),
-                    "ip": e.get("ip", "uknown_ip"),
-                    "message": e.get("message", ""),
-                }
+    entries = [to_entry(e, now) for e in events]
+
+    if not ingest_queue.offer(entries, batch_id=request.headers.get("X-Batch-Id")):
+        response = jsonify({"error": "Ingest queue full", "count": len(events)})
+        response.headers["Retry-After"] = str(INGEST_RETRY_AFTER)
+        return response, 503
+
+    return jsonify({"status": "accepted", "count": len(events), "invalid": invalid})
+
+
+@app.route("/api/ingest/stats", methods=["GET"])
+@admin_only
+def ingest_stats():
+    stats = ingest_queue.stats()
+    stats["rows_written"] = writer.rows_written
+    stats["write_retries"] = writer.retries
+    stats["batches_dropped"] = writer.batches_dropped
+    if not ANALYSIS_WORKERS:
+        stats["windows"] = analyzer.memory_stats()
+    stats["correlation"] = correlator.stats()
+    return jsonify(stats)
+
+
+def threat_cursor():
+    """?after=<id>, else the SSE Last-Event-ID, else only threats from now on."""
+    raw = request.args.get("after") or request.headers.get("Last-Event-ID")
+    if not raw:
+        return threat_feed.last_id
+    return int(raw)
+
+
+@app.route("/api/threats", methods=["GET"])
+@admin_only
+def poll_threats():
+    """Long-poll: threats after the cursor, waiting up to ?wait= seconds."""
+    try:
+        cursor = threat_cursor()
+        wait = min(float(request.args.get("wait", "0")), 60.0)
+    except ValueError:
+        return jsonify({"error": "Bad cursor"}), 400
+
+    threats = threat_feed.after(cursor, timeout=wait)
+    if threats:
+        cursor = threats[-1]["id"]
+    return jsonify({"threats": threats, "cursor": cursor})
+
+
+@app.route("/api/threats/stream", methods=["GET"])
+@admin_only
+def stream_threats():
+    """Server-Sent Events, one `threat` event per row with its id as the event id."""
+    try:
+        cursor = threat_cursor()
+    except ValueError:
+        return jsonify({"error": "Bad cursor"}), 400
+
+    def events(cursor):
+        yield f"retry: 1000\n: cursor {cursor}\n\n"
+        while True:
+            threats = threat_feed.after(cursor, timeout=THREAT_STREAM_KEEPALIVE)
+            if not threats:
+                yield ": keep-alive\n\n"
+                continue
+            yield "".join(
+                f"id: {t['id']}\nevent: threat\ndata: {json.dumps(t)}\n\n" for t in threats
             )
+            cursor = threats[-1]["id"]
+
+    return Response(
+        events(cursor),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-        if len(log_buffer) > BUFFER_LIMIT:
-            log_buffer[:] = log_buffer[-BUFFER_LIMIT:]
 
-    return jsonify({"status": "accepted", "count": len(events)})
+@app.route("/api/threats/stats", methods=["GET"])
+@admin_only
+def threat_stats():
+    return jsonify(threat_feed.stats())
 
 
 if __name__ == "__main__":
-    print("[*] SIEM Server starting on 0.0.0.0:8000")
-    threading.Thread(target=analysis_loop, daemon=True).start()
-    app.run(host="0.0.0.0", port=8000)
+    print(f"[*] SIEM Server starting on 0.0.0.0:{SERVER_PORT}")
+    pool = None
+    if ANALYSIS_WORKERS > 0:
+        # fork the workers before any other thread exists
+        print(f"[*] Analysis sharded over {ANALYSIS_WORKERS} worker processes")
+        pool = AnalysisPool(
+            ANALYSIS_WORKERS, store_results, max_keys=WINDOW_MAX_KEYS
+        ).start()
+    writer.start()
+    threat_feed.start()
+    threading.Thread(target=analysis_loop, args=(pool,), daemon=True).start()
+    threading.Thread(target=maintenance_loop, daemon=True, name="db-maintenance").start()
+    if STREAM_PORT:
+        print(f"[*] NDJSON stream ingest on 0.0.0.0:{STREAM_PORT}")
+        threading.Thread(
+            target=serve_stream,
+            args=(create_stream_app(ingest_queue), "0.0.0.0", STREAM_PORT),
+            daemon=True,
+            name="stream-ingest",
+        ).start()
+    # one thread per request, so open event streams do not block ingest
+    app.run(host="0.0.0.0", port=SERVER_PORT, threaded=True)
@@ -0,0 +1,216 @@
+from datetime import datetime
+
+# (version, name, statements). Append only: never edit a migration that has
+# shipped, add a new one instead.
+MIGRATIONS = [
+    (
+        1,
+        "initial schema",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT,
+                client_id TEXT,
+                mac TEXT,
+                ip TEXT,
+                level TEXT,
+                message TEXT
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS threats (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT,
+                client_id TEXT,
+                mac TEXT,
+                ip TEXT,
+                level TEXT,
+                message TEXT
+            )
+            """,
+        ],
+    ),
+    (
+        2,
+        "indexes for cli access paths",
+        [
+            # logs, watch/correlate time ranges
+            "CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON logs (timestamp)",
+            # logs user <name>, correlate success lookup, clients
+            "CREATE INDEX IF NOT EXISTS idx_logs_client_ts ON logs (client_id, timestamp)",
+            # logs level <LEVEL>, stats levels
+            "CREATE INDEX IF NOT EXISTS idx_logs_level_ts ON logs (level, timestamp)",
+            # threats N, watch
+            "CREATE INDEX IF NOT EXISTS idx_threats_timestamp ON threats (timestamp)",
+            # top-threats
+            "CREATE INDEX IF NOT EXISTS idx_threats_client ON threats (client_id)",
+            # without stats the planner prefers idx_logs_client_ts for the
+            # correlate GROUP BY and walks the whole index
+            "ANALYZE",
+        ],
+    ),
+    (
+        3,
+        "event types and correlation dedup keys",
+        [
+            # first analyzer rule the message matched, NULL for none; rows
+            # stored before this are classified by correlation.py --backfill
+            "ALTER TABLE logs ADD COLUMN event_type TEXT",
+            # correlation batch pass: failed / successful logins by time,
+            # covering so it never reads the rows themselves
+            "CREATE INDEX IF NOT EXISTS idx_logs_event_ts "
+            "ON logs (event_type, timestamp, client_id, ip)",
+            # correlated incidents; the same key is only ever inserted once
+            "ALTER TABLE threats ADD COLUMN dedup_key TEXT",
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_threats_dedup_key "
+            "ON threats (dedup_key) WHERE dedup_key IS NOT NULL",
+        ],
+    ),
+    (
+        4,
+        "full-text index over logs.message",
+        [
+            # external content: the text stays in logs, the writer adds
+            # each batch by id range (pipeline.index_logs); '.' is part of
+            # a token so an ip is one term, not a phrase of four numbers
+            "CREATE VIRTUAL TABLE IF NOT EXISTS logs_fts USING fts5("
+            "message, content='logs', content_rowid='id', "
+            "tokenize=\"unicode61 tokenchars '.'\")",
+            # rows stored before the index existed
+            "INSERT INTO logs_fts (logs_fts) VALUES ('rebuild')",
+        ],
+    ),
+    (
+        5,
+        "rollup tables for stats",
+        [
+            # kept by rollups.add_logs / add_threats in the writer's
+            # transaction; minute is the "YYYY-MM-DD HH:MM" timestamp prefix
+            """
+            CREATE TABLE IF NOT EXISTS rollup_logs (
+                minute TEXT NOT NULL,
+                client_id TEXT NOT NULL,
+                level TEXT NOT NULL,
+                event_type TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (minute, client_id, level, event_type)
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS rollup_logs_total (
+                client_id TEXT NOT NULL,
+                level TEXT NOT NULL,
+                event_type TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (client_id, level, event_type)
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS rollup_threats (
+                minute TEXT NOT NULL,
+                client_id TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (minute, client_id)
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS rollup_threats_total (
+                client_id TEXT NOT NULL PRIMARY KEY,
+                count INTEGER NOT NULL
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS rollup_clients (
+                client_id TEXT NOT NULL,
+                mac TEXT NOT NULL,
+                PRIMARY KEY (client_id, mac)
+            ) WITHOUT ROWID
+            """,
+            # rows stored before the rollups existed
+            """
+            INSERT INTO rollup_logs (minute, client_id, level, event_type, count)
+            SELECT COALESCE(substr(timestamp, 1, 16), ''), COALESCE(client_id, ''),
+                   COALESCE(level, ''), COALESCE(event_type, ''), COUNT(*)
+            FROM logs GROUP BY 1, 2, 3, 4
+            """,
+            """
+            INSERT INTO rollup_logs_total (client_id, level, event_type, count)
+            SELECT client_id, level, event_type, SUM(count)
+            FROM rollup_logs GROUP BY 1, 2, 3
+            """,
+            """
+            INSERT INTO rollup_threats (minute, client_id, count)
+            SELECT COALESCE(substr(timestamp, 1, 16), ''), COALESCE(client_id, ''), COUNT(*)
+            FROM threats GROUP BY 1, 2
+            """,
+            """
+            INSERT INTO rollup_threats_total (client_id, count)
+            SELECT client_id, SUM(count) FROM rollup_threats GROUP BY 1
+            """,
+            """
+            INSERT INTO rollup_clients (client_id, mac)
+            SELECT DISTINCT COALESCE(client_id, ''), COALESCE(mac, '') FROM logs
+            """,
+        ],
+    ),
+    (
+        6,
+        "logs id sequence for day partitions",
+        [
+            # logs rows go to one file per day (partitions.py); ids are
+            # handed out here so they stay unique across files. Rows
+            # already in logs keep theirs and are moved by split_legacy.
+            "CREATE TABLE IF NOT EXISTS log_sequence (next_id INTEGER NOT NULL)",
+            "INSERT INTO log_sequence (next_id) SELECT COALESCE(MAX(id), 0) + 1 FROM logs",
+        ],
+    ),
+    (
+        7,
+        "threats ip index for the admin api",
+        [
+            # admin threats ?ip=, newest first by id (the index ends in it)
+            "CREATE INDEX IF NOT EXISTS idx_threats_ip ON threats (ip)",
+        ],
+    ),
+]
+
+
+def current_version(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT,
+            applied_at TEXT
+        )
+        """
+    )
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def migrate(conn, migrations=MIGRATIONS, target=None):
+    version = current_version(conn)
+    conn.commit()
+
+    for number, name, statements in migrations:
+        if number <= version or (target is not None and number > target):
+            continue
+
+        print(f"[DB] applying migration {number}: {name}")
+        try:
+            conn.execute("BEGIN")
+            for sql in statements:
+                conn.execute(sql)
+            conn.execute(
+                "INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)",
+                (number, name, datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        version = number
+
+    return version
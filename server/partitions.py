@@ -0,0 +1,452 @@
+"""Day partitions of the logs table.
+
+Log rows live in one SQLite file per UTC day next to DB_PATH
+("app/db.sqlite3" -> "app/db.2026-01-01.sqlite3"), each with its own logs
+table, the usual indexes and a logs_fts. The main database keeps threats,
+the rollups and log_sequence, which hands out logs.id so ids stay unique
+and increasing across files.
+
+Writers attach the partitions of the rows they insert, creating a day's
+file on first use; readers attach one partition at a time, only for the
+days a query covers (each()). A day older than hot_days is compacted once
+(FTS optimize, ANALYZE, VACUUM, rollback journal) and made read-only; a
+late row for it makes it writable again. Retention drops whole files and
+takes their counts out of the rollups, so nothing is deleted row by row.
+
+A commit that spans the main database and a partition is atomic per file
+only (WAL); after a crash rollups.check / rebuild cover the difference.
+"""
+
+import calendar
+import glob
+import os
+import re
+import sqlite3
+import stat
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from rollups import add_threats, drop_logs_day
+from syslog_parser import COLUMNS, SyslogParser
+
+DAY_RE = re.compile(r"\d{4}-\d{2}-\d{2}$")
+
+# (version, statements) for each partition file, {db} its schema name; a
+# statement may be a function(conn, db) instead. PRAGMA user_version holds
+# the version a file is at. Append only, like migrations.MIGRATIONS.
+PARTITION_MIGRATIONS = [
+    (
+        1,
+        [
+            """
+            CREATE TABLE IF NOT EXISTS {db}.logs (
+                id INTEGER PRIMARY KEY,
+                timestamp TEXT,
+                client_id TEXT,
+                mac TEXT,
+                ip TEXT,
+                level TEXT,
+                message TEXT,
+                event_type TEXT
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS {db}.idx_logs_timestamp ON logs (timestamp)",
+            "CREATE INDEX IF NOT EXISTS {db}.idx_logs_client_ts ON logs (client_id, timestamp)",
+            "CREATE INDEX IF NOT EXISTS {db}.idx_logs_level_ts ON logs (level, timestamp)",
+            "CREATE INDEX IF NOT EXISTS {db}.idx_logs_event_ts "
+            "ON logs (event_type, timestamp, client_id, ip)",
+            "CREATE VIRTUAL TABLE IF NOT EXISTS {db}.logs_fts USING fts5("
+            "message, content='logs', content_rowid='id', tokenize=\"unicode61 tokenchars '.'\")",
+        ],
+    ),
+    (
+        2,
+        [
+            # admin API ip filter, newest first
+            "CREATE INDEX IF NOT EXISTS {db}.idx_logs_ip_ts ON logs (ip, timestamp)",
+        ],
+    ),
+    (
+        3,
+        [
+            # syslog_parser.COLUMNS but event_type, parsed once at ingest
+            "ALTER TABLE {db}.logs ADD COLUMN event_ts INTEGER",
+            "ALTER TABLE {db}.logs ADD COLUMN host TEXT",
+            "ALTER TABLE {db}.logs ADD COLUMN service TEXT",
+            "ALTER TABLE {db}.logs ADD COLUMN pid INTEGER",
+            "ALTER TABLE {db}.logs ADD COLUMN src_ip TEXT",
+            "ALTER TABLE {db}.logs ADD COLUMN username TEXT",
+            "ALTER TABLE {db}.logs ADD COLUMN device TEXT",
+            "ALTER TABLE {db}.logs ADD COLUMN http_status INTEGER",
+            lambda conn, db: fill_parsed(conn, db),  # rows already there
+            "CREATE INDEX IF NOT EXISTS {db}.idx_logs_service_ts ON logs (service, timestamp)",
+            # most lines name no source ip: index only those that do
+            "CREATE INDEX IF NOT EXISTS {db}.idx_logs_src_ip_ts "
+            "ON logs (src_ip, timestamp) WHERE src_ip IS NOT NULL",
+        ],
+    ),
+]
+PARTITION_VERSION = PARTITION_MIGRATIONS[-1][0]
+
+NEXT_IDS = "UPDATE main.log_sequence SET next_id = next_id + ? RETURNING next_id"
+INSERT_COLUMNS = ("id", "timestamp", "client_id", "mac", "ip", "level", "message") + COLUMNS
+INSERT_LOG = f"""
+    INSERT INTO {{db}}.logs ({', '.join(INSERT_COLUMNS)})
+    VALUES ({', '.join('?' * len(INSERT_COLUMNS))})
+"""
+# logs_fts is external content; a batch is indexed in one statement by id range
+INDEX_LOGS = """
+    INSERT INTO {db}.logs_fts (rowid, message)
+    SELECT id, message FROM {db}.logs WHERE id BETWEEN ? AND ?
+"""
+SELECT_LEGACY = """
+    SELECT id, timestamp, client_id, mac, ip, level, message, event_type
+    FROM main.logs ORDER BY id LIMIT ?
+"""
+SELECT_UNPARSED = """
+    SELECT id, timestamp, message FROM {db}.logs
+    WHERE id > ? ORDER BY id LIMIT ?
+"""
+UPDATE_PARSED = """
+    UPDATE {db}.logs SET event_ts = ?, host = ?, service = ?, pid = ?, src_ip = ?,
+        username = ?, device = ?, http_status = ?
+    WHERE id = ?
+"""
+EXPIRE_THREATS = """
+    DELETE FROM threats WHERE id IN (
+        SELECT id FROM threats WHERE timestamp < ? LIMIT ?
+    )
+    RETURNING timestamp, client_id
+"""
+
+
+def today():
+    return datetime.utcnow().strftime("%Y-%m-%d")
+
+
+def day_of(ts):
+    """The partition day of a logs.timestamp; today for a malformed one."""
+    day = (ts or "")[:10]
+    return day if DAY_RE.match(day) else today()
+
+
+def schema(day):
+    return "d" + day.replace("-", "")
+
+
+def received_epoch(ts):
+    """Epoch seconds of a logs.timestamp, None for a malformed one."""
+    try:
+        return calendar.timegm(datetime.strptime(ts[:19], "%Y-%m-%d %H:%M:%S").timetuple())
+    except (TypeError, ValueError):
+        return None
+
+
+def parsed_columns(parser, message, ts):
+    """The syslog_parser.COLUMNS of a stored row's message; its event
+    time's year is the one around the row's timestamp."""
+    return parser.parse(message or "", received_epoch(ts))[: len(COLUMNS)]
+
+
+def fill_parsed(conn, db, chunk_size=10_000):
+    """Parse the messages of rows stored before the parsed columns existed."""
+    parser = SyslogParser()
+    last_id = 0
+    while True:
+        rows = conn.execute(SELECT_UNPARSED.format(db=db), (last_id, chunk_size)).fetchall()
+        if not rows:
+            return
+        conn.executemany(
+            UPDATE_PARSED.format(db=db),
+            [parsed_columns(parser, m, ts)[1:] + (row_id,) for row_id, ts, m in rows],
+        )
+        last_id = rows[-1][0]
+
+
+def upgrade(conn, db="main"):
+    """Bring the partition attached as db to PARTITION_VERSION, one
+    transaction per version."""
+    version = conn.execute(f"PRAGMA {db}.user_version").fetchone()[0]
+    for number, statements in PARTITION_MIGRATIONS:
+        if number <= version:
+            continue
+        try:
+            conn.execute("BEGIN")
+            for sql in statements:
+                if callable(sql):
+                    sql(conn, db)
+                else:
+                    conn.execute(sql.format(db=db))
+            conn.execute(f"PRAGMA {db}.user_version = {number}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+def attached(conn):
+    return {name for _, name, _ in conn.execute("PRAGMA database_list")}
+
+
+def shift_day(day, days):
+    return (datetime.strptime(day, "%Y-%m-%d") + timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+class Partitions:
+    def __init__(self, db_path, max_attached=2):
+        if not db_path or db_path == ":memory:":
+            raise ValueError("day partitions need a database file")
+        self.db_path = os.path.abspath(db_path)
+        self.max_attached = max_attached
+        self._stem, self._ext = os.path.splitext(self.db_path)
+
+    @classmethod
+    def of(cls, conn):
+        """Partitions of the database conn has open as main."""
+        return cls(conn.execute("PRAGMA database_list").fetchone()[2])
+
+    def path(self, day):
+        return f"{self._stem}.{day}{self._ext}"
+
+    def days(self, since=None, until=None):
+        """Days that have a partition file, oldest first, within [since, until].
+
+        since / until are timestamps or days; only their date counts.
+        """
+        days = []
+        for path in glob.glob(f"{glob.escape(self._stem)}.*{self._ext}"):
+            day = path[len(self._stem) + 1 : len(path) - len(self._ext)]
+            if not DAY_RE.match(day):
+                continue
+            if since and day < since[:10] or until and day > until[:10]:
+                continue
+            days.append(day)
+        return sorted(days)
+
+    def is_cold(self, day):
+        # the mode bits, not os.access: that is always true for root
+        return not os.stat(self.path(day)).st_mode & stat.S_IWUSR
+
+    def _uri(self, day, mode):
+        return Path(self.path(day)).as_uri() + f"?mode={mode}"
+
+    # writes
+
+    def days_of(self, rows):
+        return {day_of(row[0]) for row in rows}
+
+    def ready(self, conn, days):
+        """Whether the partitions for days are all attached for writing."""
+        names = attached(conn)
+        return all(schema(day) in names for day in days)
+
+    def prepare(self, conn, days):
+        """Attach the partitions for days for writing, creating new ones.
+
+        ATTACH cannot run inside a transaction: commit first. Partitions
+        attached earlier and not needed now are detached, oldest first,
+        past max_attached, so a writer holds today and yesterday at most
+        and older days can be frozen.
+        """
+        names = attached(conn)
+        wanted = {schema(day) for day in days}
+        for day in sorted(days):
+            db = schema(day)
+            if db in names:
+                continue
+            if os.path.exists(self.path(day)) and self.is_cold(day):
+                # late rows for a frozen day: writable again, refrozen later
+                os.chmod(self.path(day), 0o644)
+            conn.execute(f"ATTACH DATABASE ? AS {db}", (self._uri(day, "rwc"),))
+            conn.execute(f"PRAGMA {db}.journal_mode=WAL")
+            synchronous = conn.execute("PRAGMA main.synchronous").fetchone()[0]
+            conn.execute(f"PRAGMA {db}.synchronous={synchronous}")
+            upgrade(conn, db)
+            names.add(db)
+
+        extra = sorted(n for n in names if n.startswith("d") and n not in wanted)
+        for db in extra[: max(0, len(extra) + len(wanted) - self.max_attached)]:
+            conn.execute(f"DETACH DATABASE {db}")
+
+    def insert(self, conn, rows):
+        """Insert log rows (build_rows layout) into their days' partitions.
+
+        Ids come from log_sequence, in row order. The partitions must be
+        attached (prepare); the caller owns the transaction.
+        """
+        if not rows:
+            return
+        first = conn.execute(NEXT_IDS, (len(rows),)).fetchone()[0] - len(rows)
+        by_day = {}
+        for row_id, row in enumerate(rows, first):
+            by_day.setdefault(day_of(row[0]), []).append((row_id,) + tuple(row))
+        for day, group in by_day.items():
+            db = schema(day)
+            conn.executemany(INSERT_LOG.format(db=db), group)
+            conn.execute(INDEX_LOGS.format(db=db), (group[0][0], group[-1][0]))
+
+    # reads
+
+    def each(self, conn, since=None, until=None, newest_first=False, write=False):
+        """Attach the partitions within [since, until] one at a time, yield
+        (day, schema name).
+
+        Read-only unless write. The loop body must leave no transaction
+        open, the partition is detached as soon as it returns. A partition
+        the connection already has attached is yielded as it is.
+        """
+        days = self.days(since, until)
+        if newest_first:
+            days.reverse()
+        for day in days:
+            db = schema(day)
+            if db in attached(conn):
+                yield day, db
+                continue
+            try:
+                if write:
+                    self.prepare(conn, [day])
+                else:
+                    conn.execute(f"ATTACH DATABASE ? AS {db}", (self._uri(day, "ro"),))
+                    if conn.execute(f"PRAGMA {db}.user_version").fetchone()[0] < 1:
+                        # just created, the writer has not committed its schema yet
+                        conn.execute(f"DETACH DATABASE {db}")
+                        continue
+            except sqlite3.OperationalError:
+                continue  # dropped by retention since days() listed it
+            try:
+                yield day, db
+            finally:
+                conn.execute(f"DETACH DATABASE {db}")
+
+    # upkeep
+
+    def migrate(self, conn):
+        """Bring every partition file to PARTITION_VERSION, frozen ones
+        included, then move legacy rows out of the main database. Run at
+        startup, after migrations.migrate.
+        """
+        for day in self.days():
+            path = self.path(day)
+            cold = self.is_cold(day)
+            if cold:
+                os.chmod(path, 0o644)
+            part = sqlite3.connect(path, timeout=30)
+            try:
+                if part.execute("PRAGMA user_version").fetchone()[0] < PARTITION_VERSION:
+                    print(f"[DB] upgrading partition {day}")
+                    upgrade(part)
+            finally:
+                part.close()
+                if cold:
+                    os.chmod(path, 0o444)
+        return self.split_legacy(conn)
+
+    def split_legacy(self, conn, chunk_size=50_000):
+        """Move rows left in the main database's logs table into day
+        partitions, keeping their ids; returns rows moved.
+        """
+        moved, parser = 0, SyslogParser()
+        while True:
+            rows = conn.execute(SELECT_LEGACY, (chunk_size,)).fetchall()
+            if not rows:
+                break
+            by_day = {}
+            for row in rows:
+                # the legacy table has no parsed columns, its event_type stays
+                columns = parsed_columns(parser, row[6], row[1])[1:]
+                by_day.setdefault(day_of(row[1]), []).append(row + columns)
+            self.prepare(conn, by_day)
+            with conn:
+                for day, group in by_day.items():
+                    db = schema(day)
+                    conn.executemany(INSERT_LOG.format(db=db), group)
+                    # ids only grow from chunk to chunk, so the range
+                    # holds nothing indexed before
+                    conn.execute(INDEX_LOGS.format(db=db), (group[0][0], group[-1][0]))
+                conn.execute("DELETE FROM main.logs WHERE id <= ?", (rows[-1][0],))
+            moved += len(rows)
+            print(f"[DB] moved {moved:,} logs rows into day partitions")
+
+        if moved:
+            conn.execute("INSERT INTO main.logs_fts (logs_fts) VALUES ('delete-all')")
+            conn.commit()
+            conn.execute("VACUUM")
+        return moved
+
+    def freeze(self, day):
+        """Compact a day nothing writes to any more and make it read-only.
+
+        Returns False if another connection still has it open for writing;
+        the next pass tries again.
+        """
+        path = self.path(day)
+        conn = sqlite3.connect(path, timeout=5)
+        try:
+            conn.execute("INSERT INTO logs_fts (logs_fts) VALUES ('optimize')")
+            conn.execute("ANALYZE")
+            conn.commit()
+            conn.execute("VACUUM")
+            # a self-contained file, no -wal / -shm next to it
+            mode = conn.execute("PRAGMA journal_mode=DELETE").fetchone()[0]
+        except sqlite3.OperationalError as e:
+            print(f"[DB] partition {day} busy, not frozen: {e}")
+            return False
+        finally:
+            conn.close()
+        if mode != "delete":
+            return False
+        os.chmod(path, 0o444)
+        return True
+
+    def drop(self, conn, day):
+        """Take a day's logs out of the rollups and delete its file."""
+        with conn:
+            drop_logs_day(conn, day)
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            try:
+                os.remove(self.path(day) + suffix)
+            except FileNotFoundError:
+                pass
+
+    def expire_threats(self, conn, before, chunk_size=5000):
+        """Delete threats older than before in short transactions, returns rows deleted."""
+        deleted = 0
+        while True:
+            with conn:
+                gone = conn.execute(EXPIRE_THREATS, (before, chunk_size)).fetchall()
+                add_threats(conn, gone, -1)
+            deleted += len(gone)
+            if len(gone) < chunk_size:
+                return deleted
+
+    def maintain(self, conn, retention_days=0, hot_days=2, now=None):
+        """Retention, then freezing; conn is a write connection to the main database.
+
+        Days before today - retention_days + 1 are dropped (0 keeps
+        everything); days before today - hot_days + 1 are frozen.
+        """
+        now = now or today()
+        result = {"dropped": [], "frozen": [], "threats_deleted": 0}
+        if retention_days > 0:
+            cutoff = shift_day(now, 1 - retention_days)
+            for day in self.days(until=shift_day(cutoff, -1)):
+                self.drop(conn, day)
+                result["dropped"].append(day)
+            result["threats_deleted"] = self.expire_threats(conn, cutoff)
+
+        for day in self.days(until=shift_day(now, -max(hot_days, 1))):
+            if not self.is_cold(day) and self.freeze(day):
+                result["frozen"].append(day)
+        return result
+
+    def stats(self):
+        """(day, bytes, cold) for every partition, oldest first."""
+        out = []
+        for day in self.days():
+            path = self.path(day)
+            size = sum(
+                os.path.getsize(path + s) for s in ("", "-wal") if os.path.exists(path + s)
+            )
+            out.append((day, size, self.is_cold(day)))
+        return out
@@ -0,0 +1,82 @@
+from log_analyzer import RuleMatcher
+from partitions import Partitions
+from rollups import add_logs, add_threats
+from syslog_parser import COLUMNS, SyslogParser
+
+INSERT_THREAT = """
+    INSERT INTO threats (timestamp, client_id, mac, ip, level, message, dedup_key)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+# correlated incidents carry a dedup_key; one that was already raised is skipped
+INSERT_INCIDENT = INSERT_THREAT.replace("INSERT INTO", "INSERT OR IGNORE INTO")
+
+# logs.event_type: the first analyzer rule a message matches, set once here
+event_matcher = RuleMatcher()
+# for rows build_rows gets no parsed records with
+parser = SyslogParser(event_matcher)
+
+
+def to_entry(event, received_at):
+    return {
+        "timestamp": received_at,
+        "client_id": event.get("client_id", "unknown"),
+        "mac": event.get("mac", "uknown_mac"),
+        "ip": event.get("ip", "uknown_ip"),
+        "message": event.get("message", ""),
+    }
+
+
+def classify_batch(analyzer, batch):
+    messages = [entry["message"] for entry in batch]
+    parsed = [analyzer.parser.parse(message) for message in messages]
+    levels = analyzer.analyze_batch(messages, parsed=parsed)
+    return build_rows(batch, levels, parsed)
+
+
+def build_rows(batch, levels, parsed=None):
+    """Log rows and threat rows for a classified batch.
+
+    A log row is (timestamp, client_id, mac, ip, level, message) and the
+    syslog_parser.COLUMNS of its message, event_type first; parsed holds
+    the entries' ParsedLine records (or their COLUMNS) when the analysis
+    already made them.
+    """
+    if parsed is None:
+        parsed = [parser.parse(entry["message"]) for entry in batch]
+    rows = []
+    threats = []
+
+    for entry, level, fields in zip(batch, levels, parsed):
+        row = (
+            entry["timestamp"],
+            entry["client_id"],
+            entry["mac"],
+            entry["ip"],
+            level,
+            entry["message"],
+        )
+        rows.append(row + tuple(fields[: len(COLUMNS)]))
+        if level == "THREAT":
+            threats.append(row + (None,))
+
+    return rows, threats
+
+
+def store_batch(conn, rows, threats, partitions=None):
+    partitions = partitions or Partitions.of(conn)
+    partitions.prepare(conn, partitions.days_of(rows))
+    with conn:
+        partitions.insert(conn, rows)
+        add_logs(conn, rows)
+        if threats:
+            conn.executemany(INSERT_THREAT, threats)
+            add_threats(conn, threats)
+
+
+def process_batch(analyzer, writer, batch, correlator=None):
+    rows, threats = classify_batch(analyzer, batch)
+    if correlator is not None:
+        threats += correlator.feed(rows)
+    writer.write(rows, threats)
+    return rows, threats
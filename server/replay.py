@@ -0,0 +1,300 @@
+"""Re-score archived logs through LogAnalyzer.
+
+    python replay.py archive/*.log events.jsonl
+    python replay.py --table --workers 4 --checkpoint replay.ckpt
+
+File sources (.log syslog lines or .jsonl events) are inserted as new
+rows, into the day partitions of their event time. --table re-scores the
+stored logs in place, partition by partition, fixing levels and adding or
+removing threats whose verdict changed.
+
+Threats go straight into the threats table from this process, not
+through the server's DBWriter; a running server's ThreatFeed finds them
+by MAX(id) within THREAT_FEED_REFRESH seconds and serves them to
+/api/threats watchers from the table.
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from config import DB_PATH, DB_SYNCHRONOUS
+from log_analyzer import LogAnalyzer
+from migrations import migrate
+from partitions import Partitions
+from pipeline import INSERT_THREAT, build_rows
+from rollups import add_logs, add_threats
+from storage import connect
+from workers import AnalysisPool
+
+UPDATE_LEVEL = "UPDATE {db}.logs SET level = ? WHERE id = ?"
+DELETE_THREAT = """
+    DELETE FROM threats WHERE id = (
+        SELECT id FROM threats
+        WHERE timestamp = ? AND client_id = ? AND message = ? AND dedup_key IS NULL
+        LIMIT 1
+    )
+"""
+
+
+class Checkpoint:
+    def __init__(self, path):
+        self.path = path
+        self.state = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.state = json.load(f)
+
+    def get(self, source, default=0):
+        return self.state.get(source, default)
+
+    def save(self, source, position):
+        if not self.path:
+            return
+        self.state[source] = position
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+
+def _host_fields(line):
+    # "<Mon dd hh:mm:ss> <client_id>@<ip> <service>[pid]: ..."
+    parts = line[16:].split(" ", 1)
+    if parts and "@" in parts[0]:
+        client_id, _, ip = parts[0].partition("@")
+        return client_id, ip
+    return "unknown", "uknown_ip"
+
+
+def _file_entry(path, raw, analyzer):
+    line = raw.decode("utf-8", errors="replace").strip()
+    if not line:
+        return None
+
+    if path.endswith(".jsonl"):
+        try:
+            e = json.loads(line)
+        except json.JSONDecodeError:
+            return None
+        message = e.get("message", "")
+        client_id = e.get("client_id", "unknown")
+        mac = e.get("mac", "uknown_mac")
+        ip = e.get("ip", "uknown_ip")
+        ts = e.get("timestamp")
+    else:
+        message, mac, ts = line, "-", None
+        client_id, ip = _host_fields(line)
+
+    if not ts:
+        event_ts = analyzer.event_time(message) or time.time()
+        ts = datetime.utcfromtimestamp(event_ts).strftime("%Y-%m-%d %H:%M:%S")
+
+    return {
+        "timestamp": ts,
+        "client_id": client_id,
+        "mac": mac,
+        "ip": ip,
+        "message": message,
+    }
+
+
+def read_file_chunks(path, chunk_size, start, analyzer):
+    """Yield (entries, end_offset) so a checkpoint can resume mid-file."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        chunk = []
+        for raw in iter(f.readline, b""):
+            entry = _file_entry(path, raw, analyzer)
+            if entry:
+                chunk.append(entry)
+            if len(chunk) >= chunk_size:
+                yield chunk, f.tell()
+                chunk = []
+        yield chunk, f.tell()
+
+
+def read_table_chunks(conn, chunk_size, last_id, db="main"):
+    while True:
+        rows = conn.execute(
+            f"""
+            SELECT id, timestamp, client_id, mac, ip, level, message, event_type
+            FROM {db}.logs WHERE id > ? ORDER BY id LIMIT ?
+            """,
+            (last_id, chunk_size),
+        ).fetchall()
+        if not rows:
+            return
+
+        chunk = [
+            {
+                "id": r[0],
+                "timestamp": r[1],
+                "client_id": r[2],
+                "mac": r[3],
+                "ip": r[4],
+                "old_level": r[5],
+                "message": r[6],
+                "event_type": r[7],
+            }
+            for r in rows
+        ]
+        last_id = rows[-1][0]
+        yield chunk, last_id
+
+
+class Scorer:
+    """Classify chunks inline or on an AnalysisPool, one chunk at a time."""
+
+    def __init__(self, workers):
+        self.analyzer = LogAnalyzer()
+        self.pool = None
+        if workers > 0:
+            self._done = threading.Condition()
+            self._results = []
+            self.pool = AnalysisPool(workers, self._on_result).start()
+
+    def _on_result(self, entries, levels, parsed):
+        with self._done:
+            self._results.append((entries, levels, parsed))
+            self._done.notify()
+
+    def score(self, chunk):
+        """(entries, levels, parsed), parsed the entries' syslog_parser
+        COLUMNS; with a pool the entries come back in shard order."""
+        if not self.pool:
+            messages = [e["message"] for e in chunk]
+            parsed = [self.analyzer.parser.parse(message) for message in messages]
+            return chunk, self.analyzer.analyze_batch(messages, parsed=parsed), parsed
+
+        expected = self.pool.submit(chunk)
+        with self._done:
+            self._done.wait_for(lambda: len(self._results) >= expected)
+            results, self._results = self._results, []
+
+        entries, levels, parsed = [], [], []
+        for e, lv, p in results:
+            entries.extend(e)
+            levels.extend(lv)
+            parsed.extend(p)
+        return entries, levels, parsed
+
+    def close(self):
+        if self.pool:
+            self.pool.close()
+
+
+def write_new(conn, entries, levels, parsed, partitions):
+    rows, threats = build_rows(entries, levels, parsed)
+    # archives span days, some of them possibly frozen already
+    partitions.prepare(conn, partitions.days_of(rows))
+    with conn:
+        partitions.insert(conn, rows)
+        add_logs(conn, rows)
+        conn.executemany(INSERT_THREAT, threats)
+        add_threats(conn, threats)
+    return len(threats)
+
+
+def write_rescored(conn, entries, levels, db="main"):
+    updates, old_rows, new_rows, added, removed = [], [], [], [], []
+    for e, level in zip(entries, levels):
+        if level == e["old_level"]:
+            continue
+        updates.append((level, e["id"]))
+        row = (e["timestamp"], e["client_id"], e["mac"], e["ip"], e["old_level"], e["message"])
+        old_rows.append(row + (e["event_type"],))
+        new_rows.append(row[:4] + (level, e["message"], e["event_type"]))
+        threat = row[:4] + ("THREAT", e["message"], None)
+        if level == "THREAT":
+            added.append(threat)
+        elif e["old_level"] == "THREAT":
+            removed.append(threat)
+
+    with conn:
+        conn.executemany(UPDATE_LEVEL.format(db=db), updates)
+        add_logs(conn, old_rows, -1)
+        add_logs(conn, new_rows)
+        conn.executemany(INSERT_THREAT, added)
+        add_threats(conn, added)
+        # a threat row may already be gone; count out only the deleted ones
+        deleted = [
+            t for t in removed if conn.execute(DELETE_THREAT, (t[0], t[1], t[5])).rowcount
+        ]
+        add_threats(conn, deleted, -1)
+    return len(updates)
+
+
+def run(args):
+    conn = connect(args.db, DB_SYNCHRONOUS)
+    migrate(conn)
+    partitions = Partitions(args.db)
+    partitions.migrate(conn)
+
+    checkpoint = Checkpoint(args.checkpoint)
+    scorer = Scorer(args.workers)
+
+    total = 0
+    changed = 0
+    threats = 0
+    started = time.perf_counter()
+
+    def progress(source):
+        elapsed = time.perf_counter() - started
+        print(
+            f"[REPLAY] {source}: {total:,} lines, {changed:,} re-scored, {threats:,} new threats, "
+            f"{total / max(elapsed, 1e-9):,.0f} lines/sec"
+        )
+
+    try:
+        if args.table:
+            for day, db in partitions.each(conn, write=True):
+                source = f"table:logs:{day}"
+                chunks = read_table_chunks(conn, args.chunk_size, checkpoint.get(source), db)
+                for chunk, last_id in chunks:
+                    entries, levels, _ = scorer.score(chunk)
+                    changed += write_rescored(conn, entries, levels, db)
+                    total += len(chunk)
+                    checkpoint.save(source, last_id)
+                    progress(source)
+
+        for path in args.files:
+            source = os.path.abspath(path)
+            start = checkpoint.get(source)
+            for chunk, offset in read_file_chunks(path, args.chunk_size, start, scorer.analyzer):
+                if chunk:
+                    entries, levels, parsed = scorer.score(chunk)
+                    threats += write_new(conn, entries, levels, parsed, partitions)
+                    total += len(chunk)
+                checkpoint.save(source, offset)
+                progress(path)
+    finally:
+        scorer.close()
+        conn.close()
+
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score archived logs")
+    parser.add_argument("files", nargs="*", help=".log / .jsonl files to ingest")
+    parser.add_argument("--table", action="store_true", help="re-score the logs table in place")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=0, help="analysis processes, 0 = inline")
+    parser.add_argument("--checkpoint", help="resume file, updated after every chunk")
+    args = parser.parse_args()
+
+    if not args.files and not args.table:
+        parser.error("nothing to replay: give files and/or --table")
+
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Counts of logs and threats kept next to the raw rows.
+
+rollup_logs / rollup_threats hold counts per minute ("YYYY-MM-DD HH:MM",
+the timestamp prefix) and client, logs also per level and event_type;
+the *_total tables hold the same without the minute, and rollup_clients
+every (client_id, mac) seen. Whatever writes logs or threats calls
+add_logs / add_threats in the same transaction, so the CLI and the stats
+API read a few hundred rows instead of the whole table. NULL columns are
+counted as ''.
+"""
+
+from collections import Counter
+
+UPSERT_LOGS = """
+    INSERT INTO rollup_logs (minute, client_id, level, event_type, count)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (minute, client_id, level, event_type)
+    DO UPDATE SET count = count + excluded.count
+"""
+UPSERT_LOGS_TOTAL = """
+    INSERT INTO rollup_logs_total (client_id, level, event_type, count)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (client_id, level, event_type)
+    DO UPDATE SET count = count + excluded.count
+"""
+UPSERT_THREATS = """
+    INSERT INTO rollup_threats (minute, client_id, count) VALUES (?, ?, ?)
+    ON CONFLICT (minute, client_id) DO UPDATE SET count = count + excluded.count
+"""
+UPSERT_THREATS_TOTAL = """
+    INSERT INTO rollup_threats_total (client_id, count) VALUES (?, ?)
+    ON CONFLICT (client_id) DO UPDATE SET count = count + excluded.count
+"""
+INSERT_CLIENT = "INSERT OR IGNORE INTO rollup_clients (client_id, mac) VALUES (?, ?)"
+
+# logs are recounted partition by partition into these, threats in place
+RECOUNT_TABLES = [
+    "CREATE TEMP TABLE IF NOT EXISTS recount_logs "
+    "(minute, client_id, level, event_type, count)",
+    "CREATE TEMP TABLE IF NOT EXISTS recount_clients "
+    "(client_id, mac, PRIMARY KEY (client_id, mac))",
+]
+RECOUNT_LOGS = """
+    INSERT INTO temp.recount_logs
+    SELECT COALESCE(substr(timestamp, 1, 16), ''), COALESCE(client_id, ''),
+           COALESCE(level, ''), COALESCE(event_type, ''), COUNT(*)
+    FROM {db}.logs GROUP BY 1, 2, 3, 4
+"""
+RECOUNT_CLIENTS = """
+    INSERT OR IGNORE INTO temp.recount_clients
+    SELECT DISTINCT COALESCE(client_id, ''), COALESCE(mac, '') FROM {db}.logs
+"""
+
+# table -> (columns, the same columns from the recount)
+ROLLUPS = {
+    "rollup_logs": (
+        "minute, client_id, level, event_type, count",
+        "SELECT minute, client_id, level, event_type, SUM(count) "
+        "FROM temp.recount_logs GROUP BY 1, 2, 3, 4",
+    ),
+    "rollup_logs_total": (
+        "client_id, level, event_type, count",
+        "SELECT client_id, level, event_type, SUM(count) "
+        "FROM temp.recount_logs GROUP BY 1, 2, 3",
+    ),
+    "rollup_threats": (
+        "minute, client_id, count",
+        """
+        SELECT COALESCE(substr(timestamp, 1, 16), ''), COALESCE(client_id, ''), COUNT(*)
+        FROM threats GROUP BY 1, 2
+        """,
+    ),
+    "rollup_threats_total": (
+        "client_id, count",
+        "SELECT COALESCE(client_id, ''), COUNT(*) FROM threats GROUP BY 1",
+    ),
+    "rollup_clients": ("client_id, mac", "SELECT client_id, mac FROM temp.recount_clients"),
+}
+
+
+def add_logs(conn, rows, sign=1):
+    """Count log rows (build_rows layout, or its first seven fields) in;
+    sign=-1 counts them back out."""
+    minutes, totals, clients = Counter(), Counter(), set()
+    for ts, client_id, mac, _, level, _, event_type, *_ in rows:
+        key = (client_id or "", level or "", event_type or "")
+        minutes[((ts or "")[:16],) + key] += sign
+        totals[key] += sign
+        clients.add((client_id or "", mac or ""))
+    conn.executemany(UPSERT_LOGS, [k + (n,) for k, n in minutes.items()])
+    conn.executemany(UPSERT_LOGS_TOTAL, [k + (n,) for k, n in totals.items()])
+    if sign > 0:
+        conn.executemany(INSERT_CLIENT, clients)
+
+
+def add_threats(conn, threats, sign=1):
+    """Count threat rows (INSERT_THREAT layout) in; sign=-1 counts them back out."""
+    minutes, totals = Counter(), Counter()
+    for ts, client_id, *_ in threats:
+        minutes[((ts or "")[:16], client_id or "")] += sign
+        totals[client_id or ""] += sign
+    conn.executemany(UPSERT_THREATS, [k + (n,) for k, n in minutes.items()])
+    conn.executemany(UPSERT_THREATS_TOTAL, list(totals.items()))
+
+
+def summary(conn, since=None):
+    """Logs, threats and distinct clients, all time or from the minute of since."""
+    if since:
+        minute = since.replace("T", " ")[:16]
+        logs, clients = conn.execute(
+            "SELECT SUM(count), COUNT(DISTINCT client_id) FROM rollup_logs WHERE minute >= ?",
+            (minute,),
+        ).fetchone()
+        threats = conn.execute(
+            "SELECT SUM(count) FROM rollup_threats WHERE minute >= ?", (minute,)
+        ).fetchone()[0]
+    else:
+        logs = conn.execute("SELECT SUM(count) FROM rollup_logs_total").fetchone()[0]
+        threats = conn.execute("SELECT SUM(count) FROM rollup_threats_total").fetchone()[0]
+        clients = conn.execute(
+            "SELECT COUNT(DISTINCT client_id) FROM rollup_logs_total WHERE count > 0"
+        ).fetchone()[0]
+    return {"logs": logs or 0, "threats": threats or 0, "clients": clients or 0}
+
+
+def levels(conn, since=None):
+    """(level, count) pairs, largest first."""
+    if since:
+        rows = conn.execute(
+            "SELECT level, SUM(count) FROM rollup_logs WHERE minute >= ? GROUP BY level",
+            (since.replace("T", " ")[:16],),
+        )
+    else:
+        rows = conn.execute("SELECT level, SUM(count) FROM rollup_logs_total GROUP BY level")
+    return sorted(((lvl, n) for lvl, n in rows if n), key=lambda r: -r[1])
+
+
+def top_threats(conn, limit=10, since=None):
+    """(client_id, threats) for the clients with the most threats."""
+    if since:
+        return conn.execute(
+            """
+            SELECT client_id, SUM(count) AS n FROM rollup_threats
+            WHERE minute >= ? GROUP BY client_id HAVING n > 0
+            ORDER BY n DESC LIMIT ?
+            """,
+            (since.replace("T", " ")[:16], limit),
+        ).fetchall()
+    return conn.execute(
+        "SELECT client_id, count FROM rollup_threats_total WHERE count > 0 "
+        "ORDER BY count DESC LIMIT ?",
+        (limit,),
+    ).fetchall()
+
+
+def clients(conn):
+    return conn.execute("SELECT client_id, mac FROM rollup_clients").fetchall()
+
+
+def drop_logs_day(conn, day):
+    """Take one day's logs out of the rollups, for retention dropping it.
+
+    rollup_clients keeps the clients: it lists every client ever seen.
+    """
+    # the minutes of day sort between "day" and "day~"
+    span = (day, day + "~")
+    rows = conn.execute(
+        """
+        SELECT client_id, level, event_type, -SUM(count) FROM rollup_logs
+        WHERE minute >= ? AND minute < ? GROUP BY 1, 2, 3
+        """,
+        span,
+    ).fetchall()
+    conn.executemany(UPSERT_LOGS_TOTAL, rows)
+    conn.execute("DELETE FROM rollup_logs WHERE minute >= ? AND minute < ?", span)
+
+
+def recount(conn, partitions):
+    """Count logs by rollup key into temp tables, one partition at a time."""
+    for sql in RECOUNT_TABLES:
+        conn.execute(sql)
+    conn.execute("DELETE FROM temp.recount_logs")
+    conn.execute("DELETE FROM temp.recount_clients")
+    conn.commit()
+    for _, db in partitions.each(conn):
+        conn.execute(RECOUNT_LOGS.format(db=db))
+        conn.execute(RECOUNT_CLIENTS.format(db=db))
+        conn.commit()
+
+
+def check(conn, partitions):
+    """Rows per rollup table that disagree with a recount of logs / threats.
+
+    Needs a write connection (the recount goes to temp tables). Logs are
+    recounted partition by partition, so a check while the writer commits
+    can report the minute being written; a difference that stays is real.
+    rollup_clients is only checked for clients it is missing.
+    """
+    recount(conn, partitions)
+    diffs = {}
+    for table, (columns, raw) in ROLLUPS.items():
+        stored = f"SELECT {columns} FROM {table}"
+        if columns.endswith("count"):
+            stored += " WHERE count != 0"
+        missing = f"SELECT COUNT(*) FROM ({raw} EXCEPT {stored})"
+        extra = "0"
+        if table != "rollup_clients":
+            extra = f"(SELECT COUNT(*) FROM ({stored} EXCEPT {raw}))"
+        diffs[table] = conn.execute(f"SELECT ({missing}) + {extra}").fetchone()[0]
+    return diffs
+
+
+def rebuild(conn, partitions):
+    """Recount every rollup table from logs / threats, replace them in one transaction."""
+    recount(conn, partitions)
+    with conn:
+        for table, (columns, raw) in ROLLUPS.items():
+            conn.execute(f"DELETE FROM {table}")
+            conn.execute(f"INSERT INTO {table} ({columns}) {raw}")
@@ -0,0 +1,104 @@
+"""Full-text search over logs.message through the logs_fts index.
+
+Every day partition has its own logs_fts; a search asks each partition
+from since on for its best (or newest) rows and merges them. Pages are
+keyset pages like listing's: `next` is the (rank, id) or, for
+order=recent, the (timestamp, id) of the last row, and the next page
+starts after it instead of at an OFFSET.
+"""
+
+from listing import decode_cursor, encode_cursor
+from partitions import Partitions
+
+SEARCH_COLUMNS = ("id", "timestamp", "client_id", "ip", "level", "message", "score")
+
+# bm25() is lower for a better match; score is flipped so higher is better.
+# {db} is the partition's schema name.
+SEARCH_SQL = """
+    SELECT l.id, l.timestamp, l.client_id, l.ip, l.level, l.message, -f.rank
+    FROM {db}.logs_fts f JOIN {db}.logs l ON l.id = f.rowid
+    WHERE f.logs_fts MATCH ?{filters}
+    ORDER BY {order}
+    LIMIT ?
+"""
+
+# order -> (ORDER BY, condition for the rows after a cursor)
+ORDERS = {
+    "rank": ("f.rank, l.id", "(f.rank, l.id) > (?, ?)"),
+    # newest first, the order log_page lists logs in
+    "recent": ("l.timestamp DESC, l.id DESC", "(l.timestamp, l.id) < (?, ?)"),
+}
+
+MAX_LIMIT = 100
+
+
+def match_expr(text):
+    """User text to an FTS5 query: every word must occur, `word*` is a prefix.
+
+    Each word is quoted, so ips, paths and FTS5 operators in the text are
+    searched for literally instead of failing to parse.
+    """
+    terms = []
+    for word in text.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*")
+        if word:
+            terms.append('"' + word.replace('"', '""') + '"' + ("*" if prefix else ""))
+    if not terms:
+        raise ValueError("empty search query")
+    return " ".join(terms)
+
+
+def search_logs(conn, text, since=None, client=None, limit=20, cursor=None, order="rank"):
+    """(dicts with SEARCH_COLUMNS, next cursor or None) for one page of
+    logs matching text.
+
+    bm25 weighs terms by how rare they are in each partition, so scores
+    from different days are close to, not exactly, comparable; rows
+    written to today's partition meanwhile can shift its scores between
+    two pages.
+    """
+    if order not in ORDERS:
+        raise ValueError(f"unknown order {order!r}")
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    order_by, after_sql = ORDERS[order]
+
+    filters, params = "", [match_expr(text)]
+    if since:
+        filters += " AND l.timestamp >= ?"
+        params.append(since.replace("T", " "))
+    if client:
+        filters += " AND l.client_id = ?"
+        params.append(client)
+
+    until = None
+    if cursor:
+        after = decode_cursor(cursor, 2)
+        key_type = (int, float) if order == "rank" else str
+        if not isinstance(after[0], key_type) or not isinstance(after[1], int):
+            raise ValueError("bad cursor")
+        filters += " AND " + after_sql
+        params += after
+        if order == "recent":
+            until = after[0]
+
+    rows = []
+    partitions = Partitions.of(conn)
+    for _, db in partitions.each(conn, since=since, until=until, newest_first=True):
+        sql = SEARCH_SQL.format(db=db, filters=filters, order=order_by)
+        if order == "rank":
+            # any partition can hold the next best rows
+            rows += conn.execute(sql, params + [limit + 1]).fetchall()
+            continue
+        rows += conn.execute(sql, params + [limit + 1 - len(rows)]).fetchall()
+        if len(rows) > limit:
+            break  # older days sort after these
+    if order == "rank":
+        rows.sort(key=lambda r: (-r[-1], r[0]))
+
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = encode_cursor([-last[-1] if order == "rank" else last[1], last[0]])
+    return [dict(zip(SEARCH_COLUMNS, r)) for r in page], next_cursor
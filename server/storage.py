@@ -0,0 +1,292 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
+from partitions import Partitions
+from pipeline import INSERT_INCIDENT, INSERT_THREAT
+from rollups import add_logs, add_threats
+
+SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+_DEADLINE = object()
+
+
+def connect(path, synchronous="NORMAL", timeout=30):
+    if synchronous.upper() not in SYNCHRONOUS_LEVELS:
+        raise ValueError(f"unknown synchronous level: {synchronous}")
+
+    # uri=True so day partitions can be attached as file: URIs
+    conn = sqlite3.connect(
+        path, timeout=timeout, check_same_thread=False, cached_statements=256, uri=True
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA synchronous={synchronous.upper()}")
+    return conn
+
+
+def connect_readonly(path, timeout=30):
+    uri = Path(os.path.abspath(path)).as_uri() + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, timeout=timeout, check_same_thread=False)
+    conn.execute("PRAGMA query_only=ON")
+    return conn
+
+
+class ReadPool:
+    def __init__(self, path, size=4):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                return connect_readonly(self.path)
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._idle.get()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class DBWriter:
+    """Single long-lived connection that owns every ingest write.
+
+    Batches are queued by the analysis side and committed together once
+    commit_rows rows are pending or commit_interval seconds have passed
+    since the first uncommitted one. After each commit, on_threats (if set)
+    gets the threats it contained as dicts with their threats.id. Log rows
+    go to the day partition of their timestamp.
+
+    A batch whose day partitions cannot be attached (a locked or full
+    disk) is retried, retry_delay doubling up to retry_max, before
+    anything queued after it; the queue backs up meanwhile instead of
+    losing rows. Only a batch the database rejects is dropped.
+    """
+
+    def __init__(
+        self,
+        path,
+        synchronous="NORMAL",
+        commit_rows=5000,
+        commit_interval=0.5,
+        on_threats=None,
+        retry_delay=0.5,
+        retry_max=30.0,
+    ):
+        self.path = path
+        self.synchronous = synchronous
+        self.commit_rows = commit_rows
+        self.commit_interval = commit_interval
+        self.on_threats = on_threats
+        self.retry_delay = retry_delay
+        self.retry_max = retry_max
+        self.partitions = Partitions(path)
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self.rows_written = 0
+        self.commits = 0
+        self.commit_latencies = deque(maxlen=4096)
+        self.retries = 0
+        self.batches_dropped = 0
+        self._closing = threading.Event()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name="db-writer")
+        self._thread.start()
+        return self
+
+    def write(self, rows, threats=()):
+        if rows or threats:
+            self._queue.put((rows, threats))
+
+    def flush(self, timeout=None):
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        if self._thread:
+            self._closing.set()
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        conn = connect(self.path, self.synchronous)
+        pending = 0
+        first_pending = 0.0
+        committed_threats = []
+
+        try:
+            while True:
+                timeout = None
+                if pending:
+                    timeout = max(0, first_pending + self.commit_interval - time.monotonic())
+
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = _DEADLINE
+
+                if item is _DEADLINE or item is None or isinstance(item, threading.Event):
+                    if pending:
+                        self._commit(conn, pending, committed_threats)
+                        pending = 0
+                        committed_threats = []
+                    if item is None:
+                        break
+                    if item is not _DEADLINE:
+                        item.set()
+                    continue
+
+                rows, threats = item
+                days = self.partitions.days_of(rows)
+                if not self.partitions.ready(conn, days):
+                    # a new day: ATTACH cannot run inside the open group
+                    if pending:
+                        self._commit(conn, pending, committed_threats)
+                        pending = 0
+                        committed_threats = []
+                    if not self._prepare(conn, days):
+                        self.batches_dropped += 1
+                        continue
+
+                # savepoint so one bad batch does not take the rest of the
+                # uncommitted group down with it; outside a transaction its
+                # RELEASE would commit, so the group is opened first
+                if not conn.in_transaction:
+                    conn.execute("BEGIN")
+                conn.execute("SAVEPOINT batch")
+                try:
+                    self.partitions.insert(conn, rows)
+                    add_logs(conn, rows)
+                    inserted = insert_threats(conn, threats)
+                    add_threats(conn, [t for _, t in inserted])
+                except sqlite3.Error as e:
+                    print("[DB] write failed:", e)
+                    self.batches_dropped += 1
+                    conn.execute("ROLLBACK TO batch")
+                    conn.execute("RELEASE batch")
+                    continue
+                conn.execute("RELEASE batch")
+                if inserted and self.on_threats:
+                    committed_threats.extend(threat_dicts(inserted))
+
+                if not pending:
+                    first_pending = time.monotonic()
+                pending += len(rows)
+
+                if pending >= self.commit_rows:
+                    self._commit(conn, pending, committed_threats)
+                    pending = 0
+                    committed_threats = []
+        finally:
+            conn.close()
+
+    def _prepare(self, conn, days):
+        """Attach days' partitions, retrying until they are; False only if
+        the writer is closed meanwhile."""
+        delay = self.retry_delay
+        while True:
+            try:
+                self.partitions.prepare(conn, days)
+                return True
+            except sqlite3.Error as e:
+                if conn.in_transaction:
+                    conn.rollback()  # a partition upgrade that failed half way
+                self.retries += 1
+                if self._closing.is_set():
+                    print(f"[DB] write failed, closing: {e}")
+                    return False
+                print(f"[DB] cannot open partitions {sorted(days)}: {e}, retry in {delay:.1f}s")
+                if self._closing.wait(delay):
+                    print("[DB] write failed, closing")
+                    return False
+                delay = min(delay * 2, self.retry_max)
+
+    def _commit(self, conn, rows, threats):
+        t0 = time.perf_counter()
+        conn.commit()
+        self.commit_latencies.append(time.perf_counter() - t0)
+        self.commits += 1
+        self.rows_written += rows
+        if threats:
+            try:
+                self.on_threats(threats)
+            except Exception as e:
+                print("[DB] threat callback failed:", e)
+
+
+def insert_threats(conn, threats):
+    """Insert threat rows, return (id, row) for each one actually inserted.
+
+    Rows with a dedup_key are correlated incidents and skipped when that
+    key is already stored.
+    """
+    plain = [t for t in threats if t[6] is None]
+    incidents = [t for t in threats if t[6] is not None]
+
+    inserted = []
+    if plain:
+        conn.executemany(INSERT_THREAT, plain)
+        # the writer holds the write lock for the whole executemany, so
+        # the ids are consecutive
+        last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        inserted.extend(zip(range(last_id - len(plain) + 1, last_id + 1), plain))
+    for t in incidents:
+        cur = conn.execute(INSERT_INCIDENT, t)
+        if cur.rowcount:
+            inserted.append((cur.lastrowid, t))
+    return inserted
+
+
+def threat_dicts(inserted):
+    """(id, threat row) pairs as the dicts ThreatFeed publishes."""
+    return [
+        {
+            "id": threat_id,
+            "timestamp": ts,
+            "client_id": client_id,
+            "mac": mac,
+            "ip": ip,
+            "message": message,
+        }
+        for threat_id, (ts, client_id, mac, ip, _, message, _) in inserted
+    ]
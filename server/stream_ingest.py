@@ -0,0 +1,136 @@
+"""ASGI app for chunked NDJSON ingest: POST /api/log/stream.
+
+One event per line. The body is parsed as it arrives and pushed into the
+shared IngestQueue, so a client can keep a single request open and
+stream into it indefinitely. When the queue is full the app stops
+reading, and TCP pushes the backpressure back to the client.
+"""
+
+import asyncio
+import json
+from datetime import datetime
+from http.cookies import SimpleCookie
+
+from auth_middleware import check_client
+from pipeline import to_entry
+
+STREAM_PATH = "/api/log/stream"
+MAX_LINE_BYTES = 1 << 20
+FLUSH_EVENTS = 500
+FULL_QUEUE_PAUSE = 0.05
+
+
+async def _respond(send, status, body):
+    data = json.dumps(body).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(data)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": data})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+def create_stream_app(ingest_queue):
+    async def offer(entries):
+        step = min(FLUSH_EVENTS, ingest_queue.capacity)
+        for i in range(0, len(entries), step):
+            # a paused stream is not a rejection, the client is not told to retry
+            while not ingest_queue.offer(entries[i : i + step], count_rejected=False):
+                await asyncio.sleep(FULL_QUEUE_PAUSE)
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await _lifespan(receive, send)
+        if scope["type"] != "http":
+            return
+
+        if scope["path"] != STREAM_PATH:
+            return await _respond(send, 404, {"error": "Not found"})
+        if scope["method"] != "POST":
+            return await _respond(send, 405, {"error": "Method not allowed"})
+
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        cookies = SimpleCookie(headers.get("cookie", ""))
+        token = cookies["access_token"].value if "access_token" in cookies else None
+        client_ip = scope["client"][0] if scope.get("client") else None
+
+        _, error = check_client(token, headers.get("x-mac-address"), client_ip)
+        if error:
+            return await _respond(send, error[1], {"error": error[0]})
+
+        pending = b""
+        entries = []
+        accepted = 0
+        invalid = 0
+
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+
+            received_at = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+            more = message.get("more_body", False)
+            chunk = message.get("body", b"")
+
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop() if more else b""
+            if len(pending) > MAX_LINE_BYTES:
+                await offer(entries)
+                accepted += len(entries)
+                return await _respond(
+                    send, 413, {"error": "Line too long", "count": accepted}
+                )
+
+            for raw in lines:
+                if not raw.strip():
+                    continue
+                try:
+                    event = json.loads(raw)
+                except ValueError:
+                    invalid += 1
+                    continue
+                if not isinstance(event, dict):
+                    invalid += 1
+                    continue
+
+                entries.append(to_entry(event, received_at))
+                if len(entries) >= FLUSH_EVENTS:
+                    await offer(entries)
+                    accepted += len(entries)
+                    entries = []
+
+            # flush at every chunk boundary so a slow stream is not held back
+            if entries:
+                await offer(entries)
+                accepted += len(entries)
+                entries = []
+
+            if not more:
+                break
+
+        await _respond(send, 200, {"status": "accepted", "count": accepted, "invalid": invalid})
+
+    return app
+
+
+def serve_stream(app, host, port):
+    import uvicorn
+
+    # runs in a background thread next to Flask; uvicorn skips signal
+    # handlers when not on the main thread
+    uvicorn.run(app, host=host, port=port, log_level="warning", lifespan="on")
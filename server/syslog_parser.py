@@ -0,0 +1,264 @@
+"""Ingest-time parsing of the lines client/log_formatter.format_syslog writes.
+
+    Jan 01 00:00:00 client1@172.28.0.2 auth-service[1948]: <message>
+
+SyslogParser.parse reads a line once into a ParsedLine: the header fields
+by position and str.partition, the message fields (source IP, username,
+device id, HTTP status) by their literal markers, and the analyzer rules
+by one RuleMatcher pass. The first COLUMNS of it go into the logs
+partition columns of the same names, ParsedLine.match is what
+LogAnalyzer.analyze_match takes, so neither the analyzer, the
+event_type column nor a later query has to scan the text again.
+"""
+
+import calendar
+import re
+import time
+from collections import namedtuple
+
+IP_RE = re.compile(r"IP:\s*([\d\.]+)")
+DEVICE_RE = re.compile(r"Device\s+([a-f0-9\-]{8,})", re.I)
+
+LineMatch = namedtuple("LineMatch", ["rules", "ip", "device"])
+
+# event_type first: build_rows appends these to a log row in this order
+ParsedLine = namedtuple(
+    "ParsedLine",
+    [
+        "event_type",
+        "event_ts",
+        "host",
+        "service",
+        "pid",
+        "src_ip",
+        "username",
+        "device",
+        "http_status",
+        "match",
+    ],
+)
+COLUMNS = ParsedLine._fields[:-1]
+
+MONTHS = {
+    m: i
+    for i, m in enumerate(
+        ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"],
+        start=1,
+    )
+}
+
+HEX = "0123456789abcdef-"
+IP_CHARS = "0123456789."
+
+# where a message names the address an event came from after "IP:"
+SOURCE_MARKERS = ("IP ", " from ", "(")
+# what precedes the user name: "User: admin", "for user admin", "User admin
+# login", "Account admin locked", "attempt for admin", "login: admin from"
+USER_MARKERS = ("User: ", "for user ", "User ", "Account ", "attempt for ", "login: ")
+# "Device telemetry: <id>", "Suspicious device behavior: <id>"
+DEVICE_LABELS = ("telemetry: ", "behavior: ")
+
+
+def parse_syslog_time(line, now=None):
+    """Epoch seconds from the "%b %d %H:%M:%S" prefix format_syslog writes.
+
+    The prefix carries no year: take the current one, or the previous one
+    when that would put the event more than a day in the future.
+    """
+    if len(line) < 15 or line[3] != " " or line[6] != " ":
+        return None
+    month = MONTHS.get(line[:3])
+    if month is None:
+        return None
+    try:
+        day = int(line[4:6])
+        hour, minute, second = int(line[7:9]), int(line[10:12]), int(line[13:15])
+    except ValueError:
+        return None
+
+    now = time.time() if now is None else now
+    year = time.gmtime(now).tm_year
+    try:
+        ts = calendar.timegm((year, month, day, hour, minute, second))
+        if ts > now + 86400:
+            ts = calendar.timegm((year - 1, month, day, hour, minute, second))
+    except (ValueError, OverflowError):
+        return None
+    return ts
+
+
+def _run(text, start, chars):
+    """End of the run of chars that starts at text[start]."""
+    rest = text[start:]
+    return len(text) - len(rest.lstrip(chars))
+
+
+def marked_ip(line):
+    """What IP_RE finds, the address after "IP:"; without a regex for ASCII lines."""
+    if not line.isascii():
+        m = IP_RE.search(line)
+        return m.group(1) if m else None
+    i = line.find("IP:")
+    while i != -1:
+        start = i + 3
+        while start < len(line) and line[start].isspace():
+            start += 1
+        end = _run(line, start, IP_CHARS)
+        if end > start:
+            return line[start:end]
+        i = line.find("IP:", i + 3)
+    return None
+
+
+def device_id(line, low=None):
+    """What DEVICE_RE finds, the id after "Device "; without a regex for ASCII lines."""
+    if not line.isascii():
+        m = DEVICE_RE.search(line)
+        return m.group(1) if m else None
+    low = line.lower() if low is None else low
+    i = low.find("device")
+    while i != -1:
+        start = i + 6
+        spaces = start
+        while spaces < len(line) and line[spaces].isspace():
+            spaces += 1
+        end = _run(low, spaces, HEX)
+        if spaces > start and end - spaces >= 8:
+            return line[spaces:end]
+        i = low.find("device", i + 6)
+    return None
+
+
+def source_ip(message):
+    """The dotted quad after "IP ", " from " or "(", for messages without
+    an "IP:" one."""
+    for marker in SOURCE_MARKERS:
+        i = message.find(marker)
+        while i != -1:
+            start = i + len(marker)
+            end = _run(message, start, IP_CHARS)
+            if message.count(".", start, end) == 3:
+                return message[start:end]
+            i = message.find(marker, start)
+    return None
+
+
+def username(message):
+    for marker in USER_MARKERS:
+        i = message.find(marker)
+        if i != -1:
+            name = message[i + len(marker) :].split(" ", 1)[0]
+            if name and name != "-":
+                return name
+    return None
+
+
+def http_status(message):
+    """The status of "HTTP <method> <path> - <status> <time>ms - ..."."""
+    if not message.startswith("HTTP "):
+        return None
+    parts = message.split(" - ", 2)
+    if len(parts) < 2:
+        return None
+    status = parts[1].split(" ", 1)[0]
+    return int(status) if len(status) == 3 and status.isdecimal() else None
+
+
+def labelled_device(message):
+    """An id DEVICE_RE does not see, after "telemetry: " or "behavior: ".
+
+    Only the logs column gets these; the analyzer's device windows keep
+    to what they always keyed on.
+    """
+    for label in DEVICE_LABELS:
+        i = message.find(label)
+        if i != -1:
+            start = i + len(label)
+            end = _run(message.lower(), start, HEX)
+            if end - start >= 8:
+                return message[start:end]
+    return None
+
+
+_tuple = tuple.__new__
+
+
+class SyslogParser:
+    """Parse syslog lines into ParsedLine records.
+
+    matcher is the RuleMatcher whose rules fill match.rules and
+    event_type (the first rule in its PATTERNS order); without one both
+    stay empty, for filling the columns of rows that already have an
+    event_type.
+    """
+
+    def __init__(self, matcher=None):
+        self.matcher = matcher
+        self._order = list(matcher.patterns) if matcher else []
+        self._last_prefix = None
+        self._last_prefix_ts = None
+
+    def parse(self, line, now=None):
+        """A ParsedLine for line; now is the reference for the year of its
+        timestamp, the current time by default."""
+        if now is None:
+            # consecutive lines usually share the same second
+            prefix = line[:15]
+            if prefix != self._last_prefix:
+                self._last_prefix = prefix
+                self._last_prefix_ts = parse_syslog_time(line)
+            event_ts = self._last_prefix_ts
+        else:
+            event_ts = parse_syslog_time(line, now)
+
+        # "<host> <service>[<pid>]: ", by position, the message after it
+        host = service = pid = None
+        message = line
+        if event_ts is not None and line[15:16] == " ":
+            space = line.find(" ", 16)
+            colon = line.find(": ", space)
+            bracket = line.find("[", space, colon)
+            if space != -1 and colon != -1 and bracket != -1 and line[colon - 1] == "]":
+                host = line[16:space]
+                service = line[space + 1 : bracket]
+                pid = line[bracket + 1 : colon - 1]
+                pid = int(pid) if pid.isdecimal() else None
+                message = line[colon + 2 :]
+
+        # the literal checks skip the scans most lines have nothing for
+        if line.isascii():
+            low = line.lower()
+            ip = marked_ip(line) if "IP:" in line else None
+            device = device_id(line, low) if "device" in low else None
+        else:
+            low = None
+            ip = marked_ip(line)
+            device = device_id(line)
+
+        rules = self.matcher.rules(line, low) if self.matcher else set()
+        event_type = None
+        if rules:
+            for name in self._order:
+                if name in rules:
+                    event_type = name
+                    break
+
+        column_device = device
+        if device is None and (low is None or "device" in low):
+            column_device = labelled_device(message)
+        # tuple.__new__ skips the namedtuple constructors, once per line adds up
+        return _tuple(
+            ParsedLine,
+            (
+                event_type,
+                event_ts,
+                host,
+                service,
+                pid,
+                ip or source_ip(message),
+                username(message),
+                column_device,
+                http_status(message) if message.startswith("HTTP ") else None,
+                _tuple(LineMatch, (rules, ip, device)),
+            ),
+        )
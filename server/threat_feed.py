@@ -0,0 +1,117 @@
+import threading
+import time
+from collections import deque
+
+THREAT_COLUMNS = ("id", "timestamp", "client_id", "mac", "ip", "message")
+
+SELECT_AFTER = """
+    SELECT id, timestamp, client_id, mac, ip, message
+    FROM threats
+    WHERE id > ?
+    ORDER BY id
+    LIMIT ?
+"""
+SELECT_LAST_ID = "SELECT MAX(id) FROM threats"
+
+
+class ThreatFeed:
+    """Committed threats in memory, handed to watchers by threats.id.
+
+    The DB writer publishes each group of threats once it has committed
+    them, so every watcher wakes at the same time and reads the same
+    buffer; no watcher touches the database while it keeps up.
+
+    Threats other processes insert (`correlate`, replay.py) never reach
+    the buffer: refresh() moves last_id to MAX(threats.id), every
+    refresh_interval once start()ed, and a watcher whose ids after the
+    cursor are not all in the buffer (a reconnect after a long gap, or
+    such a hole) is served from the threats table, by id, through reader.
+    """
+
+    def __init__(self, reader=None, buffer=10_000, last_id=0, refresh_interval=2.0):
+        self.reader = reader
+        self.refresh_interval = refresh_interval
+        self._events = deque(maxlen=buffer)
+        self._cond = threading.Condition()
+        self.last_id = last_id
+        self.published = 0
+        self.backfills = 0
+
+    def start(self):
+        threading.Thread(target=self._refresh_loop, daemon=True, name="threat-feed").start()
+        return self
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                print("[ERROR] threat feed refresh:", e)
+
+    def refresh(self):
+        """Move last_id to the newest committed threat, waking watchers
+        when another process inserted it."""
+        with self.reader.connection() as conn:
+            last_id = conn.execute(SELECT_LAST_ID).fetchone()[0] or 0
+        with self._cond:
+            if last_id > self.last_id:
+                self.last_id = last_id
+                self._cond.notify_all()
+            return self.last_id
+
+    def publish(self, threats):
+        """Add committed threats, dicts with THREAT_COLUMNS, in id order."""
+        if not threats:
+            return
+        with self._cond:
+            self._events.extend(threats)
+            self.last_id = max(self.last_id, threats[-1]["id"])
+            self.published += len(threats)
+            self._cond.notify_all()
+
+    def after(self, cursor, timeout=0.0, limit=1000):
+        """Threats with id > cursor, waiting up to timeout for the first one."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.last_id > cursor, timeout)
+            if self.last_id <= cursor:
+                return []
+            out = self._tail(cursor, limit)
+            if out is not None:
+                return out
+        return self._backfill(cursor, limit)
+
+    def _tail(self, cursor, limit):
+        """Buffered threats after cursor, None unless the buffer holds
+        every id from cursor + 1 to last_id (or to limit of them)."""
+        # watchers are almost always near the end of the buffer
+        out = []
+        for event in reversed(self._events):
+            if event["id"] <= cursor:
+                break
+            out.append(event)
+        out.reverse()
+        out = out[:limit]
+        if not out or out[-1]["id"] - cursor != len(out):
+            return None  # ids in between were inserted past the writer
+        if len(out) < limit and out[-1]["id"] < self.last_id:
+            return None
+        return out
+
+    def _backfill(self, cursor, limit):
+        if self.reader is None:
+            with self._cond:
+                return [e for e in self._events if e["id"] > cursor][:limit]
+        self.backfills += 1
+        with self.reader.connection() as conn:
+            rows = conn.execute(SELECT_AFTER, (cursor, limit)).fetchall()
+        return [dict(zip(THREAT_COLUMNS, r)) for r in rows]
+
+    def stats(self):
+        with self._cond:
+            return {
+                "last_id": self.last_id,
+                "buffered": len(self._events),
+                "published": self.published,
+                "backfills": self.backfills,
+            }
@@ -0,0 +1,139 @@
+import sys
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+
+class _Window:
+    __slots__ = ("buckets", "counts")
+
+    def __init__(self):
+        self.buckets = []  # bucket start, ascending
+        self.counts = []
+
+
+class WindowStore:
+    """Per-key sliding-window event counts with bounded memory.
+
+    Each key keeps one (bucket, count) pair per `resolution` seconds that
+    saw events instead of one float per event. Keys whose newest bucket
+    falls behind the expiry horizon are dropped by a hashed timer wheel
+    (one slot per resolution step), and when more than max_keys are live
+    the least recently touched keys go first.
+    """
+
+    def __init__(self, window, max_keys=100_000, resolution=1):
+        self.window = window
+        self.max_keys = max_keys
+        self.resolution = resolution
+
+        self._keys = OrderedDict()  # key -> _Window, in touch order
+        self._wheel = {}  # slot -> set of keys whose newest bucket is that slot
+        self._swept = None
+
+        self.evicted_idle = 0
+        self.evicted_lru = 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def _slot(self, ts):
+        return int(ts // self.resolution)
+
+    def record(self, key, ts, horizon=None):
+        """Add one event for key at ts, return the count in [ts - window, ts].
+
+        horizon is the oldest time any future event can still look back
+        to; buckets and keys older than it are released.
+        """
+        if horizon is not None:
+            self.expire(horizon)
+
+        w = self._keys.get(key)
+        if w is None:
+            w = self._keys[key] = _Window()
+            if len(self._keys) > self.max_keys:
+                self._evict_lru()
+        else:
+            self._keys.move_to_end(key)
+
+        slot = self._slot(ts)
+        newest = w.buckets[-1] if w.buckets else None
+
+        i = bisect_left(w.buckets, slot)
+        if i < len(w.buckets) and w.buckets[i] == slot:
+            w.counts[i] += 1
+        else:
+            w.buckets.insert(i, slot)
+            w.counts.insert(i, 1)
+
+        if newest is None or slot > newest:
+            if newest is not None:
+                self._wheel.get(newest, set()).discard(key)
+            self._wheel.setdefault(slot, set()).add(key)
+
+        if horizon is not None:
+            cut = bisect_left(w.buckets, self._slot(horizon))
+            if cut:
+                del w.buckets[:cut]
+                del w.counts[:cut]
+            if not w.buckets:
+                # a single event already past the horizon
+                del self._keys[key]
+                self._wheel.get(slot, set()).discard(key)
+                return 0
+
+        lo = bisect_left(w.buckets, self._slot(ts - self.window))
+        hi = bisect_right(w.buckets, slot)
+        return sum(w.counts[lo:hi])
+
+    def expire(self, horizon):
+        limit = self._slot(horizon)
+        if self._swept is None:
+            self._swept = limit
+            return
+        if limit <= self._swept:
+            return
+
+        # walk the wheel one slot at a time unless the clock jumped further
+        # than there are occupied slots
+        if limit - self._swept > len(self._wheel):
+            due = [s for s in self._wheel if s < limit]
+        else:
+            due = [s for s in range(self._swept, limit) if s in self._wheel]
+
+        for s in due:
+            for key in self._wheel.pop(s):
+                if self._keys.pop(key, None) is not None:
+                    self.evicted_idle += 1
+        self._swept = limit
+
+    def _evict_lru(self):
+        key, w = self._keys.popitem(last=False)
+        if w.buckets:
+            slot_keys = self._wheel.get(w.buckets[-1])
+            if slot_keys is not None:
+                slot_keys.discard(key)
+                if not slot_keys:
+                    del self._wheel[w.buckets[-1]]
+        self.evicted_lru += 1
+
+    def memory_bytes(self):
+        size = sys.getsizeof(self._keys) + sys.getsizeof(self._wheel)
+        for key, w in self._keys.items():
+            size += sys.getsizeof(key) + sys.getsizeof(w)
+            size += sys.getsizeof(w.buckets) + sys.getsizeof(w.counts)
+        for keys in self._wheel.values():
+            size += sys.getsizeof(keys)
+        return size
+
+    def stats(self):
+        return {
+            "keys": len(self._keys),
+            "buckets": sum(len(w.buckets) for w in self._keys.values()),
+            "evicted_idle": self.evicted_idle,
+            "evicted_lru": self.evicted_lru,
+            "memory_bytes": self.memory_bytes(),
+        }
@@ -0,0 +1,122 @@
+import multiprocessing as mp
+import threading
+import zlib
+
+from log_analyzer import PREFILTER, LogAnalyzer
+from syslog_parser import COLUMNS, device_id, marked_ip
+
+# rules whose sliding window is keyed by IP / device. Events for the same
+# key must always land on the same worker or the windows split
+IP_KEYED = [PREFILTER["FAILED_LOGIN"][0], PREFILTER["RATE_LIMIT"][0]]
+DEVICE_KEYED = [PREFILTER["DEVICE_SUSPICIOUS"][0]]
+
+
+def shard_key(entry):
+    line = entry["message"]
+    low = line.lower()
+
+    if any(lit in low for lit in IP_KEYED):
+        ip = marked_ip(line)
+        if ip:
+            return ip
+
+    if any(lit in low for lit in DEVICE_KEYED):
+        device = device_id(line, low)
+        if device:
+            return device
+
+    return entry["client_id"]
+
+
+def shard_of(entry, shards):
+    return zlib.crc32(shard_key(entry).encode()) % shards
+
+
+def _worker_main(inbox, results, max_keys):
+    # only messages go out and only levels and the parsed columns come
+    # back, the entries themselves never cross the process boundary
+    analyzer = LogAnalyzer(max_keys=max_keys)
+    while True:
+        item = inbox.get()
+        if item is None:
+            break
+        seq, messages = item
+        parsed = [analyzer.parser.parse(message) for message in messages]
+        levels = analyzer.analyze_batch(messages, parsed=parsed)
+        results.put((seq, levels, [p[: len(COLUMNS)] for p in parsed]))
+    results.put(None)
+
+
+class AnalysisPool:
+    """Key-partitioned analysis across worker processes.
+
+    Each worker owns a LogAnalyzer, so its window state only ever sees the
+    keys hashed to it. Levels and the syslog_parser.COLUMNS of every
+    message come back on a single results queue and the collector thread
+    calls on_result(entries, levels, parsed) for every shard.
+    """
+
+    def __init__(self, workers, on_result, max_keys=100_000):
+        self.workers = workers
+        self.on_result = on_result
+
+        ctx = mp.get_context()
+        self._inboxes = [ctx.Queue() for _ in range(workers)]
+        self._results = ctx.Queue()
+        self._procs = [
+            ctx.Process(
+                target=_worker_main,
+                args=(inbox, self._results, max_keys),
+                daemon=True,
+                name=f"analysis-{i}",
+            )
+            for i, inbox in enumerate(self._inboxes)
+        ]
+        self._collector = None
+        self._pending = {}
+        self._seq = 0
+
+    def start(self):
+        for p in self._procs:
+            p.start()
+        self._collector = threading.Thread(
+            target=self._collect, daemon=True, name="analysis-results"
+        )
+        self._collector.start()
+        return self
+
+    def submit(self, batch):
+        """Queue a batch, returns how many shards (on_result calls) it became."""
+        shards = [[] for _ in range(self.workers)]
+        for entry in batch:
+            shards[shard_of(entry, self.workers)].append(entry)
+
+        submitted = 0
+        for inbox, shard in zip(self._inboxes, shards):
+            if shard:
+                self._seq += 1
+                self._pending[self._seq] = shard
+                inbox.put((self._seq, [entry["message"] for entry in shard]))
+                submitted += 1
+        return submitted
+
+    def close(self):
+        for inbox in self._inboxes:
+            inbox.put(None)
+        if self._collector:
+            self._collector.join()
+        for p in self._procs:
+            p.join()
+
+    def _collect(self):
+        running = self.workers
+        while running:
+            item = self._results.get()
+            if item is None:
+                running -= 1
+                continue
+            seq, levels, parsed = item
+            try:
+                self.on_result(self._pending.pop(seq), levels, parsed)
+            except Exception as e:
+                print("[WORKERS] result handler failed:", e)